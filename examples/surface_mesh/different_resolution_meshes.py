@@ -47,3 +47,14 @@ model.export_gmsh_mesh_file(
         "fine": 0.1,
     },  # "global" is not specified so it uses only the min/max mesh sizes
 )
+
+# Exports the model at several global resolutions for a mesh convergence
+# study, the model is imprinted once for all of them
+model.export_dagmc_h5m_files(
+    [
+        {"filename": "resolution_coarse.h5m", "max_mesh_size": 1.0},
+        {"filename": "resolution_medium.h5m", "max_mesh_size": 0.5},
+        {"filename": "resolution_fine.h5m", "max_mesh_size": 0.25},
+    ],
+    min_mesh_size=0.01,
+)
@@ -0,0 +1,68 @@
+# This example meshes a ball in a cup with tetrahedra, exports the msh file in
+# the ASCII and binary forms of the MSH 4.1 format and times writing and
+# reading each of them. It then writes the mesh partitioned for 4 ranks of a
+# parallel code, one file for each rank. Lower max_mesh_size for a mesh of
+# millions of elements, where the difference between the two forms is largest.
+import time
+from pathlib import Path
+
+import cadquery as cq
+import gmsh
+from cad_to_dagmc import CadToDagmc, read_gmsh_mesh_file
+
+max_mesh_size = 0.3
+
+model = CadToDagmc()
+model.add_cadquery_object(cq.Workplane().sphere(5), material_tags=["ball"])
+model.add_cadquery_object(
+    cq.Workplane().box(12, 12, 8).translate((0, 0, -2)).cut(cq.Workplane().sphere(5)),
+    material_tags=["cup"],
+)
+
+model.export_gmsh_mesh_file(
+    filename="benchmark_ascii.msh", dimensions=3, max_mesh_size=max_mesh_size
+)
+model.export_gmsh_mesh_file(
+    filename="benchmark_binary.msh",
+    dimensions=3,
+    max_mesh_size=max_mesh_size,
+    binary=True,
+)
+
+# the same mesh is written again in each form to time the writing alone
+gmsh.initialize()
+gmsh.option.setNumber("General.Terminal", 0)
+gmsh.open("benchmark_ascii.msh")
+elements = sum(len(tags) for tags in gmsh.model.mesh.getElements()[1])
+print(f"{elements} elements")
+for binary in [0, 1]:
+    filename = f"benchmark_{'binary' if binary else 'ascii'}.msh"
+    gmsh.option.setNumber("Mesh.Binary", binary)
+    start = time.perf_counter()
+    gmsh.write(filename)
+    print(f"{filename}: {Path(filename).stat().st_size / 1e6:.1f} MB, "
+          f"written in {time.perf_counter() - start:.2f} s")
+gmsh.finalize()
+
+for filename in ["benchmark_ascii.msh", "benchmark_binary.msh"]:
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 0)
+    start = time.perf_counter()
+    gmsh.open(filename)
+    print(f"{filename}: read by gmsh in {time.perf_counter() - start:.2f} s")
+    gmsh.finalize()
+
+    start = time.perf_counter()
+    read_gmsh_mesh_file(filename)
+    print(f"{filename}: surfaces read without gmsh in {time.perf_counter() - start:.2f} s")
+
+# one binary file for each of 4 ranks, benchmark_partitioned_1.msh to
+# benchmark_partitioned_4.msh
+model.export_gmsh_mesh_file(
+    filename="benchmark_partitioned.msh",
+    dimensions=3,
+    max_mesh_size=max_mesh_size,
+    binary=True,
+    partitions=4,
+    split_partitions=True,
+)
@@ -1,8 +1,21 @@
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
+import dataclasses
 import functools
+import hashlib
+import heapq
 import importlib.util
+import inspect
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import time
 import cadquery as cq
 import gmsh
 import numpy as np
@@ -57,6 +70,112 @@ def _cad_to_dagmc_mesher_is_available() -> bool:
     return importlib.util.find_spec("cad_to_dagmc_mesher") is not None
 
 
+class StageTimings:
+    """The wall and CPU time an export spent in each stage of the pipeline.
+
+    Recorded when a CadToDagmc is made with record_timings=True. The time of
+    a stage does not include the stages inside it, so the imprint that the
+    gmsh backend does before meshing is counted once, as imprint, and the
+    stages add up to the time of the export apart from the glue between them,
+    which is in wall_time and cpu_time but in no stage. The CPU time is that
+    of this process, so it leaves out any worker processes. Backends that
+    imprint inside their own meshing, cad-to-dagmc-mesher and the cadquery
+    backend with none of its worker options, count their imprint as
+    tessellation.
+
+    Attributes:
+        stages: one dict for each stage in the order they finished, with the
+            stage name under "stage" and its times in seconds under
+            "wall_time" and "cpu_time". A stage run more than once, such as
+            tessellation, has an entry for each run.
+        wall_time: the wall time of the whole export in seconds.
+        cpu_time: the CPU time of the whole export in seconds.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self._open = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record the time spent in the block as the stage name."""
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        # the time of the stages inside this one, taken off its own
+        self._open.append([0.0, 0.0])
+        try:
+            yield
+        finally:
+            inner_wall, inner_cpu = self._open.pop()
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            if self._open:
+                self._open[-1][0] += wall
+                self._open[-1][1] += cpu
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_time": wall - inner_wall,
+                    "cpu_time": cpu - inner_cpu,
+                }
+            )
+
+    def totals(self) -> dict[str, dict[str, float]]:
+        """The times of each stage summed over its runs, with the number of
+        runs under "calls", slowest first."""
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(
+                record["stage"], {"wall_time": 0.0, "cpu_time": 0.0, "calls": 0}
+            )
+            total["wall_time"] += record["wall_time"]
+            total["cpu_time"] += record["cpu_time"]
+            total["calls"] += 1
+        return dict(
+            sorted(totals.items(), key=lambda item: item[1]["wall_time"], reverse=True)
+        )
+
+    def to_dict(self) -> dict:
+        """The report as plain types, as written by to_json."""
+        return {
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "totals": self.totals(),
+            "stages": list(self.stages),
+        }
+
+    def to_json(self, filename: str) -> str:
+        """Write the report to a JSON file.
+
+        Args:
+            filename: the filename of the JSON file.
+
+        Returns:
+            str: the filename written.
+        """
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return str(filename)
+
+
+# the StageTimings of the export being recorded, None when none is, which
+# leaves _stage with nothing more to do than look at it
+_timings = None
+
+
+@contextmanager
+def _stage(name: str):
+    """Record the block, or the function it decorates, as the stage name of
+    the export being recorded, if there is one."""
+    if _timings is None:
+        yield
+    else:
+        with _timings.stage(name):
+            yield
+
+
+@_stage("vtk write")
 def write_vtk(filename, vertices, tetrahedra):
     """Write a tetrahedral mesh to an ASCII VTK legacy file.
 
@@ -140,9 +259,28 @@ def combine_tet_meshes(tet_data):
     if not all_vertices:
         return np.empty((0, 3), dtype=float), np.empty((0, 4), dtype=np.int64)
 
-    vertices = np.vstack(all_vertices)
-    tetrahedra = np.vstack(all_tetrahedra)
+    vertices, remap = _merge_coincident_vertices(np.vstack(all_vertices))
+    return vertices, remap[np.vstack(all_tetrahedra)]
+
+
+def _tet_volume_ids(tet_data):
+    """The solid each tetrahedron of combine_tet_meshes(tet_data) is in."""
+    return np.concatenate(
+        [
+            np.full(len(tet_data[solid_id]["tetrahedra"]), solid_id, dtype=np.int64)
+            for solid_id in tet_data
+        ]
+        or [np.empty(0, dtype=np.int64)]
+    )
+
 
+def _merge_coincident_vertices(vertices):
+    """Merge the vertices with bit for bit identical coordinates.
+
+    Returns:
+        (vertices, remap): the vertices with no exact duplicates, in the order
+        they first appear, and an array mapping each old index to the new one.
+    """
     # first_index maps each kept vertex back to where it first appeared, so the
     # vertices stay in the order the solids were meshed in rather than being
     # sorted, and remap turns the old indices into the new ones
@@ -153,10 +291,250 @@ def combine_tet_meshes(tet_data):
     remap = np.empty(len(keep), dtype=np.int64)
     remap[np.argsort(first_index)] = np.arange(len(keep))
 
-    return vertices[keep], remap[inverse.reshape(-1)][tetrahedra]
+    return vertices[keep], remap[inverse.reshape(-1)]
+
+
+@_stage("surface from tetrahedra")
+def surface_from_tetrahedra(vertices, tetrahedra, tet_volume_ids, volume_ids=None):
+    """The surface mesh of each volume, made of the faces of its tetrahedra
+    that are on its boundary.
+
+    Each face of each tetrahedron is keyed on its three vertex indices, sorted,
+    and the keys are counted over the whole mesh at once. A face found once is
+    on the outside of the model and one found twice is inside it, either inside
+    one volume or between two. The first and the last are the surface, so it is
+    the boundary of the tetrahedra exactly and the two meshes are conformal by
+    construction. The tetrahedra have to share their vertices across the
+    volumes, as those of gmsh and of combine_tet_meshes do.
+
+    There is one surface for each pair of volumes that touch, and one for the
+    outside of each volume, rather than one for each face of the CAD. A surface
+    two volumes share has one id in both and is wound outward from each of
+    them, as vertices_to_h5m expects.
+
+    Args:
+        vertices: the (n, 3) coordinates the tetrahedra index.
+        tetrahedra: the (m, 4) tetrahedra, as zero-based indices into vertices.
+        tet_volume_ids: the volume each tetrahedron is in.
+        volume_ids: the order of the volumes in the result. Defaults to the
+            order they first appear in tet_volume_ids.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face): the vertices on the surface and
+        the (k, 3) triangles of each surface of each volume, as zero-based
+        indices into them.
+
+    Raises:
+        ValueError: if a face is in more than two tetrahedra, which a valid tet
+            mesh does not have, or if a volume in volume_ids has no tetrahedra.
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    tetrahedra = np.asarray(tetrahedra, dtype=np.int64).reshape(-1, 4)
+    tet_volume_ids = np.asarray(tet_volume_ids, dtype=np.int64)
+    if volume_ids is None:
+        _, first = np.unique(tet_volume_ids, return_index=True)
+        volume_ids = tet_volume_ids[np.sort(first)].tolist()
+    missing = sorted(set(volume_ids) - set(tet_volume_ids.tolist()))
+    if missing:
+        raise ValueError(
+            f"Volumes {missing} have no tetrahedra, so their surface cannot be "
+            "taken from the tet mesh."
+        )
+
+    # the faces are wound outward from tetrahedra with a positive volume, so
+    # the others are turned over first
+    corners = vertices[tetrahedra]
+    signed_volume = np.einsum(
+        "ij,ij->i",
+        np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]),
+        corners[:, 3] - corners[:, 0],
+    )
+    tetrahedra = np.where(
+        (signed_volume < 0)[:, None], tetrahedra[:, [0, 2, 1, 3]], tetrahedra
+    )
+    faces = tetrahedra[:, [[1, 2, 3], [0, 3, 2], [0, 1, 3], [0, 2, 1]]].reshape(-1, 3)
+    owners = np.repeat(tet_volume_ids, 4)
+
+    _, key, counts = np.unique(
+        np.sort(faces, axis=1), axis=0, return_inverse=True, return_counts=True
+    )
+    key = key.reshape(-1)
+    if counts.max(initial=0) > 2:
+        raise ValueError(
+            "A face is in more than two tetrahedra, so the tet mesh is not a "
+            "valid volume mesh."
+        )
+
+    # the volume on the other side of each face, 0 for the outside
+    order = np.argsort(key, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    first = order[starts]
+    second = order[np.minimum(starts + 1, len(order) - 1)]
+    twice = counts == 2
+    neighbours = np.zeros(len(faces), dtype=np.int64)
+    neighbours[first[twice]] = owners[second[twice]]
+    neighbours[second[twice]] = owners[first[twice]]
+
+    surface = (counts[key] == 1) | (neighbours != owners)
+    faces, owners, neighbours = faces[surface], owners[surface], neighbours[surface]
+
+    pairs = np.column_stack(
+        [np.minimum(owners, neighbours), np.maximum(owners, neighbours)]
+    )
+    _, surface_ids = np.unique(pairs, axis=0, return_inverse=True)
+    surface_ids = surface_ids.reshape(-1) + 1
+
+    used, faces = np.unique(faces, return_inverse=True)
+    faces = faces.reshape(-1, 3)
+
+    # the faces are grouped by volume and then surface in one sort rather than
+    # picked out with a mask for each
+    triangles_by_solid_by_face = {int(volume_id): {} for volume_id in volume_ids}
+    order = np.lexsort((surface_ids, owners))
+    groups = np.column_stack([owners, surface_ids])[order]
+    boundaries = np.flatnonzero(np.any(np.diff(groups, axis=0), axis=1)) + 1
+    if len(groups):
+        for (volume_id, surface_id), triangles in zip(
+            groups[np.concatenate(([0], boundaries))],
+            np.split(faces[order], boundaries),
+        ):
+            if int(volume_id) in triangles_by_solid_by_face:
+                triangles_by_solid_by_face[int(volume_id)][int(surface_id)] = triangles
+
+    return vertices[used], triangles_by_solid_by_face
+
+
+def _check_positive_int(name, value):
+    """Raise unless value is an int of at least 1.
+
+    bool is a subclass of int, so it is tested for first, see resolve_imprint.
+
+    Raises:
+        TypeError: if value is not an int, or is a bool.
+        ValueError: if value is less than 1.
+    """
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError(f"{name} must be a positive int, got {type(value).__name__}.")
+    if value < 1:
+        raise ValueError(f"{name}={value} is not valid, it must be a positive int.")
+
 
+@dataclass
+class ImprintOptions:
+    """Finer control over imprinting than the bool or int imprint argument.
 
-def resolve_imprint(imprint: bool | int) -> tuple[bool, int | None]:
+    An instance, or a dict of the same fields, can be passed as the imprint
+    argument of the export methods. imprint=ImprintOptions(threads=4) is the
+    same as imprint=4.
+
+    Args:
+        threads: the number of OpenCASCADE threads each imprint runs on. None
+            leaves the thread pool as it is, except when processes is set, in
+            which case the cores are shared out between the worker processes.
+        processes: the number of worker processes to imprint in. Solids are
+            first grouped into clusters that cannot touch each other, and as
+            nothing is shared between clusters each one is imprinted on its
+            own, in parallel. None imprints the whole assembly in one call in
+            this process.
+        strategy: "single" imprints all the solids (of each cluster, when
+            processes is set) in one boolean operation. "tree" splits them
+            into spatial blocks of at most block_size solids, imprints each
+            block, then imprints the solids either side of each boundary
+            between blocks as the blocks are merged back together pairwise.
+            Peak RAM then follows the block size rather than the size of the
+            assembly, for the same imprinted topology.
+        block_size: the most solids imprinted together in one block by the
+            "tree" strategy.
+        use_obb: whether OpenCASCADE filters the pairs of sub-shapes to
+            intersect with oriented bounding boxes as well as axis aligned
+            ones. Tighter boxes mean fewer pairs to intersect on curved or
+            rotated geometry.
+        glue: "off", "shift" or "full". Gluing skips intersection tests that
+            cannot find anything for shapes that only touch, "shift" when
+            they share faces partially and "full" when their shared faces
+            coincide exactly. "off" intersects everything, which also splits
+            the region where two solids overlap into a solid of its own, so
+            there is then one more volume than there are material tags. See
+            tune_imprint_options for checking what is safe on a model.
+        fuzzy_value: extra tolerance for the boolean operation, which can
+            connect faces that are meant to touch but are a small gap apart.
+        non_destructive: whether the input solids are protected from having
+            their tolerances changed. False lets OpenCASCADE change the
+            solids added to the CadToDagmc instance in place, which saves
+            copying them.
+        run_parallel: whether the boolean operation runs on the thread pool.
+        max_memory: a memory budget for the imprint, as a number of bytes or
+            a string such as "48GB" or "64GiB". The number of threads is then
+            chosen to fit it: the memory used per face at one and at two
+            threads is measured by imprinting a small sample of the solids,
+            the most threads whose estimate for the whole assembly fits in
+            the budget, or in the memory the system has available if that is
+            less, are used, and the imprint runs in a worker process that is
+            stopped and started again on half the threads if its memory gets
+            close to the budget. Cannot be combined with threads or
+            processes, which it would override.
+
+    Leaving use_obb, glue, fuzzy_value, non_destructive and run_parallel all
+    as None imprints with the installed cadquery's imprint unchanged. Setting
+    any of them imprints with an OpenCASCADE BOPAlgo_Builder configured from
+    them instead, with any left as None taking the values cadquery uses:
+    use_obb=True, glue="shift", non_destructive=False and run_parallel=True.
+    """
+
+    threads: int | None = None
+    processes: int | None = None
+    strategy: str = "single"
+    block_size: int = 256
+    use_obb: bool | None = None
+    glue: str | None = None
+    fuzzy_value: float | None = None
+    non_destructive: bool | None = None
+    run_parallel: bool | None = None
+    max_memory: int | str | None = None
+
+    def __post_init__(self):
+        if self.max_memory is not None:
+            _parse_memory(self.max_memory)
+            if self.threads is not None or self.processes is not None:
+                raise ValueError(
+                    "ImprintOptions max_memory chooses the number of threads "
+                    "itself, so it cannot be combined with threads or processes."
+                )
+        if self.strategy not in ("single", "tree"):
+            raise ValueError(
+                f'ImprintOptions strategy must be "single" or "tree", not '
+                f'"{self.strategy}".'
+            )
+        if self.glue not in (None, "off", "shift", "full"):
+            raise ValueError(
+                f'ImprintOptions glue must be "off", "shift", "full" or None, '
+                f'not "{self.glue}".'
+            )
+        if self.fuzzy_value is not None and (
+            isinstance(self.fuzzy_value, bool)
+            or not isinstance(self.fuzzy_value, (int, float))
+            or self.fuzzy_value < 0
+        ):
+            raise ValueError(
+                f"ImprintOptions fuzzy_value={self.fuzzy_value!r} is not valid, "
+                "it must be a number of at least 0 or None."
+            )
+        for name in ("use_obb", "non_destructive", "run_parallel"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, bool):
+                raise TypeError(
+                    f"ImprintOptions {name} must be a bool or None, got "
+                    f"{type(value).__name__}."
+                )
+        for name in ("threads", "processes", "block_size"):
+            value = getattr(self, name)
+            if value is not None:
+                _check_positive_int(f"ImprintOptions {name}", value)
+
+
+def resolve_imprint(
+    imprint: bool | int | ImprintOptions | dict,
+) -> tuple[bool, int | ImprintOptions | None]:
     """Split the imprint argument into a flag and a thread limit.
 
     The imprint argument of the export methods accepts either a bool or an
@@ -167,16 +545,22 @@ def resolve_imprint(imprint: bool | int) -> tuple[bool, int | None]:
     threads, so a large model that runs out of memory can often be imprinted
     by lowering the thread count.
 
+    An ImprintOptions, or a dict of its fields, is also accepted when more
+    than the thread count needs setting, and is passed through in place of
+    the thread limit.
+
     Args:
         imprint: the imprint argument as given by the user.
 
     Returns:
         (do_imprint, threads) where threads is None when the thread count is
-        to be left as the caller set it.
+        to be left as the caller set it, and the ImprintOptions when one was
+        given.
 
     Raises:
         ValueError: if an int less than 1 is given.
-        TypeError: if something other than a bool or an int is given.
+        TypeError: if something other than a bool, an int, an ImprintOptions
+            or a dict of its fields is given.
     """
     # bool is a subclass of int so it has to be tested for first. It also
     # means an int cannot express "do not imprint": imprint=0 would be
@@ -193,13 +577,32 @@ def resolve_imprint(imprint: bool | int) -> tuple[bool, int | None]:
                 "that many threads."
             )
         return True, imprint
+    if isinstance(imprint, ImprintOptions):
+        return True, imprint
+    if isinstance(imprint, dict):
+        accepted = [field.name for field in dataclasses.fields(ImprintOptions)]
+        unknown = sorted(set(imprint) - set(accepted))
+        if unknown:
+            raise TypeError(
+                f"imprint got the unknown options {unknown}. Accepted options "
+                f"are {accepted}."
+            )
+        return True, ImprintOptions(**imprint)
     raise TypeError(
         f"imprint must be a bool or an int, got {type(imprint).__name__}. Use "
-        "imprint=True or imprint=False to turn imprinting on or off, or a "
-        "positive int to imprint with that many threads."
+        "imprint=True or imprint=False to turn imprinting on or off, a "
+        "positive int to imprint with that many threads, or an ImprintOptions "
+        "for finer control."
     )
 
 
+def _as_imprint_options(threads: int | ImprintOptions | None) -> ImprintOptions:
+    """Return the thread limit resolve_imprint hands back as ImprintOptions."""
+    if isinstance(threads, ImprintOptions):
+        return threads
+    return ImprintOptions(threads=threads)
+
+
 @contextmanager
 def thread_limit(threads: int | None):
     """Limit the threads OpenCASCADE uses, restoring the limit afterwards.
@@ -226,7 +629,11 @@ def thread_limit(threads: int | None):
 
 
 @contextmanager
-def imprint_thread_limit(threads: int | None):
+def imprint_thread_limit(
+    threads: int | ImprintOptions | None,
+    history: "ImprintHistory | None" = None,
+    cache: "_ExportCache | None" = None,
+):
     """Limit the threads used by imprinting and by nothing else.
 
     The gmsh backend imprints through imprint_assembly, so there the imprint
@@ -241,22 +648,48 @@ def imprint_thread_limit(threads: int | None):
     meshing either side of it. The original function is put back on the way
     out, including when meshing raises part way through.
 
+    The same wrapper applies the rest of an ImprintOptions, so for example
+    the plugin imprints in worker processes when processes is set, or block by
+    block with the "tree" strategy, and only re-imprints what changed since
+    the last imprint when given a history. Given a cache, an earlier imprint
+    of the same assembly with the same options is reused instead.
+
     Args:
-        threads: the number of threads to imprint with, or None to leave the
-            pool alone.
+        threads: the number of threads to imprint with, an ImprintOptions, or
+            None to leave the pool alone.
+        history: an ImprintHistory to imprint incrementally with, or None.
+        cache: the _ExportCache of a CadToDagmc, or None.
     """
-    if threads is None:
+    options = _as_imprint_options(threads)
+    if options == ImprintOptions() and history is None and cache is None:
         yield
         return
 
     real_imprint = cq.occ_impl.assembly.imprint
+    signature = inspect.signature(real_imprint)
+    assembly_name = next(iter(signature.parameters))
 
     # functools.wraps keeps the signature intact: imprint_assembly and
     # cad-to-dagmc-mesher both inspect it for the glue argument.
     @functools.wraps(real_imprint)
     def limited_imprint(*args, **kwargs):
-        with thread_limit(threads):
-            return real_imprint(*args, **kwargs)
+        # the arguments of imprint may be given by position as well, so they
+        # are bound to their names, the form the cache and the imprint
+        # functions take them in
+        kwargs = signature.bind(*args, **kwargs).arguments
+        assembly = kwargs.pop(assembly_name)
+        for name, parameter in signature.parameters.items():
+            if parameter.kind is parameter.VAR_KEYWORD:
+                kwargs.update(kwargs.pop(name, {}))
+
+        def run():
+            return _imprint_with_options(
+                assembly, options, real_imprint, kwargs, history=history
+            )
+
+        if cache is None:
+            return run()
+        return cache.imprint(assembly, options, kwargs, run)
 
     cq.occ_impl.assembly.imprint = limited_imprint
     try:
@@ -265,131 +698,3056 @@ def imprint_thread_limit(threads: int | None):
         cq.occ_impl.assembly.imprint = real_imprint
 
 
-def imprint_assembly(assembly, threads: int | None = None):
-    """Imprint a CadQuery assembly into a connected compound.
+def _solids_with_names(assembly):
+    """Map each placed solid in the assembly to the name imprint reports it by."""
+    id_map = {}
+    for obj, name, loc, _ in assembly:
+        for solid in obj.moved(loc).Solids():
+            id_map[solid] = name
+    return id_map
 
-    Uses the BOPAlgo_Builder based imprint with glue="partial" when the
-    installed cadquery supports it (CadQuery/cadquery#2069, faster and
-    lower RAM than the older BOPAlgo_MakeConnected based imprint, with the
-    same result for touching, non-overlapping solids). Older cadquery
-    versions fall back to the original single-argument imprint.
+
+def _bounding_boxes(solids, tolerance: float = 0.0):
+    """Return the lower and upper corners of each solid's bounding box.
+
+    Both are (n, 3) arrays, with the boxes grown by tolerance on every side.
+    """
+    boxes = np.array(
+        [
+            (bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax)
+            for bb in (solid.BoundingBox() for solid in solids)
+        ],
+        dtype=float,
+    ).reshape(-1, 6)
+    return boxes[:, :3] - tolerance, boxes[:, 3:] + tolerance
+
+
+def _overlapping_pairs(lower, upper):
+    """Yield the (i, j) pairs of boxes that overlap, each pair once.
+
+    The boxes are swept along x so that only boxes whose x ranges overlap are
+    compared, which keeps this fast on many thousands of boxes.
+    """
+    order = np.argsort(lower[:, 0], kind="stable")
+    sorted_lower_x = lower[order, 0]
+    for position, index in enumerate(order):
+        # Every box starting between this one's start and end overlaps it in
+        # x. Boxes starting before it are found when that box is visited.
+        end = np.searchsorted(sorted_lower_x, upper[index, 0], side="right")
+        candidates = order[position + 1 : end]
+        if len(candidates) == 0:
+            continue
+        overlapping = np.all(
+            (lower[candidates] <= upper[index]) & (upper[candidates] >= lower[index]),
+            axis=1,
+        )
+        for other in candidates[overlapping]:
+            yield int(index), int(other)
+
+
+def touching_clusters(solids, tolerance: float = 1e-6) -> list[list[int]]:
+    """Group solids into clusters that cannot touch one another.
+
+    Two solids are put in the same cluster when their bounding boxes, grown by
+    tolerance, overlap, and clusters are closed over that relation. Bounding
+    boxes are conservative: solids that touch always land in one cluster,
+    while solids whose boxes overlap without touching may be grouped when
+    they need not be, which costs time but never changes the imprint.
 
     Args:
-        assembly: the cadquery assembly to imprint.
-        threads: the number of threads to imprint with. Fewer threads lowers
-            the peak RAM of the imprint at the cost of speed. Defaults to None
-            which leaves the thread count as it is.
+        solids: the solids to group, placed where they are to be imprinted.
+        tolerance: the gap below which two boxes count as touching.
+
+    Returns:
+        Lists of indices into solids, one per cluster. Indices are ascending
+        within a cluster and clusters are ordered by their lowest index.
+    """
+    import networkx as nx
+
+    if len(solids) == 0:
+        return []
+
+    graph = nx.Graph()
+    graph.add_nodes_from(range(len(solids)))
+    graph.add_edges_from(_overlapping_pairs(*_bounding_boxes(solids, tolerance)))
+
+    clusters = [sorted(cluster) for cluster in nx.connected_components(graph)]
+    return sorted(clusters, key=lambda cluster: cluster[0])
+
+
+_BOP_OPTION_NAMES = ("use_obb", "glue", "fuzzy_value", "non_destructive", "run_parallel")
+
+
+def _bop_imprint(
+    assembly,
+    use_obb: bool = True,
+    glue: str = "shift",
+    fuzzy_value: float | None = None,
+    non_destructive: bool = False,
+    run_parallel: bool = True,
+):
+    """Imprint an assembly with a BOPAlgo_Builder configured as asked.
+
+    A stand in for cq.occ_impl.assembly.imprint, with the same arguments and
+    the same return value, for when ImprintOptions sets the boolean operation
+    options that cadquery's imprint does not expose. cadquery imprints with
+    a BOPAlgo_MakeConnected, which glues the solids with "shift", so the
+    defaults here give the same result. Each result solid is traced back to
+    the input solids it came from through the history of the builder, so a
+    region that glue="off" splits out of two overlapping inputs reports both.
 
     Returns:
         (imprinted_shape, imprinted_solids_with_original_ids)
+
+    Raises:
+        ValueError: if OpenCASCADE reports that the boolean operation failed.
     """
-    import inspect
+    from OCP.BOPAlgo import BOPAlgo_Builder, BOPAlgo_GlueEnum
+
+    id_map = _solids_with_names(assembly)
+
+    builder = BOPAlgo_Builder()
+    builder.SetUseOBB(use_obb)
+    builder.SetGlue(
+        {
+            "off": BOPAlgo_GlueEnum.BOPAlgo_GlueOff,
+            "shift": BOPAlgo_GlueEnum.BOPAlgo_GlueShift,
+            "full": BOPAlgo_GlueEnum.BOPAlgo_GlueFull,
+        }[glue]
+    )
+    if fuzzy_value is not None:
+        builder.SetFuzzyValue(fuzzy_value)
+    builder.SetNonDestructive(non_destructive)
+    builder.SetRunParallel(run_parallel)
+    for solid in id_map:
+        builder.AddArgument(solid.wrapped)
+    builder.Perform()
+
+    if builder.HasErrors():
+        raise ValueError(
+            "The boolean operation behind the imprint failed with "
+            f"use_obb={use_obb}, glue={glue!r}, fuzzy_value={fuzzy_value}, "
+            f"non_destructive={non_destructive}, run_parallel={run_parallel}. "
+            'glue="full" is only valid for solids whose shared faces coincide '
+            'exactly, so try glue="shift".'
+        )
 
-    # Imprinting needs at least two solids to do anything. Skipping it for a
-    # single solid is not just an optimization: the BOPAlgo_Builder based
-    # imprint returns a Null shape when given fewer than two arguments.
-    id_map = {}
-    for obj, name, loc, _ in assembly:
-        for solid in obj.moved(loc).Solids():
-            id_map[solid] = name
-    if len(id_map) < 2:
-        solids = list(id_map)
-        compound = cq.occ_impl.shapes.Compound.makeCompound(solids)
-        return compound, {s: (id_map[s],) for s in solids}
+    names_by_image = {}
+    for solid, name in id_map.items():
+        if builder.IsDeleted(solid.wrapped):
+            continue
+        images = [cq.Shape.cast(image) for image in builder.Modified(solid.wrapped)]
+        for image in images or [solid]:
+            names_by_image.setdefault(image, []).append(name)
 
-    with thread_limit(threads):
-        imprint = cq.occ_impl.assembly.imprint
-        if "glue" in inspect.signature(imprint).parameters:
-            return imprint(assembly, glue="partial")
-        return imprint(assembly)
+    imprinted = cq.Shape.cast(builder.Shape())
+    origins = {}
+    for solid in imprinted.Solids():
+        origins[solid] = tuple(names_by_image.get(solid, ())) or (id_map[solid],)
+    return imprinted, origins
 
 
-def share_coincident_face_ids(triangles_by_solid_by_face):
-    """Give the face two touching solids share a single id in both of them.
+def _imprint_function(options, imprint, imprint_kwargs):
+    """Return the imprint function and keyword arguments options call for.
 
-    Imprinting leaves one face between two touching solids, but
-    cadquery_direct_mesh_plugin numbers faces per solid, so depending on the
-    installed version each solid can contribute its own id for that one face.
-    Writing both produces two coincident one sided DAGMC surfaces instead of
-    one surface carrying a sense for each volume, which does not transport
-    correctly: particles crossing the interface are not handed to the
-    neighbouring volume, and the flux tallied there comes out low with nothing
-    reported.
+    That is imprint itself unless options sets any boolean operation option,
+    in which case it is _bop_imprint with those options filled in.
+    """
+    settings = {
+        name: getattr(options, name)
+        for name in _BOP_OPTION_NAMES
+        if getattr(options, name) is not None
+    }
+    if not settings:
+        return imprint, imprint_kwargs
+    return functools.partial(_bop_imprint, **settings), {}
 
-    The plugin welds vertices across the whole assembly, so both copies of the
-    interface index the same vertices and differ only in winding. Keying on the
-    triangle set with each triangle sorted is therefore orientation insensitive
-    and identifies the copies. Only the ids are rewritten. Each solid keeps its
-    own winding under the shared id, which is what vertices_to_h5m expects: it
-    writes the surface once from the first solid that refers to it and reads
-    the second solid off the shared id to build GEOM_SENSE_2.
 
-    Ids are handed out from 1 in order of first appearance rather than the
-    plugin's original ids being kept. Merging without renumbering would leave
-    the ids of the dropped copies unused, so the highest surface id would stay
-    as high as the unmerged count. Those ids become DAGMC surface ids, and a
-    DAGMC universe embedded in CSG shares an id space with the CSG surfaces, so
-    an inflated range collides with them ("Surface ID 21 exists in both
-    Universe 3 and the CSG geometry"). Renumbering also matches what gmsh and
-    cad-to-dagmc-mesher produce.
+def _imprint_solids(solids, imprint, imprint_kwargs):
+    """Imprint solids against each other in one call to imprint.
 
-    This reproduces what the plugin does when it shares imprinted face ids
-    itself (jmwright/cadquery-direct-mesh-plugin#10), including the numbering.
-    It is idempotent, so it is a no-op against a plugin that already shares
-    them. Once that pull request is released AND the
-    cadquery_direct_mesh_plugin floor in pyproject.toml is raised to that
-    release, this function and its call can be removed. Removing it before the
-    floor is raised would reintroduce the bug for anyone on an older plugin.
+    The solids are named by their position so that the origins imprint
+    reports come back as indices into solids rather than as assembly names,
+    which lets the strategies below imprint subsets of an assembly and still
+    trace every result to the solids it came from.
+
+    Returns:
+        (compound, indices) where indices holds a tuple of indices into
+        solids for each solid of the compound, in compound.Solids() order.
+    """
+    # the BOPAlgo_Builder based imprint returns a Null shape for fewer than
+    # two arguments, see imprint_assembly
+    if len(solids) < 2:
+        return (
+            cq.occ_impl.shapes.Compound.makeCompound(solids),
+            [(index,) for index in range(len(solids))],
+        )
+
+    assembly = cq.Assembly()
+    for index, solid in enumerate(solids):
+        assembly.add(solid, name=str(index))
+
+    _, origins = imprint(assembly, **imprint_kwargs)
+
+    imprinted_solids = list(origins)
+    indices = [
+        tuple(int(name.split("/")[-1]) for name in origins[solid])
+        for solid in imprinted_solids
+    ]
+    return cq.occ_impl.shapes.Compound.makeCompound(imprinted_solids), indices
+
+
+def _imprint_block_boundary(left, right, imprint, imprint_kwargs):
+    """Imprint two separately imprinted blocks of solids together.
+
+    Only solids whose bounding boxes reach across from one block to the other
+    can pick up anything new from the other block, so those are re-imprinted
+    rather than the whole of both blocks. They are imprinted together with
+    every solid that shares a vertex with them: a face or an edge that gets
+    split is shared with those neighbours, and imprinting them in the same
+    call hands them the same split. Everything further out shares nothing
+    that changes, keeps its faces exactly as they were, and so still shares
+    them with the neighbours that were re-imprinted.
 
     Args:
-        triangles_by_solid_by_face: Dict mapping solid_id -> face_id -> list of
-            triangles, each triangle a list of vertex indices.
+        left, right: lists of (solid, origin_indices) pairs, each imprinted
+            within itself.
+        imprint: the imprint function.
+        imprint_kwargs: keyword arguments for the imprint function.
 
     Returns:
-        The same mapping with coincident faces sharing one face id, and ids
-        renumbered contiguously from 1.
+        The list of (solid, origin_indices) pairs for the merged block.
+    """
+    items = left + right
+    solids = [solid for solid, _ in items]
+
+    crossing = set()
+    for i, j in _overlapping_pairs(*_bounding_boxes(solids, 1e-6)):
+        if (i < len(left)) != (j < len(left)):
+            crossing.update((i, j))
+    if not crossing:
+        return items
+
+    crossing_vertices = set()
+    for index in crossing:
+        crossing_vertices.update(solids[index].Vertices())
+    subset = sorted(
+        crossing
+        | {
+            index
+            for index, solid in enumerate(solids)
+            if not crossing_vertices.isdisjoint(solid.Vertices())
+        }
+    )
+
+    compound, local_indices = _imprint_solids(
+        [solids[index] for index in subset], imprint, imprint_kwargs
+    )
+    in_subset = set(subset)
+    merged = [item for index, item in enumerate(items) if index not in in_subset]
+    for solid, local in zip(compound.Solids(), local_indices):
+        origin = tuple(
+            original for index in local for original in items[subset[index]][1]
+        )
+        merged.append((solid, origin))
+    return merged
+
+
+def _imprint_tree(solids, block_size, imprint, imprint_kwargs):
+    """Imprint solids block by block, merging the blocks in a tree reduction.
+
+    The solids are split in two at the median of their bounding box centres
+    along the longest axis, recursively, until each block holds at most
+    block_size solids. Each block is imprinted on its own and sibling blocks
+    are then merged on the way back up by _imprint_block_boundary, so no
+    single boolean operation sees more than a block, or the solids along one
+    boundary between blocks.
+
+    Returns:
+        (compound, indices) in the same form as _imprint_solids.
+    """
+    lower, upper = _bounding_boxes(solids)
+    centres = (lower + upper) / 2
+
+    def reduce(indices):
+        if len(indices) <= block_size:
+            compound, local = _imprint_solids(
+                [solids[index] for index in indices], imprint, imprint_kwargs
+            )
+            return [
+                (solid, tuple(int(indices[i]) for i in ids))
+                for solid, ids in zip(compound.Solids(), local)
+            ]
+        axis = np.argmax(np.ptp(centres[indices], axis=0))
+        order = indices[np.argsort(centres[indices, axis], kind="stable")]
+        half = len(order) // 2
+        return _imprint_block_boundary(
+            reduce(order[:half]), reduce(order[half:]), imprint, imprint_kwargs
+        )
+
+    print(
+        f"Imprinting {len(solids)} solids in blocks of at most {block_size} solids"
+    )
+    items = reduce(np.arange(len(solids)))
+    compound = cq.occ_impl.shapes.Compound.makeCompound([solid for solid, _ in items])
+    return compound, [origin for _, origin in items]
+
+
+def _imprint_by_strategy(solids, options, imprint, imprint_kwargs):
+    """Imprint solids in this process by the strategy in options."""
+    with thread_limit(options.threads):
+        if options.strategy == "tree":
+            return _imprint_tree(solids, options.block_size, imprint, imprint_kwargs)
+        return _imprint_solids(solids, imprint, imprint_kwargs)
+
+
+def _imprint_cluster(solids, options, imprint_kwargs):
+    """Imprint one cluster of solids in a worker process.
+
+    Runs in a process of its own, so it imports nothing from the parent but
+    the solids, which pickle as binary BRep, and the options.
+
+    The imprinted solids are returned inside a single compound rather than one
+    by one. Pickling them separately would give each its own copy of the faces
+    they share, and a shared face has to stay one face for the meshing.
+    """
+    imprint, imprint_kwargs = _imprint_function(
+        options, cq.occ_impl.assembly.imprint, imprint_kwargs
+    )
+    return _imprint_by_strategy(solids, options, imprint, imprint_kwargs)
+
+
+def _imprint_in_processes(solids, options, imprint, imprint_kwargs):
+    """Imprint clusters of solids that do not touch in worker processes.
+
+    A solid on its own in its cluster has nothing to imprint against and is
+    passed through as it is. When everything falls into one cluster there is
+    nothing to run in parallel, so it is imprinted here instead of paying for
+    a worker.
+
+    Workers are started with spawn rather than fork. The OpenCASCADE thread
+    pool runs its own threads, and a forked child inherits a pool whose
+    threads do not exist in it, so the first parallel boolean in the child
+    can hang.
+
+    Returns:
+        (compound, indices) in the same form as _imprint_solids.
+    """
+    clusters = touching_clusters(solids)
+    if len(clusters) == 1:
+        return _imprint_by_strategy(solids, options, imprint, imprint_kwargs)
+
+    to_imprint = [cluster for cluster in clusters if len(cluster) > 1]
+    workers = min(options.processes, len(to_imprint))
+
+    threads = options.threads
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // options.processes)
+    worker_options = dataclasses.replace(options, threads=threads, processes=None)
+
+    results = {}
+    if to_imprint:
+        print(
+            f"Imprinting {len(to_imprint)} clusters of touching solids in "
+            f"{workers} processes"
+        )
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # largest first, so a big cluster is not left running on its own
+            # at the end while the other workers sit idle
+            futures = {
+                executor.submit(
+                    _imprint_cluster,
+                    [solids[index] for index in cluster],
+                    worker_options,
+                    imprint_kwargs,
+                ): position
+                for position, cluster in sorted(
+                    enumerate(clusters), key=lambda item: -len(item[1])
+                )
+                if len(cluster) > 1
+            }
+            for future, position in futures.items():
+                results[position] = future.result()
+
+    merged_solids = []
+    indices = []
+    for position, cluster in enumerate(clusters):
+        if position not in results:
+            merged_solids.append(solids[cluster[0]])
+            indices.append((cluster[0],))
+            continue
+        compound, local_indices = results[position]
+        for solid, local in zip(compound.Solids(), local_indices):
+            merged_solids.append(solid)
+            indices.append(tuple(cluster[index] for index in local))
+
+    return cq.occ_impl.shapes.Compound.makeCompound(merged_solids), indices
+
+
+_MEMORY_UNITS = {
+    "B": 1,
+    "KB": 10**3,
+    "MB": 10**6,
+    "GB": 10**9,
+    "TB": 10**12,
+    "KIB": 2**10,
+    "MIB": 2**20,
+    "GIB": 2**30,
+    "TIB": 2**40,
+}
+
+
+def _parse_memory(value: int | str) -> int:
+    """Return a memory size, given in bytes or as a string like "48GB", in bytes.
+
+    KB, MB, GB and TB are powers of 1000, KiB, MiB, GiB and TiB powers of 1024.
 
     Raises:
-        ValueError: if a face is shared by more than two solids, or if one
-            solid carries the same face twice. Neither is representable as
-            DAGMC geometry, and vertices_to_h5m would silently write a wrong
-            sense rather than fail.
+        TypeError: if value is not an int or a str.
+        ValueError: if value is not a positive size.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise TypeError(
+            f'max_memory must be a number of bytes or a string such as "48GB", '
+            f"got {type(value).__name__}."
+        )
+    if isinstance(value, int):
+        size = value
+    else:
+        match = re.fullmatch(r"\s*(\d+(?:\.\d*)?|\.\d+)\s*([A-Za-z]*)\s*", value)
+        unit = (match.group(2).upper() or "B") if match else None
+        if unit not in _MEMORY_UNITS:
+            raise ValueError(
+                f'max_memory="{value}" is not a size of memory. Give a number '
+                f"followed by one of the units {sorted(_MEMORY_UNITS)}, for "
+                'example "48GB".'
+            )
+        size = int(float(match.group(1)) * _MEMORY_UNITS[unit])
+    if size < 1:
+        raise ValueError(f"max_memory={value!r} is not valid, it must be positive.")
+    return size
+
+
+def _format_memory(size: float) -> str:
+    return f"{size / 1e9:.2f} GB"
+
+
+def _available_memory() -> int | None:
+    """Return the memory the system has available in bytes, or None if unknown.
+
+    Uses psutil when it is installed and /proc/meminfo otherwise, so that
+    Linux needs no extra dependency.
     """
+    if importlib.util.find_spec("psutil") is not None:
+        import psutil
 
-    def canonical(triangles):
-        return frozenset(tuple(sorted(int(vertex) for vertex in triangle))
-                         for triangle in triangles)
+        return psutil.virtual_memory().available
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _process_memory(pid: int) -> int | None:
+    """Return the resident memory of a process in bytes, or None if unknown."""
+    if importlib.util.find_spec("psutil") is not None:
+        import psutil
+
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.NoSuchProcess:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _imprint_reporting(connection, solids, options, imprint_kwargs):
+    """Imprint in a worker of _imprint_in_monitored_process.
+
+    Tells the parent once the solids are loaded, so that it can tell the
+    memory of the imprint apart from that of starting the worker, then sends
+    back the result or the exception imprinting raised.
+    """
+    connection.send(("ready", None))
+    try:
+        result = _imprint_cluster(solids, options, imprint_kwargs)
+    except Exception as e:
+        connection.send(("error", e))
+    else:
+        connection.send(("done", result))
+    connection.close()
+
+
+def _imprint_in_monitored_process(solids, options, imprint_kwargs, limit):
+    """Imprint solids in a worker process, stopping it if it uses over limit.
+
+    The boolean operation holds on to the GIL, so its memory cannot be
+    watched from a thread of the process running it. It runs in a worker
+    instead, started with spawn for the reason given in _imprint_in_processes,
+    and this process polls its resident memory.
+
+    Returns:
+        (result, baseline, peak) where result is the (compound, indices) of
+        _imprint_solids, or None if the worker was stopped for going over
+        limit, baseline is the memory of the worker once it had loaded the
+        solids and peak the most it was seen using, both in bytes.
+
+    Raises:
+        RuntimeError: if the worker exits without sending a result, which is
+            what happens when the operating system kills it for running out
+            of memory before it reached the limit.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    worker = context.Process(
+        target=_imprint_reporting, args=(sender, solids, options, imprint_kwargs)
+    )
+    worker.start()
+    sender.close()
+
+    baseline = peak = 0
+    try:
+        while True:
+            memory = _process_memory(worker.pid) or 0
+            peak = max(peak, memory)
+            if peak > limit:
+                worker.kill()
+                return None, baseline, peak
+            if not receiver.poll(0.05):
+                continue
+            try:
+                state, payload = receiver.recv()
+            except EOFError:
+                worker.join()
+                raise RuntimeError(
+                    f"The imprinting worker exited with code {worker.exitcode} "
+                    "without returning a result."
+                )
+            if state == "ready":
+                baseline = _process_memory(worker.pid) or memory
+            elif state == "error":
+                raise payload
+            else:
+                return payload, baseline, peak
+    finally:
+        worker.join()
+        receiver.close()
+
+
+def _threads_for_memory(
+    faces: int,
+    per_face: float,
+    per_face_per_thread: float,
+    fixed: float,
+    limit: float,
+    most: int,
+) -> int:
+    """Return the most threads, up to most, whose memory estimate fits limit.
+
+    The estimate is fixed + faces * (per_face + per_face_per_thread *
+    (threads - 1)). At least one thread is always returned, even if that does
+    not fit, as there is no fewer to try.
+    """
+    spare = limit - fixed - faces * per_face
+    per_thread = faces * per_face_per_thread
+    if spare <= 0:
+        return 1
+    if per_thread <= 0:
+        return most
+    return int(max(1, min(most, 1 + spare // per_thread)))
+
+
+def _calibration_sample(solids, faces, target_faces):
+    """Pick neighbouring solids, at least two, with about target_faces faces.
+
+    Solids next to each other are taken, in order along the longest axis of
+    the assembly, so that the sample has faces to imprint against each other
+    as the whole assembly does.
+    """
+    lower, upper = _bounding_boxes(solids)
+    centres = (lower + upper) / 2
+    axis = np.argmax(np.ptp(centres, axis=0))
+    order = np.argsort(centres[:, axis], kind="stable")
+    counts = np.cumsum(np.asarray(faces)[order])
+    size = max(2, int(np.searchsorted(counts, target_faces)) + 1)
+    return sorted(int(index) for index in order[:size])
+
+
+def _imprint_within_memory(solids, options, imprint_kwargs):
+    """Imprint solids on as many threads as fit in options.max_memory.
+
+    Two imprints of a small sample of the solids, on one thread and on two,
+    give the memory the imprint uses per face and the extra each further
+    thread adds per face. The most threads whose estimate for all the faces
+    fits in 80% of the budget, or of the available memory if that is less,
+    are then used, leaving room for the estimate being low. With the "tree"
+    strategy only a block of solids is imprinted at once, so the faces of one
+    block are estimated for instead of all of them. Assemblies too small to
+    sample start on all the cores.
+
+    The imprint runs in a worker that is stopped if it reaches 95% of the
+    budget and started again on half the threads.
+
+    Returns:
+        (compound, indices) in the same form as _imprint_solids.
+
+    Raises:
+        ImportError: if memory cannot be measured on this platform without
+            psutil and psutil is not installed.
+        MemoryError: if the imprint goes over the budget on a single thread.
+    """
+    if _process_memory(os.getpid()) is None:
+        raise ImportError(
+            "Imprinting with max_memory needs psutil to measure memory on this "
+            "platform, install it with: pip install psutil"
+        )
+
+    budget = _parse_memory(options.max_memory)
+    available = _available_memory()
+    limit = budget
+    if available is not None and available < budget:
+        print(
+            f"Only {_format_memory(available)} of memory is available, "
+            f"imprinting within that instead of the max_memory of "
+            f"{_format_memory(budget)}"
+        )
+        limit = available
+
+    cores = os.cpu_count() or 1
+    faces = [len(solid.Faces()) for solid in solids]
+    imprinted_faces = sum(faces)
+    if options.strategy == "tree":
+        imprinted_faces *= min(1.0, options.block_size / len(solids))
+
+    # the sample is a few percent of the faces, and not so few that the
+    # memory of the imprint is lost in the noise of the worker
+    sample = _calibration_sample(solids, faces, max(200, sum(faces) // 50))
+    if len(sample) * 2 > len(solids):
+        threads = cores
+    else:
+        sample_solids = [solids[index] for index in sample]
+        sample_faces = sum(faces[index] for index in sample)
+
+        thread_counts = sorted({1, min(2, cores)})
+        used = []
+        for sample_threads in thread_counts:
+            result, baseline, peak = _imprint_in_monitored_process(
+                sample_solids,
+                dataclasses.replace(
+                    options, threads=sample_threads, max_memory=None
+                ),
+                imprint_kwargs,
+                limit,
+            )
+            if result is None:
+                break
+            used.append(max(peak - baseline, 0) / sample_faces)
+
+        if len(used) < len(thread_counts):
+            # even the sample went over the budget
+            threads = 1
+        else:
+            per_face = used[0]
+            per_face_per_thread = max(used[-1] - used[0], 0.0)
+            print(
+                f"Imprint memory estimated at {per_face / 1e3:.1f} kB per face, "
+                f"plus {per_face_per_thread / 1e3:.1f} kB per face for each "
+                "thread after the first"
+            )
+            threads = _threads_for_memory(
+                imprinted_faces,
+                per_face,
+                per_face_per_thread,
+                baseline,
+                0.8 * limit,
+                cores,
+            )
+
+    while True:
+        print(
+            f"Imprinting with threads={threads} within "
+            f"{_format_memory(limit)} of memory"
+        )
+        result, _, peak = _imprint_in_monitored_process(
+            solids,
+            dataclasses.replace(options, threads=threads, max_memory=None),
+            imprint_kwargs,
+            0.95 * limit,
+        )
+        if result is not None:
+            return result
+        if threads == 1:
+            raise MemoryError(
+                f"Imprinting on a single thread went over 95% of the "
+                f"{_format_memory(limit)} of memory it was given. The tree "
+                "strategy, imprint={'strategy': 'tree'}, bounds the memory "
+                "of imprinting by the block_size instead."
+            )
+        print(
+            f"Imprinting reached {_format_memory(peak)} with threads={threads}, "
+            f"trying again with threads={threads // 2}"
+        )
+        threads //= 2
+
+
+def _imprint_solids_with_options(solids, options, imprint, imprint_kwargs):
+    """Imprint a list of solids as options ask.
+
+    Returns:
+        (compound, indices) in the same form as _imprint_solids.
+    """
+    if options.max_memory is not None:
+        return _imprint_within_memory(solids, options, imprint_kwargs)
+    if options.processes is not None:
+        return _imprint_in_processes(solids, options, imprint, imprint_kwargs)
+    return _imprint_by_strategy(solids, options, imprint, imprint_kwargs)
+
+
+def _solid_fingerprint(solid) -> str:
+    """Return a hash of the binary BRep of a solid.
+
+    Two solids with the same geometry in the same place hash the same however
+    they were built, so a part rebuilt unchanged, or scaled by the same
+    scale_factor again, is recognised as the same.
+
+    Only the geometry and topology count. Meshing stores triangulations on
+    the faces it meshes, which are faces of the input solids wherever the
+    imprint left them whole, and meshing and checking flip the modified and
+    checked flags of the shapes they visit. So a copy, sharing the geometry,
+    is hashed with its flags reset and without its triangulations.
+    """
+    from OCP.BinTools import BinTools, BinTools_FormatVersion
+    from OCP.TopExp import TopExp
+    from OCP.TopTools import TopTools_IndexedMapOfShape
+
+    copy = solid.copy(False).wrapped
+    shapes = TopTools_IndexedMapOfShape()
+    TopExp.MapShapes_s(copy, shapes)
+    for index in range(1, shapes.Extent() + 1):
+        shape = shapes.FindKey(index)
+        shape.Modified(True)
+        shape.Checked(False)
+
+    stream = io.BytesIO()
+    BinTools.Write_s(
+        copy,
+        stream,
+        False,
+        False,
+        BinTools_FormatVersion.BinTools_FormatVersion_CURRENT,
+    )
+    return hashlib.sha1(stream.getvalue()).hexdigest()
+
+
+class ImprintHistory:
+    """Remembers the last imprint so that the next only redoes what changed.
+
+    Swapping one part of a large model only changes the imprint around that
+    part. Given the solids to imprint, imprint re-imprints the solids that
+    are new since the last call, along with the solids whose bounding boxes
+    touch them or touch a solid that has gone, starting from their
+    unimprinted shapes. The solids sharing a vertex with those are imprinted
+    with them too, in their imprinted form, so that the faces they share
+    with the rest come out shared again. Every other solid keeps its
+    imprinted shape from last time, faces and all.
+
+    Solids are matched between calls by a hash of their BRep, so a solid
+    counts as changed whenever its shape or placement changes, including
+    through a different scale_factor, and as unchanged however it was
+    rebuilt, or when it is the same solid given again after imprinting has
+    raised its tolerances in place. A change to the boolean operation options
+    of the ImprintOptions, such as glue or fuzzy_value, changes how every
+    solid is imprinted, so the next imprint is then done in full.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Forget the last imprint, so that the next one is done in full."""
+        self._fingerprints = None
+        self._solids = None
+        self._items = None
+        self._bop_options = None
+
+    def imprint(self, solids, options, imprint, imprint_kwargs):
+        """Imprint solids, reusing as much of the last imprint as possible.
+
+        Args:
+            solids: the solids to imprint.
+            options: the ImprintOptions to imprint with. Re-imprinting the
+                solids around a change is always done in this process, as
+                the imprinted solids it is spliced into have to share faces
+                with the result, and faces do not stay shared across
+                processes.
+            imprint: the imprint function.
+            imprint_kwargs: keyword arguments for the imprint function.
+
+        Returns:
+            (compound, indices) in the same form as _imprint_solids.
+        """
+        fingerprints = [_solid_fingerprint(solid) for solid in solids]
+        bop_options = tuple(getattr(options, name) for name in _BOP_OPTION_NAMES)
+
+        if self._fingerprints is not None and bop_options != self._bop_options:
+            print("The imprint options have changed, imprinting all solids again")
+        if self._fingerprints is None or bop_options != self._bop_options:
+            compound, indices = _imprint_solids_with_options(
+                solids, options, imprint, imprint_kwargs
+            )
+            items = list(zip(compound.Solids(), indices))
+        else:
+            unmatched = {}
+            for old, fingerprint in enumerate(self._fingerprints):
+                unmatched.setdefault(fingerprint, []).append(old)
+            new_of_old = {}
+            for new, fingerprint in enumerate(fingerprints):
+                if unmatched.get(fingerprint):
+                    new_of_old[unmatched[fingerprint].pop(0)] = new
+
+            matched = set(new_of_old.values())
+            added = [new for new in range(len(solids)) if new not in matched]
+            removed = [old for old in range(len(self._solids)) if old not in new_of_old]
+            if added or removed:
+                items = self._reimprint(
+                    solids, added, removed, new_of_old, options, imprint, imprint_kwargs
+                )
+            else:
+                print("No solids have changed, reusing the previous imprint")
+                items = [
+                    (solid, tuple(new_of_old[old] for old in origin))
+                    for solid, origin in self._items
+                ]
+            if items is None:
+                compound, indices = _imprint_solids_with_options(
+                    solids, options, imprint, imprint_kwargs
+                )
+                items = list(zip(compound.Solids(), indices))
+            else:
+                compound = cq.occ_impl.shapes.Compound.makeCompound(
+                    [solid for solid, _ in items]
+                )
+                indices = [origin for _, origin in items]
+
+        # taken again as imprinting can change the tolerances of the solids it
+        # is given in place, and the next call is given the changed solids
+        self._fingerprints = [_solid_fingerprint(solid) for solid in solids]
+        self._solids = list(solids)
+        self._items = items
+        self._bop_options = bop_options
+        return compound, indices
+
+    def _reimprint(
+        self, solids, added, removed, new_of_old, options, imprint, imprint_kwargs
+    ):
+        """Re-imprint the solids around the ones added and removed.
+
+        The solids around the change are imprinted in one call, whatever the
+        strategy, as they mix unimprinted solids with imprinted ones that
+        have to stay shared with the rest. A change reaching over half of
+        the solids saves little over imprinting the lot, so then nothing is
+        re-imprinted here and None is returned instead, for everything to be
+        imprinted as options ask.
+
+        Returns:
+            The list of (solid, origin_indices) pairs for the new imprint,
+            with origin_indices being indices into solids, or None.
+        """
+        previous = [solid for solid, _ in self._items]
+        changed = [solids[new] for new in added] + [self._solids[old] for old in removed]
+
+        # old solids to start again from their unimprinted shapes: the ones
+        # whose imprinted shapes touch a change, and the ones that are gone
+        gone = set(removed)
+        redo = set(gone)
+        for i, j in _overlapping_pairs(
+            *_bounding_boxes(previous + changed, 1e-6)
+        ):
+            if (i < len(previous)) != (j < len(previous)):
+                redo.update(self._items[min(i, j)][1])
+        # an overlap imprinted into a solid of its own comes from several
+        # solids, so keep redoing until every imprinted solid is either made
+        # only from solids being redone or only from solids being kept
+        while True:
+            grown = set(redo)
+            for _, origin in self._items:
+                if grown.intersection(origin):
+                    grown.update(origin)
+            if grown == redo:
+                break
+            redo = grown
+
+        dropped = [
+            i for i, (_, origin) in enumerate(self._items) if redo.intersection(origin)
+        ]
+        dropped_vertices = set()
+        for i in dropped:
+            dropped_vertices.update(previous[i].Vertices())
+        in_dropped = set(dropped)
+        around = [
+            i
+            for i in range(len(previous))
+            if i not in in_dropped
+            and not dropped_vertices.isdisjoint(previous[i].Vertices())
+        ]
+        in_around = set(around)
+
+        fresh = added + sorted(new_of_old[old] for old in redo - gone)
+        if 2 * (len(fresh) + len(around)) > len(solids):
+            print("Most solids are near a change, imprinting all of them again")
+            return None
+
+        print(
+            f"Re-imprinting {len(fresh)} changed or neighbouring solids and the "
+            f"{len(around)} solids around them, reusing the previous imprint of "
+            f"{len(previous) - len(dropped) - len(around)} solids"
+        )
+        with thread_limit(options.threads):
+            compound, local_indices = _imprint_solids(
+                [solids[new] for new in fresh] + [previous[i] for i in around],
+                imprint,
+                imprint_kwargs,
+            )
+
+        items = [
+            (previous[i], tuple(new_of_old[old] for old in origin))
+            for i, (_, origin) in enumerate(self._items)
+            if i not in in_dropped and i not in in_around
+        ]
+        for solid, local in zip(compound.Solids(), local_indices):
+            origin = []
+            for index in local:
+                if index < len(fresh):
+                    origin.append(fresh[index])
+                else:
+                    previous_origin = self._items[around[index - len(fresh)]][1]
+                    origin.extend(new_of_old[old] for old in previous_origin)
+            items.append((solid, tuple(origin)))
+        return items
+
+
+def _imprint_with_options(assembly, options, imprint, imprint_kwargs, history=None):
+    """Imprint an assembly as options ask, in the form imprint returns.
+
+    Without processes, max_memory, the tree strategy or a history this is one
+    call to imprint on the whole assembly, exactly as before ImprintOptions
+    existed.
+    """
+    imprint, imprint_kwargs = _imprint_function(options, imprint, imprint_kwargs)
+
+    if (
+        history is None
+        and options.processes is None
+        and options.max_memory is None
+        and options.strategy == "single"
+    ):
+        with thread_limit(options.threads):
+            return imprint(assembly, **imprint_kwargs)
+
+    id_map = _solids_with_names(assembly)
+    solids = list(id_map)
+    if history is None:
+        compound, indices = _imprint_solids_with_options(
+            solids, options, imprint, imprint_kwargs
+        )
+    else:
+        compound, indices = history.imprint(solids, options, imprint, imprint_kwargs)
+
+    names = [id_map[solid] for solid in solids]
+    return compound, {
+        solid: tuple(names[index] for index in origin)
+        for solid, origin in zip(compound.Solids(), indices)
+    }
+
+
+def imprint_assembly(
+    assembly,
+    threads: int | ImprintOptions | None = None,
+    processes: int | None = None,
+    history: ImprintHistory | None = None,
+):
+    """Imprint a CadQuery assembly into a connected compound.
+
+    Uses the BOPAlgo_Builder based imprint with glue="partial" when the
+    installed cadquery supports it (CadQuery/cadquery#2069, faster and
+    lower RAM than the older BOPAlgo_MakeConnected based imprint, with the
+    same result for touching, non-overlapping solids). Older cadquery
+    versions fall back to the original single-argument imprint.
+
+    Args:
+        assembly: the cadquery assembly to imprint.
+        threads: the number of threads to imprint with. Fewer threads lowers
+            the peak RAM of the imprint at the cost of speed. Defaults to None
+            which leaves the thread count as it is. An ImprintOptions is also
+            accepted.
+        processes: imprint clusters of solids that do not touch each other in
+            this many worker processes, with threads then being the limit in
+            each worker. Overrides the processes of an ImprintOptions given
+            as threads. Defaults to None which imprints in one call in this
+            process.
+        history: an ImprintHistory holding the previous imprint, in which
+            case only the solids that changed since then and those around
+            them are imprinted again. Defaults to None which imprints
+            everything.
+
+    Returns:
+        (imprinted_shape, imprinted_solids_with_original_ids)
+    """
+    options = _as_imprint_options(threads)
+    if processes is not None:
+        options = dataclasses.replace(options, processes=processes)
+
+    # Imprinting needs at least two solids to do anything. Skipping it for a
+    # single solid is not just an optimization: the BOPAlgo_Builder based
+    # imprint returns a Null shape when given fewer than two arguments.
+    id_map = _solids_with_names(assembly)
+    if len(id_map) < 2:
+        solids = list(id_map)
+        compound = cq.occ_impl.shapes.Compound.makeCompound(solids)
+        return compound, {s: (id_map[s],) for s in solids}
+
+    imprint = cq.occ_impl.assembly.imprint
+    return _imprint_with_options(
+        assembly, options, imprint, _imprint_assembly_kwargs(imprint), history=history
+    )
+
+
+def _imprint_assembly_kwargs(imprint) -> dict:
+    """The arguments imprint_assembly passes to cadquery's imprint."""
+    if "glue" in inspect.signature(imprint).parameters:
+        return {"glue": "partial"}
+    return {}
+
+
+def tune_imprint_options(
+    assembly,
+    candidates: Iterable[ImprintOptions] | None = None,
+    threads: int | None = None,
+) -> tuple[ImprintOptions, list[dict]]:
+    """Time imprinting an assembly with each candidate and pick the fastest safe one.
+
+    The imprint of the installed cadquery, with no boolean operation options
+    set, is run first as the reference. A candidate counts as safe when it
+    raises nothing, produces a valid shape, and produces the same topology as
+    the reference: the same number of solids, faces, edges and vertices, each
+    traced back to the same input solids. Gluing in particular is fast but
+    gives wrong results for solids that overlap, which this catches.
+
+    Every run imprints a fresh copy of the solids, so a run with
+    non_destructive=False cannot alter what the runs after it are given, and
+    the assembly passed in is left untouched.
+
+    Args:
+        assembly: the cadquery assembly to imprint, for example one built
+            from the parts of a CadToDagmc instance.
+        candidates: the ImprintOptions to try. Defaults to every combination
+            of use_obb, glue and non_destructive.
+        threads: the thread limit for the reference and the default
+            candidates. Defaults to None which leaves the pool as it is.
+
+    Returns:
+        (fastest_safe_options, results) where results holds a dict for each
+        run, the reference first, with the keys "options", "seconds", "safe"
+        and "reason", reason being why an unsafe run was rejected.
+    """
+    from OCP.BRepCheck import BRepCheck_Analyzer
+
+    if candidates is None:
+        candidates = [
+            ImprintOptions(
+                threads=threads, use_obb=use_obb, glue=glue, non_destructive=protect
+            )
+            for use_obb, glue, protect in itertools.product(
+                (True, False), ("off", "shift", "full"), (True, False)
+            )
+        ]
+
+    solids = list(_solids_with_names(assembly))
+    if len(solids) < 2:
+        raise ValueError(
+            f"tune_imprint_options needs at least two solids to imprint, the "
+            f"assembly has {len(solids)}."
+        )
+
+    def run(options):
+        # copied as one compound so that any sub-shapes the inputs share stay
+        # shared in the copies
+        copies = cq.occ_impl.shapes.Compound.makeCompound(solids).copy().Solids()
+        copied_assembly = cq.Assembly()
+        for index, solid in enumerate(copies):
+            copied_assembly.add(solid, name=str(index))
+
+        start = time.perf_counter()
+        imprinted, origins = imprint_assembly(copied_assembly, threads=options)
+        seconds = time.perf_counter() - start
+
+        topology = (
+            len(imprinted.Solids()),
+            len(imprinted.Faces()),
+            len(imprinted.Edges()),
+            len(imprinted.Vertices()),
+            sorted(
+                tuple(sorted(int(name.split("/")[-1]) for name in ids))
+                for ids in origins.values()
+            ),
+        )
+        return seconds, topology, BRepCheck_Analyzer(imprinted.wrapped).IsValid()
+
+    reference_options = ImprintOptions(threads=threads)
+    seconds, reference, _ = run(reference_options)
+    results = [
+        {"options": reference_options, "seconds": seconds, "safe": True, "reason": None}
+    ]
+
+    for options in candidates:
+        reason = None
+        seconds = None
+        try:
+            seconds, topology, valid = run(options)
+            if not valid:
+                reason = "the imprinted shape is not valid"
+            elif topology[:4] != reference[:4]:
+                reason = (
+                    f"{topology[0]} solids, {topology[1]} faces, {topology[2]} "
+                    f"edges and {topology[3]} vertices where the reference has "
+                    f"{reference[0]}, {reference[1]}, {reference[2]} and "
+                    f"{reference[3]}"
+                )
+            elif topology[4] != reference[4]:
+                reason = "solids trace back to different input solids"
+        except Exception as e:
+            reason = f"imprinting raised {type(e).__name__}: {e}"
+        results.append(
+            {
+                "options": options,
+                "seconds": seconds,
+                "safe": reason is None,
+                "reason": reason,
+            }
+        )
+
+    for result in results:
+        timing = "failed" if result["seconds"] is None else f"{result['seconds']:.3f} s"
+        verdict = "safe" if result["safe"] else f"unsafe, {result['reason']}"
+        print(f"{timing:>10}  {verdict}  {result['options']}")
+
+    best = min(
+        (result for result in results if result["safe"]),
+        key=lambda result: result["seconds"],
+    )
+    print(f"Fastest safe imprint options: {best['options']}")
+    return best["options"], results
+
+
+def resolve_tolerances(
+    solids: list[cq.Solid],
+    material_tags: list[str],
+    tolerance: float | dict[str, float] | None,
+    relative_tolerance: float | None = None,
+    default: float = 0.1,
+    scale_factor: float = 1.0,
+) -> list[float]:
+    """Work out the linear tolerance of each solid.
+
+    Args:
+        solids: the solids.
+        material_tags: the material tag of each solid.
+        tolerance: one tolerance for all the solids, or a dict mapping
+            material tags to the tolerance of the solids with that tag.
+            With relative_tolerance, a single value is the largest tolerance
+            any solid gets.
+        relative_tolerance: the tolerance of each solid not named in a
+            tolerance dict as a fraction of the diagonal of its bounding box,
+            so large solids are meshed more coarsely than small ones.
+        default: the tolerance of the solids that neither of the above
+            gives one.
+        scale_factor: the factor the solids are scaled by for meshing.
+            Tolerances are given, and returned, in the units of the scaled
+            solids, as for export_dagmc_h5m_file.
+
+    Returns:
+        The tolerance of each solid.
+
+    Raises:
+        ValueError: if a tolerance is not positive, or a material tag in the
+            tolerance dict is not the tag of any solid.
+    """
+    if isinstance(tolerance, dict):
+        unknown = sorted(set(tolerance) - set(material_tags))
+        if unknown:
+            raise ValueError(
+                f"Material tags {unknown} in tolerance are not found. "
+                f"Available material tags are: {sorted(set(material_tags))}"
+            )
+        values = list(tolerance.values())
+    else:
+        values = [] if tolerance is None else [tolerance]
+    if relative_tolerance is not None:
+        values.append(relative_tolerance)
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"Tolerances must be positive numbers, got {value!r}")
+
+    tolerances = []
+    for solid, material_tag in zip(solids, material_tags):
+        if isinstance(tolerance, dict) and material_tag in tolerance:
+            tolerances.append(tolerance[material_tag])
+        elif relative_tolerance is not None:
+            solid_tolerance = (
+                relative_tolerance * solid.BoundingBox().DiagonalLength * scale_factor
+            )
+            if tolerance is not None and not isinstance(tolerance, dict):
+                solid_tolerance = min(solid_tolerance, tolerance)
+            tolerances.append(solid_tolerance)
+        elif tolerance is not None and not isinstance(tolerance, dict):
+            tolerances.append(tolerance)
+        else:
+            tolerances.append(default)
+    return tolerances
+
+
+def _face_tolerances(solids, tolerances):
+    """The tolerance of each face of each solid when solids differ in it.
+
+    A face two solids share is meshed with the finer of their tolerances, so
+    it comes out the same from either side and welds into one surface.
+
+    Returns:
+        A list for each solid of the tolerance of each of its faces.
+    """
+    finest = {}
+    for solid, tolerance in zip(solids, tolerances):
+        for face in solid.Faces():
+            finest[face] = min(tolerance, finest.get(face, tolerance))
+    return [[finest[face] for face in solid.Faces()] for solid in solids]
+
+
+def _clean_triangulations(solids):
+    """Remove the triangulations left on solids, see
+    _ExportCache.clean_triangulations."""
+    from OCP.BRepTools import BRepTools
+
+    for solid in solids:
+        BRepTools.Clean_s(solid.wrapped)
+
+
+def _first_faces(solids):
+    """Index of each face in the faces of all the solids in turn, leaving out
+    the second copy of a face two solids share."""
+    first = {}
+    index = 0
+    for solid in solids:
+        for face in solid.Faces():
+            first.setdefault(face, index)
+            index += 1
+    return np.array(sorted(first.values()), dtype=np.int64)
+
+
+def _triangle_estimate(
+    solids, tolerance, angular_tolerance, max_triangles, coarsen_only=False
+):
+    """Estimate how many triangles solids tessellate into at other tolerances.
+
+    Every solid is tessellated at probe tolerances starting from a twentieth
+    of its size and shrinking by a factor of 4 each time, with the angular
+    tolerance as given, until the probe has a quarter of max_triangles. The
+    triangle count of each face is interpolated between the probes on a
+    log-log scale and carried on beyond them with the slope of the nearest
+    pair, which is 0 for a flat face or where the angular tolerance decides
+    the count and up to 1 for a doubly curved face. The answer is then within
+    a step or so of the finest probe, and the probes together cost about a
+    third of the tessellation they size. A face shared by two solids is
+    counted once, at the finer of their tolerances.
+
+    Args:
+        solids: the solids, already imprinted if they are to be.
+        tolerance: the linear tolerance, or a list with one for each solid.
+        angular_tolerance: the angular tolerance.
+        max_triangles: the budget the estimate is wanted around.
+        coarsen_only: stop probing once the probes are finer than
+            tolerance, as the tolerances are not to be made finer.
+
+    Returns:
+        (estimate, (low, high)), where estimate is a function of a factor
+        giving the estimated number of triangles when every tolerance is
+        multiplied by it, and low and high are the factors that bring the
+        tolerances a step past the finest and far past the coarsest probe.
+    """
+    if not isinstance(tolerance, (list, tuple, np.ndarray)):
+        tolerance = [tolerance] * len(solids)
+    probes = np.array(
+        [max(solid.BoundingBox().DiagonalLength, 1e-9) / 20 for solid in solids]
+    )
+
+    unique = _first_faces(solids)
+    face_probes = np.repeat(probes, [len(solid.Faces()) for solid in solids])
+    face_tolerances = np.concatenate(_face_tolerances(solids, tolerance))
+
+    # Probing carries on past a quarter of the budget while the count has
+    # stopped growing, as where the angular tolerance decides it, since the
+    # probes then cost no more and the slope beyond them is not known yet.
+    finest = (face_probes[unique] / face_tolerances[unique]).max()
+    counts = []
+    while len(counts) < 2 or (
+        len(counts) < 16
+        and not (coarsen_only and finest / 4 ** (len(counts) - 1) < 1)
+        and counts[-1].sum() < max_triangles
+        and (
+            counts[-1].sum() < max_triangles / 4
+            or counts[-1].sum() < 1.1 * counts[-2].sum()
+        )
+    ):
+        _clean_triangulations(solids)
+        counts.append(
+            _tessellate_solids(
+                solids, list(probes / 4 ** len(counts)), angular_tolerance
+            )[4][unique]
+        )
+    _clean_triangulations(solids)
+
+    # log counts at log tolerances, probes from coarse to fine
+    log_counts = np.log(np.maximum(np.array(counts), 1))
+    log_probes = np.log(face_probes[unique])
+    log_tolerances = np.log(face_tolerances[unique])
+    steps = np.log(4) * np.arange(len(counts))
+    slopes = np.clip(np.diff(log_counts, axis=0) / np.log(4), 0, 1)
+
+    def estimate(factor):
+        # how far below the coarsest probe each face's tolerance is
+        below = log_probes - (log_tolerances + np.log(factor))
+        segment = np.clip(np.searchsorted(steps, below) - 1, 0, len(steps) - 2)
+        rows = np.arange(len(below))
+        log_count = log_counts[segment, rows] + slopes[segment, rows] * (
+            below - steps[segment]
+        )
+        return float(np.exp(np.maximum(log_count, 0)).sum())
+
+    ratios = np.exp(log_probes - log_tolerances)
+    return estimate, (
+        ratios.min() / 4 ** len(counts),
+        ratios.max() * 1e3,
+    )
+
+
+def _budget_factor(estimate, bounds, max_triangles):
+    """The largest factor on the tolerances that estimate keeps within
+    max_triangles, found by bisection between bounds as the estimate falls
+    as the factor grows. When even the lower bound is within budget, the
+    count has stopped growing and the lower bound is returned.
+
+    Raises:
+        ValueError: if even relaxing the linear tolerance cannot meet it.
+    """
+    low, high = bounds
+    if estimate(high) > max_triangles:
+        raise ValueError(
+            f"max_triangles={max_triangles} cannot be met: the angular "
+            f"tolerance alone gives about {int(estimate(high))} triangles. "
+            "Pass a larger angular_tolerance."
+        )
+    if estimate(low) <= max_triangles:
+        return low
+    while high / low > 1.0001:
+        middle = np.sqrt(low * high)
+        if estimate(middle) > max_triangles:
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+def _tessellate_solids(solids, tolerance, angular_tolerance, face_tolerances=None):
+    """Tessellate solids the way cadquery_direct_mesh_plugin does, as arrays.
+
+    tolerance is one value for all the solids or a list with one for each.
+    With face_tolerances, see _face_tolerances, any face that is to be finer
+    than the rest of its solid is meshed on its own first. BRepMesh keeps a
+    triangulation finer than it is asked for, and the edges of that face, so
+    the rest of the solid is meshed up to it, and a shared face is meshed the
+    same way whichever of its solids, and whichever process, meshes it.
+
+    Returns:
+        [vertices, triangles, vertices_per_solid, faces_per_solid,
+        triangles_per_face], where each solid's nodes are numbered from 0
+        within the solid and its triangles index them.
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.TopAbs import TopAbs_REVERSED
+    from OCP.TopLoc import TopLoc_Location
+
+    if not isinstance(tolerance, (list, tuple, np.ndarray)):
+        tolerance = [tolerance] * len(solids)
+
+    vertices = []
+    triangles = []
+    vertices_per_solid = []
+    faces_per_solid = []
+    triangles_per_face = []
+    for index, solid in enumerate(solids):
+        faces = solid.Faces()
+        if face_tolerances is not None:
+            for face, face_tolerance in zip(faces, face_tolerances[index]):
+                if face_tolerance < tolerance[index]:
+                    BRepMesh_IncrementalMesh(
+                        face.wrapped, face_tolerance, False, angular_tolerance, True
+                    )
+        BRepMesh_IncrementalMesh(
+            solid.wrapped, tolerance[index], False, angular_tolerance, True
+        )
+        faces_per_solid.append(len(faces))
+        offset = 0
+        for face in faces:
+            loc = TopLoc_Location()
+            face_mesh = BRep_Tool.Triangulation_s(face.wrapped, loc)
+            if face_mesh is None:
+                triangles_per_face.append(0)
+                continue
+            nodes = [face_mesh.Node(index) for index in range(1, face_mesh.NbNodes() + 1)]
+            if not loc.IsIdentity():
+                trsf = loc.Transformation()
+                nodes = [node.Transformed(trsf) for node in nodes]
+            vertices.extend(node.Coord() for node in nodes)
+            face_triangles = np.array(
+                [
+                    face_mesh.Triangle(index).Get()
+                    for index in range(1, face_mesh.NbTriangles() + 1)
+                ],
+                dtype=np.int64,
+            ).reshape(-1, 3)
+            if face.wrapped.Orientation() == TopAbs_REVERSED:
+                face_triangles = face_triangles[:, [0, 2, 1]]
+            # OpenCASCADE numbers nodes from 1 within each face
+            triangles.append(face_triangles - 1 + offset)
+            triangles_per_face.append(len(face_triangles))
+            offset += len(nodes)
+        vertices_per_solid.append(offset)
+
+    return [
+        np.array(vertices, dtype=np.float64).reshape(-1, 3),
+        np.vstack(triangles) if triangles else np.empty((0, 3), dtype=np.int64),
+        np.array(vertices_per_solid, dtype=np.int64),
+        np.array(faces_per_solid, dtype=np.int64),
+        np.array(triangles_per_face, dtype=np.int64),
+    ]
+
+
+def _tessellate_into_shared_memory(
+    solids, tolerance, angular_tolerance, threads, face_tolerances=None
+):
+    """Tessellate solids in a worker process of tessellate_in_processes.
+
+    The arrays of _tessellate_solids are written into one shared memory block
+    rather than returned, so the parent copies them out as arrays instead of
+    unpickling a list per triangle. The parent unlinks the block once it has
+    read it.
+
+    Returns:
+        (name, layout) of the block, where layout holds the shape, dtype and
+        offset of each array.
+    """
+    from multiprocessing import shared_memory
+
+    with thread_limit(threads):
+        arrays = _tessellate_solids(
+            solids, tolerance, angular_tolerance, face_tolerances
+        )
+
+    block = shared_memory.SharedMemory(
+        create=True, size=max(1, sum(array.nbytes for array in arrays))
+    )
+    layout = []
+    position = 0
+    for array in arrays:
+        np.ndarray(array.shape, array.dtype, buffer=block.buf, offset=position)[
+            ...
+        ] = array
+        layout.append((array.shape, array.dtype.str, position))
+        position += array.nbytes
+    block.close()
+    return block.name, layout
+
+
+def _read_shared_memory(name, layout):
+    """Copy the arrays written by _tessellate_into_shared_memory out of its
+    block and unlink the block."""
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return [
+            np.ndarray(shape, dtype, buffer=block.buf, offset=position).copy()
+            for shape, dtype, position in layout
+        ]
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _split_by_solid(
+    vertices, triangles, vertices_per_solid, faces_per_solid, triangles_per_face
+):
+    """Split the arrays of _tessellate_solids into a (vertices, faces) pair
+    for each solid, where faces holds the triangles of each of its faces."""
+    faces = np.split(triangles, np.cumsum(triangles_per_face)[:-1])
+    vertex_ends = np.cumsum(vertices_per_solid)
+    face_ends = np.cumsum(faces_per_solid)
+    return [
+        (
+            vertices[vertex_end - vertex_count : vertex_end],
+            faces[face_end - face_count : face_end],
+        )
+        for vertex_end, vertex_count, face_end, face_count in zip(
+            vertex_ends, vertices_per_solid, face_ends, faces_per_solid
+        )
+    ]
+
+
+def _join_solids(tessellations):
+    """The inverse of _split_by_solid."""
+    faces = [triangles for _, solid_faces in tessellations for triangles in solid_faces]
+    return [
+        np.vstack([vertices for vertices, _ in tessellations]).reshape(-1, 3),
+        np.vstack(faces) if faces else np.empty((0, 3), dtype=np.int64),
+        np.array([len(vertices) for vertices, _ in tessellations], dtype=np.int64),
+        np.array([len(faces) for _, faces in tessellations], dtype=np.int64),
+        np.array([len(triangles) for triangles in faces], dtype=np.int64),
+    ]
+
+
+def _congruent_solids(solids, tolerances=None):
+    """Find the solids that are one shape placed at several locations.
+
+    Solids are told apart by the hash of their shape with the location
+    removed, see _solid_fingerprint, so repeated instances of a part in a
+    STEP assembly are found as well as shapes that were copied. Two instances
+    are the same shape under a rigid transform, so meshing one and moving its
+    vertices gives the mesh of the other.
+
+    A solid that shares a face with another solid is left out. The shared
+    face is meshed from the neighbour too, and the two copies only weld into
+    one surface if their vertices are equal to the last bit, which moving
+    them with a matrix does not promise. So are locations that scale or
+    mirror. With tolerances, one for each solid, only solids that are to be
+    meshed alike are grouped.
+
+    Returns:
+        (representatives, instances), where representatives are the solids to
+        mesh and instances holds for each solid the index of its
+        representative and the (3, 4) matrix that moves the representative's
+        vertices into place, or None when it is meshed where it is.
+    """
+    face_counts = {}
+    for solid in solids:
+        for face in solid.Faces():
+            face_counts[face] = face_counts.get(face, 0) + 1
+
+    groups = {}
+    sharing = 0
+    for index, solid in enumerate(solids):
+        trsf = solid.wrapped.Location().Transformation()
+        shares_a_face = any(face_counts[face] > 1 for face in solid.Faces())
+        sharing += shares_a_face
+        if (
+            abs(trsf.ScaleFactor() - 1.0) > 1e-12
+            or trsf.IsNegative()
+            or shares_a_face
+        ):
+            groups[("single", index)] = [index]
+            continue
+        fingerprint = _solid_fingerprint(solid.located(cq.Location()))
+        if tolerances is not None:
+            fingerprint = (fingerprint, tolerances[index])
+        groups.setdefault(fingerprint, []).append(index)
+
+    representatives = []
+    instances = [None] * len(solids)
+    for members in groups.values():
+        if len(members) == 1:
+            instances[members[0]] = (len(representatives), None)
+            representatives.append(solids[members[0]])
+            continue
+        for index in members:
+            trsf = solids[index].wrapped.Location().Transformation()
+            matrix = np.array(
+                [[trsf.Value(row, col) for col in range(1, 5)] for row in range(1, 4)]
+            )
+            instances[index] = (len(representatives), matrix)
+        representatives.append(solids[members[0]].located(cq.Location()))
+
+    instanced = sum(matrix is not None for _, matrix in instances)
+    print(
+        f"Instancing {instanced} of {len(solids)} solids, meshing "
+        f"{len(representatives)} solids for all of them. {sharing} solids share "
+        "a face with another solid and are meshed on their own"
+    )
+    return representatives, instances
+
+
+@_stage("tessellation")
+def _tessellate_each_solid(
+    solids, tolerance, angular_tolerance, processes=None, instancing=False
+):
+    """Tessellate solids, in this process or shared out between workers.
+
+    Solids are dealt out by face count, largest first, into a few chunks per
+    process so that no worker is left running on its own at the end. Workers
+    are started with spawn, see _imprint_in_processes, and the OpenCASCADE
+    threads are shared out evenly between them.
+
+    With instancing, each set of congruent solids is meshed once, see
+    _congruent_solids, and the vertices moved into place for the others.
+
+    tolerance is one value for all the solids or a list with one for each,
+    in which case the faces shared by solids of different tolerances are
+    meshed with the finer one, see _tessellate_solids.
+
+    Returns:
+        A (vertices, faces) pair for each solid, see _split_by_solid.
+    """
+    per_solid = isinstance(tolerance, (list, tuple, np.ndarray))
+    if instancing:
+        representatives, instances = _congruent_solids(
+            solids, list(tolerance) if per_solid else None
+        )
+        if per_solid:
+            tolerance = {
+                representative: tolerance[index]
+                for index, (representative, _) in enumerate(instances)
+            }
+            tolerance = [tolerance[index] for index in range(len(representatives))]
+        meshed = _tessellate_each_solid(
+            representatives, tolerance, angular_tolerance, processes
+        )
+        tessellations = []
+        for representative, matrix in instances:
+            vertices, faces = meshed[representative]
+            if matrix is not None:
+                vertices = vertices @ matrix[:, :3].T + matrix[:, 3]
+            tessellations.append((vertices, faces))
+        return tessellations
+
+    face_tolerances = _face_tolerances(solids, tolerance) if per_solid else None
+    if processes is None:
+        return _split_by_solid(
+            *_tessellate_solids(solids, tolerance, angular_tolerance, face_tolerances)
+        )
+
+    chunks = [[] for _ in range(min(len(solids), processes * 4))]
+    load = [0] * len(chunks)
+    for index in sorted(
+        range(len(solids)), key=lambda index: -len(solids[index].Faces())
+    ):
+        lightest = load.index(min(load))
+        chunks[lightest].append(index)
+        load[lightest] += len(solids[index].Faces())
+
+    threads = max(1, (os.cpu_count() or 1) // processes)
+    workers = min(processes, len(chunks))
+    print(f"Tessellating {len(solids)} solids in {workers} processes")
+
+    tessellations = [None] * len(solids)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context) as executor:
+        futures = {
+            executor.submit(
+                _tessellate_into_shared_memory,
+                [solids[index] for index in chunk],
+                [tolerance[index] for index in chunk] if per_solid else tolerance,
+                angular_tolerance,
+                threads,
+                [face_tolerances[index] for index in chunk] if per_solid else None,
+            ): chunk
+            for chunk in chunks
+        }
+        for future, chunk in futures.items():
+            pieces = _split_by_solid(*_read_shared_memory(*future.result()))
+            for index, piece in zip(chunk, pieces):
+                tessellations[index] = piece
+    return tessellations
+
+
+@_stage("tessellation")
+def _stitch_solids(tessellations, scale_factor=1.0):
+    """Weld the tessellations of separate solids into one mesh.
+
+    Vertices are welded by their exact coordinates, as the plugin does, the
+    way combine_tet_meshes does it, keeping them in the order they were first
+    met. Solid and face ids are counted from 1 in the order the solids and
+    their faces are given.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face) in the form the plugin gives
+        them.
+    """
+    if not tessellations:
+        return np.empty((0, 3), dtype=np.float64), {}
+
+    vertices = np.vstack([solid_vertices for solid_vertices, _ in tessellations])
+    vertices = vertices.reshape(-1, 3) * scale_factor
+    _, first_index, inverse = np.unique(
+        vertices, axis=0, return_index=True, return_inverse=True
+    )
+    keep = np.sort(first_index)
+    remap = np.empty(len(keep), dtype=np.int64)
+    remap[np.argsort(first_index)] = np.arange(len(keep))
+    remap = remap[inverse.reshape(-1)]
+
+    triangles_by_solid_by_face = {}
+    face_id = 1
+    offset = 0
+    for solid_id, (solid_vertices, faces) in enumerate(tessellations, start=1):
+        triangles_by_face = {}
+        for triangles in faces:
+            triangles_by_face[face_id] = remap[triangles + offset]
+            face_id += 1
+        triangles_by_solid_by_face[solid_id] = triangles_by_face
+        offset += len(solid_vertices)
+
+    return vertices[keep], triangles_by_solid_by_face
+
+
+def tessellate_in_processes(
+    solids: list[cq.Solid],
+    tolerance: float | list[float],
+    angular_tolerance: float,
+    scale_factor: float = 1.0,
+    processes: int = 1,
+    instancing: bool = False,
+) -> tuple[np.ndarray, dict[int, dict[int, np.ndarray]]]:
+    """Tessellate solids in worker processes and stitch the results together.
+
+    The same tessellation cadquery_direct_mesh_plugin does, with the solids
+    shared out between processes. A face shared by two imprinted solids is
+    meshed in whichever workers those solids land in, and BRepMesh gives the
+    same nodes and triangles on it each time, so welding vertices by their
+    exact coordinates makes both copies of the face index the same vertices
+    and share_coincident_face_ids can merge them.
+
+    Args:
+        solids: the solids to tessellate, already placed and imprinted if
+            they are to be.
+        tolerance: linear deflection, in the units of the unscaled solids,
+            or a list with one for each solid, see resolve_tolerances. A
+            face two solids share is then meshed with the finer of theirs.
+        angular_tolerance: angular deflection in radians.
+        scale_factor: multiplies the vertices after tessellating.
+        processes: the number of worker processes.
+        instancing: mesh solids that are one shape at several locations
+            once, and move the vertices into place for the rest. Solids
+            sharing a face with another are meshed on their own, see
+            _congruent_solids.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face) in the form the plugin gives
+        them, with solid and face ids counted from 1 in the order the solids
+        and their faces are given.
+
+    Raises:
+        TypeError: if processes is not an int.
+        ValueError: if processes is less than 1.
+    """
+    _check_positive_int("processes", processes)
+    return _stitch_solids(
+        _tessellate_each_solid(
+            solids, tolerance, angular_tolerance, processes, instancing
+        ),
+        scale_factor,
+    )
+
+
+def _tessellation_cache_filename(filename) -> Path:
+    """Where an incremental export to filename keeps its tessellations."""
+    filename = Path(filename)
+    return filename.with_name(f"{filename.name}.tessellation.npz")
+
+
+def _timings_filename(filename) -> Path:
+    """Where an export to filename writes its StageTimings."""
+    filename = Path(filename)
+    return filename.with_name(f"{filename.name}.timings.json")
+
+
+def _load_tessellations(path, tolerance, angular_tolerance) -> dict:
+    """Read the tessellations _save_tessellations wrote, by solid fingerprint.
+
+    Nothing is returned when the file is missing or was written with other
+    tolerances, as then every solid has to be meshed again anyway.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return {}
+    with np.load(path) as data:
+        if data["tolerances"].tolist() != [tolerance, angular_tolerance]:
+            return {}
+        tessellations = _split_by_solid(
+            data["vertices"],
+            data["triangles"],
+            data["vertices_per_solid"],
+            data["faces_per_solid"],
+            data["triangles_per_face"],
+        )
+        return dict(zip(data["fingerprints"].tolist(), tessellations))
+
+
+def _save_tessellations(path, fingerprints, tessellations, tolerance, angular_tolerance):
+    """Write the tessellation of each solid next to its fingerprint.
+
+    The file is written under a temporary name and moved into place, so an
+    export that is stopped part way through leaves the previous file intact.
+    """
+    path = Path(path)
+    vertices, triangles, vertices_per_solid, faces_per_solid, triangles_per_face = (
+        _join_solids(tessellations)
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f"{path.name}.tmp")
+    with open(temporary, "wb") as f:
+        np.savez(
+            f,
+            fingerprints=np.array(fingerprints, dtype=str),
+            tolerances=np.array([tolerance, angular_tolerance], dtype=np.float64),
+            vertices=vertices,
+            triangles=triangles,
+            vertices_per_solid=vertices_per_solid,
+            faces_per_solid=faces_per_solid,
+            triangles_per_face=triangles_per_face,
+        )
+    os.replace(temporary, path)
+
+
+@_stage("tessellation")
+def tessellate_incrementally(
+    solids: list[cq.Solid],
+    tolerance: float | list[float],
+    angular_tolerance: float,
+    cache_filename: str | Path,
+    scale_factor: float = 1.0,
+    processes: int | None = None,
+    instancing: bool = False,
+) -> tuple[np.ndarray, dict[int, dict[int, np.ndarray]]]:
+    """Tessellate only the solids that changed since the cache file was written.
+
+    Each solid is known by a hash of its geometry, see _solid_fingerprint,
+    and the tessellation of each is kept in cache_filename under that hash.
+    A solid whose hash is not in the file has changed, and it is meshed again
+    along with the solids whose bounding boxes touch it, so the faces on both
+    sides of a change come from the same run. Every other solid is taken from
+    the file. The file is then rewritten to hold exactly the solids given, so
+    the tessellations of removed solids are dropped from it.
+
+    A different tolerance or angular_tolerance meshes everything again. With
+    a tolerance for each solid, a solid whose tolerance changed, or that of a
+    neighbour it shares a face with, counts as changed instead. The vertices
+    are kept unscaled, so scale_factor can change freely.
+
+    Args:
+        solids: the solids to tessellate, already placed and imprinted if
+            they are to be.
+        tolerance: linear deflection, in the units of the unscaled solids,
+            or a list with one for each solid, see tessellate_in_processes.
+        angular_tolerance: angular deflection in radians.
+        cache_filename: the file to read earlier tessellations from and to
+            write the new ones to.
+        scale_factor: multiplies the vertices after tessellating.
+        processes: mesh the solids that need it in this many worker
+            processes, see tessellate_in_processes. Defaults to None which
+            meshes them in this process.
+        instancing: see tessellate_in_processes.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face) in the same form as
+        tessellate_in_processes.
+    """
+    if processes is not None:
+        _check_positive_int("processes", processes)
+
+    fingerprints = [_solid_fingerprint(solid) for solid in solids]
+    file_tolerance = tolerance
+    if isinstance(tolerance, (list, tuple, np.ndarray)):
+        # The tolerances of a solid's faces go into its key instead, and the
+        # file records -1 for a tolerance that differs between solids.
+        fingerprints = [
+            f"{fingerprint}-"
+            + hashlib.sha1(np.array(face_tolerances, dtype=np.float64).tobytes())
+            .hexdigest()[:16]
+            for fingerprint, face_tolerances in zip(
+                fingerprints, _face_tolerances(solids, tolerance)
+            )
+        ]
+        file_tolerance = -1.0
+    cached = _load_tessellations(cache_filename, file_tolerance, angular_tolerance)
+    changed = {
+        index
+        for index, fingerprint in enumerate(fingerprints)
+        if fingerprint not in cached
+    }
+
+    to_mesh = set(changed)
+    if changed and len(changed) < len(solids):
+        for i, j in _overlapping_pairs(*_bounding_boxes(solids, 1e-6)):
+            if i in changed or j in changed:
+                to_mesh.update((i, j))
+    to_mesh = sorted(to_mesh)
+
+    if not to_mesh:
+        print(
+            f"No solids have changed, reusing the tessellation of all "
+            f"{len(solids)} solids from {cache_filename}"
+        )
+    elif len(to_mesh) < len(solids):
+        print(
+            f"Meshing {len(changed)} changed solids and "
+            f"{len(to_mesh) - len(changed)} of their neighbours, reusing the "
+            f"tessellation of {len(solids) - len(to_mesh)} solids from "
+            f"{cache_filename}"
+        )
+
+    tessellations = [cached.get(fingerprint) for fingerprint in fingerprints]
+    if to_mesh:
+        meshed = _tessellate_each_solid(
+            [solids[index] for index in to_mesh],
+            tolerance,
+            angular_tolerance,
+            processes,
+            instancing,
+        )
+        for index, tessellation in zip(to_mesh, meshed):
+            tessellations[index] = tessellation
+
+    _save_tessellations(
+        cache_filename, fingerprints, tessellations, file_tolerance, angular_tolerance
+    )
+    return _stitch_solids(tessellations, scale_factor)
+
+
+@_stage("tessellation")
+def tessellate_within_budget(
+    solids: list[cq.Solid],
+    max_triangles: int,
+    tolerance: float | list[float],
+    angular_tolerance: float,
+    scale_factor: float = 1.0,
+    processes: int | None = None,
+    instancing: bool = False,
+    cache_filename: str | Path | None = None,
+    coarsen_only: bool = False,
+) -> tuple[np.ndarray, dict[int, dict[int, np.ndarray]]]:
+    """Tessellate solids into at most max_triangles triangles.
+
+    The tolerances are all multiplied by one factor, so a tolerance for each
+    solid keeps the proportions between them. The factor is solved for from
+    an estimate built on a few coarse tessellations, see _triangle_estimate,
+    and the solids are tessellated once with it. If the estimate was low and
+    the result is over budget, the estimate is scaled to the count it missed
+    by and the solids tessellated again, which rarely takes more than one
+    more try. Faces two solids share are counted once, as they are written.
+
+    Args:
+        solids: the solids to tessellate, already placed and imprinted if
+            they are to be.
+        max_triangles: the most triangles the tessellation may have.
+        tolerance: linear deflection, in the units of the unscaled solids, or
+            a list with one for each solid, see tessellate_in_processes.
+        angular_tolerance: angular deflection in radians.
+        scale_factor: multiplies the vertices after tessellating.
+        processes: see tessellate_incrementally.
+        instancing: see tessellate_in_processes.
+        cache_filename: tessellate incrementally with this file, see
+            tessellate_incrementally. Defaults to None, which does not.
+        coarsen_only: never make the tolerances finer than given, even when
+            the budget would allow it.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face) in the same form as
+        tessellate_in_processes.
+
+    Raises:
+        TypeError: if max_triangles is not an int.
+        ValueError: if max_triangles is less than 1, or cannot be met with
+            angular_tolerance.
+    """
+    _check_positive_int("max_triangles", max_triangles)
+    if processes is not None:
+        _check_positive_int("processes", processes)
+
+    estimate, bounds = _triangle_estimate(
+        solids, tolerance, angular_tolerance, max_triangles, coarsen_only
+    )
+    unique = _first_faces(solids)
+    calibration = 1.0
+    for _ in range(4):
+        factor = _budget_factor(
+            lambda factor: calibration * estimate(factor), bounds, max_triangles
+        )
+        if coarsen_only:
+            factor = max(factor, 1.0)
+        if isinstance(tolerance, (list, tuple, np.ndarray)):
+            scaled_tolerance = [value * factor for value in tolerance]
+            described = f"the tolerances multiplied by {factor:.4g}"
+        else:
+            scaled_tolerance = tolerance * factor
+            described = f"tolerance={scaled_tolerance * scale_factor:.4g}"
+        print(
+            f"Tessellating with {described}, estimated to give "
+            f"{int(calibration * estimate(factor))} of "
+            f"max_triangles={max_triangles} triangles"
+        )
+
+        _clean_triangulations(solids)
+        if cache_filename is not None:
+            vertices, triangles_by_solid_by_face = tessellate_incrementally(
+                solids,
+                scaled_tolerance,
+                angular_tolerance,
+                cache_filename,
+                scale_factor,
+                processes,
+                instancing,
+            )
+        else:
+            vertices, triangles_by_solid_by_face = _stitch_solids(
+                _tessellate_each_solid(
+                    solids, scaled_tolerance, angular_tolerance, processes, instancing
+                ),
+                scale_factor,
+            )
+
+        # face ids count from 1 through the faces of the solids in turn
+        triangles = [
+            len(triangles)
+            for faces in triangles_by_solid_by_face.values()
+            for triangles in faces.values()
+        ]
+        count = int(np.array(triangles, dtype=np.int64)[unique].sum())
+        if count <= max_triangles:
+            break
+        print(f"Tessellating again, {count} triangles is over budget")
+        # a little under, as the count moves in steps near the budget
+        calibration = 1.02 * count / estimate(factor)
+    else:
+        warnings.warn(
+            f"The tessellation has {count} triangles, more than "
+            f"max_triangles={max_triangles}"
+        )
+    return vertices, triangles_by_solid_by_face
+
+
+@_stage("share_coincident_face_ids")
+def share_coincident_face_ids(triangles_by_solid_by_face):
+    """Give the face two touching solids share a single id in both of them.
+
+    Imprinting leaves one face between two touching solids, but
+    cadquery_direct_mesh_plugin numbers faces per solid, so depending on the
+    installed version each solid can contribute its own id for that one face.
+    Writing both produces two coincident one sided DAGMC surfaces instead of
+    one surface carrying a sense for each volume, which does not transport
+    correctly: particles crossing the interface are not handed to the
+    neighbouring volume, and the flux tallied there comes out low with nothing
+    reported.
+
+    The plugin welds vertices across the whole assembly, so both copies of the
+    interface index the same vertices and differ only in winding. Keying on the
+    triangle set with each triangle sorted is therefore orientation insensitive
+    and identifies the copies. Only the ids are rewritten. Each solid keeps its
+    own winding under the shared id, which is what vertices_to_h5m expects: it
+    writes the surface once from the first solid that refers to it and reads
+    the second solid off the shared id to build GEOM_SENSE_2.
+
+    Ids are handed out from 1 in order of first appearance rather than the
+    plugin's original ids being kept. Merging without renumbering would leave
+    the ids of the dropped copies unused, so the highest surface id would stay
+    as high as the unmerged count. Those ids become DAGMC surface ids, and a
+    DAGMC universe embedded in CSG shares an id space with the CSG surfaces, so
+    an inflated range collides with them ("Surface ID 21 exists in both
+    Universe 3 and the CSG geometry"). Renumbering also matches what gmsh and
+    cad-to-dagmc-mesher produce.
+
+    This reproduces what the plugin does when it shares imprinted face ids
+    itself (jmwright/cadquery-direct-mesh-plugin#10), including the numbering.
+    It is idempotent, so it is a no-op against a plugin that already shares
+    them. Once that pull request is released AND the
+    cadquery_direct_mesh_plugin floor in pyproject.toml is raised to that
+    release, this function and its call can be removed. Removing it before the
+    floor is raised would reintroduce the bug for anyone on an older plugin.
+
+    Args:
+        triangles_by_solid_by_face: Dict mapping solid_id -> face_id -> list of
+            triangles, each triangle a list of vertex indices.
+
+    Returns:
+        The same mapping with coincident faces sharing one face id, and ids
+        renumbered contiguously from 1.
+
+    Raises:
+        ValueError: if a face is shared by more than two solids, or if one
+            solid carries the same face twice. Neither is representable as
+            DAGMC geometry, and vertices_to_h5m would silently write a wrong
+            sense rather than fail.
+    """
+
+    def canonical(triangles):
+        return frozenset(tuple(sorted(int(vertex) for vertex in triangle))
+                         for triangle in triangles)
+
+    id_by_key = {}
+    solid_ids_by_key = {}
+    remapped = {}
+    for solid_id, faces in triangles_by_solid_by_face.items():
+        shared_faces = {}
+        for triangles in faces.values():
+            key = canonical(triangles)
+            solid_ids_by_key.setdefault(key, []).append(solid_id)
+            if key not in id_by_key:
+                id_by_key[key] = len(id_by_key) + 1
+            shared_faces[id_by_key[key]] = triangles
+        remapped[solid_id] = shared_faces
+
+    for key, solid_ids in solid_ids_by_key.items():
+        if len(solid_ids) != len(set(solid_ids)):
+            msg = (
+                f"Solid {solid_ids[0]} has the same face twice, so it cannot be "
+                "written as DAGMC geometry. This points at a degenerate or zero "
+                "thickness feature in the CAD."
+            )
+            raise ValueError(msg)
+        if len(solid_ids) > 2:
+            msg = (
+                f"The face with id {id_by_key[key]} is shared by solids "
+                f"{sorted(solid_ids)}. A DAGMC surface separates at most two "
+                "volumes, so this points at overlapping solids in the CAD."
+            )
+            raise ValueError(msg)
+
+    return remapped
+
+
+def _rotation_matrix(axis, angle):
+    """The (3, 3) matrix of a right handed rotation by angle about axis."""
+    x, y, z = np.asarray(axis, dtype=np.float64) / np.linalg.norm(axis)
+    cross = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    return (
+        np.eye(3)
+        + np.sin(angle) * cross
+        + (1.0 - np.cos(angle)) * (cross @ cross)
+    )
+
+
+def _nearest(points, targets, tolerance):
+    """Index of and distance to the nearest of targets for each of points.
+
+    Only targets within tolerance of a point are sure to be found: both sets
+    are snapped to a grid of cells a few tolerances wide and matched by
+    sorted cell, looking in the neighbouring cell along each axis on which a
+    point lies near the edge of its own. A point with no target found gets a
+    distance of inf.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+    index = np.zeros(len(points), dtype=np.int64)
+    distance = np.full(len(points), np.inf)
+    if not len(points) or not len(targets):
+        return index, distance
+
+    size = 8.0 * tolerance
+    origin = np.minimum(points.min(axis=0), targets.min(axis=0))
+    scaled = (points - origin) / size
+    point_cells = np.floor(scaled).astype(np.int64)
+    target_cells = np.floor((targets - origin) / size).astype(np.int64)
+    offset_in_cell = (scaled - point_cells) * size
+    near_low = offset_in_cell <= 1.5 * tolerance
+    near_high = size - offset_in_cell <= 1.5 * tolerance
+
+    query_points = []
+    query_cells = []
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        mask = np.ones(len(points), dtype=bool)
+        for axis, step in enumerate(offset):
+            if step == -1:
+                mask &= near_low[:, axis]
+            elif step == 1:
+                mask &= near_high[:, axis]
+        query_points.append(np.flatnonzero(mask))
+        query_cells.append(point_cells[mask] + offset)
+    query_points = np.concatenate(query_points)
+    query_cells = np.concatenate(query_cells)
+
+    # number the cells in use so that each is looked up as one integer
+    _, cell_ids = np.unique(
+        np.vstack([target_cells, query_cells]), axis=0, return_inverse=True
+    )
+    cell_ids = cell_ids.reshape(-1)
+    target_ids = cell_ids[: len(targets)]
+    query_ids = cell_ids[len(targets) :]
+    order = np.argsort(target_ids, kind="stable")
+    sorted_ids = target_ids[order]
+    first = np.searchsorted(sorted_ids, query_ids, side="left")
+    counts = np.searchsorted(sorted_ids, query_ids, side="right") - first
+
+    # every pair of a point and a target in a cell it looked in
+    pair_points = np.repeat(query_points, counts)
+    starts = np.repeat(first - np.cumsum(counts) + counts, counts)
+    pair_targets = order[starts + np.arange(counts.sum())]
+    pair_distance = np.linalg.norm(
+        points[pair_points] - targets[pair_targets], axis=1
+    )
+    nearest_first = np.lexsort((pair_distance, pair_points))
+    pair_points = pair_points[nearest_first]
+    keep = np.ones(len(pair_points), dtype=bool)
+    keep[1:] = pair_points[1:] != pair_points[:-1]
+    index[pair_points[keep]] = pair_targets[nearest_first][keep]
+    distance[pair_points[keep]] = pair_distance[nearest_first][keep]
+    return index, distance
+
+
+def _check_symmetry_order(symmetry_order):
+    _check_positive_int("symmetry_order", symmetry_order)
+    if symmetry_order < 2:
+        raise ValueError(
+            f"symmetry_order={symmetry_order} is not valid, it must be 2 or more."
+        )
+
+
+def replicate_sector(
+    vertices,
+    triangles_by_solid_by_face: dict[int, dict[int, list[list[int]]]],
+    material_tags: list[str],
+    symmetry_order: int,
+    symmetry_axis: tuple[float, float, float] = (0.0, 0.0, 1.0),
+):
+    """Build the surface mesh of a whole machine from the mesh of one sector.
+
+    The sector is rotated about symmetry_axis, which passes through the
+    origin, by each multiple of 360 / symmetry_order degrees. Its cut faces,
+    the faces lying in the two half planes that bound it, have to match:
+    turning the start plane by one sector must bring its faces onto those of
+    the end plane, vertex for vertex. The end plane faces of each copy are
+    then dropped in favour of the start plane faces of the next copy, which
+    become one surface between the two, and the vertices on the cut planes
+    are welded by index, so the result is watertight across sectors without
+    depending on rotated coordinates agreeing to the last bit. A solid cut by
+    the planes ends up as one volume per sector.
+
+    Args:
+        vertices: the (x, y, z) coordinates of the sector mesh.
+        triangles_by_solid_by_face: Dict mapping solid_id -> face_id -> list
+            of triangles of the sector, with shared faces under one id as
+            share_coincident_face_ids leaves them.
+        material_tags: the material tag of each solid of the sector.
+        symmetry_order: the number of sectors in the whole machine.
+        symmetry_axis: the direction of the axis of symmetry.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face, material_tags) of the whole
+        machine. Copy k of sector solid i is solid k * len(material_tags) + i,
+        and face ids are renumbered contiguously from 1.
+
+    Raises:
+        ValueError: if the sector spans more than 360 / symmetry_order
+            degrees, or its cut faces do not match.
+    """
+    _check_symmetry_order(symmetry_order)
+    if len(material_tags) != len(triangles_by_solid_by_face):
+        raise ValueError(
+            f"The number of material_tags provided is {len(material_tags)} and "
+            f"the number of sets of triangles is {len(triangles_by_solid_by_face)}"
+        )
+
+    if len(vertices) and hasattr(vertices[0], "x"):
+        vertices = [(vertex.x, vertex.y, vertex.z) for vertex in vertices]
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    faces = {
+        solid_id: {
+            face_id: np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+            for face_id, triangles in solid_faces.items()
+        }
+        for solid_id, solid_faces in triangles_by_solid_by_face.items()
+    }
+
+    axis = np.asarray(symmetry_axis, dtype=np.float64)
+    axis = axis / np.linalg.norm(axis)
+    sector_angle = 2.0 * np.pi / symmetry_order
+    extent = np.ptp(vertices, axis=0).max() if len(vertices) else 0.0
+    tolerance = 1e-6 * max(extent, 1.0)
+
+    # Angles about the axis, measured from the middle of the sector so that
+    # they do not wrap around inside it.
+    u = np.cross(axis, [1.0, 0.0, 0.0])
+    if np.linalg.norm(u) < 0.1:
+        u = np.cross(axis, [0.0, 1.0, 0.0])
+    u = u / np.linalg.norm(u)
+    w = np.cross(axis, u)
+    radial = vertices - np.outer(vertices @ axis, axis)
+    off_axis = np.linalg.norm(radial, axis=1) > tolerance
+    angles = np.arctan2(radial @ w, radial @ u)
+    middle = np.arctan2(
+        np.sin(angles[off_axis]).sum(), np.cos(angles[off_axis]).sum()
+    )
+    relative = (angles - middle + np.pi) % (2.0 * np.pi) - np.pi
+    low = relative[off_axis].min() if off_axis.any() else 0.0
+    span = relative[off_axis].max() - low if off_axis.any() else 0.0
+    if span > sector_angle + 1e-6:
+        raise ValueError(
+            f"The sector spans {np.degrees(span):.6g} degrees about the axis "
+            f"{tuple(axis)}, more than the {360 / symmetry_order:.6g} degrees "
+            f"of one of {symmetry_order} sectors"
+        )
+
+    def on_half_plane(angle):
+        direction = np.cos(middle + angle) * u + np.sin(middle + angle) * w
+        normal = np.cross(axis, direction)
+        return (np.abs(vertices @ normal) <= tolerance) & (
+            vertices @ direction >= -tolerance
+        )
+
+    on_start = on_half_plane(low)
+    on_end = on_half_plane(low + sector_angle)
+
+    start_faces = {}
+    end_faces = {}
+    for solid_id, solid_faces in faces.items():
+        for face_id, triangles in solid_faces.items():
+            if not len(triangles):
+                continue
+            if on_start[triangles].all():
+                start_faces[face_id] = solid_id
+            elif on_end[triangles].all():
+                end_faces[face_id] = solid_id
+
+    # Each vertex of an end face is the vertex of a start face of the next
+    # sector that the rotation brings onto it.
+    rotation = _rotation_matrix(axis, sector_angle)
+    start_vertices = np.unique(
+        np.concatenate(
+            [faces[solid_id][face_id].ravel() for face_id, solid_id in start_faces.items()]
+            or [np.empty(0, dtype=np.int64)]
+        )
+    )
+    end_vertices = np.unique(
+        np.concatenate(
+            [faces[solid_id][face_id].ravel() for face_id, solid_id in end_faces.items()]
+            or [np.empty(0, dtype=np.int64)]
+        )
+    )
+    match = {}
+    if len(end_vertices):
+        if not len(start_vertices):
+            raise ValueError(
+                "The sector has faces on its end plane but none on its start "
+                "plane, so the sectors cannot be joined"
+            )
+        nearest, distance = _nearest(
+            vertices[end_vertices], vertices[start_vertices] @ rotation.T, tolerance
+        )
+        if (distance > tolerance).any() or len(start_vertices) != len(end_vertices):
+            raise ValueError(
+                "The cut faces of the sector were not meshed alike on its two "
+                f"planes: {int((distance > tolerance).sum())} of the "
+                f"{len(end_vertices)} vertices on the end plane have no vertex "
+                "of the start plane turned onto them, and the start plane has "
+                f"{len(start_vertices)} vertices. Cut the sector so that its "
+                "two sides are the same geometry"
+            )
+        match = dict(zip(end_vertices.tolist(), start_vertices[nearest].tolist()))
+
+    start_face_by_vertices = {
+        frozenset(faces[solid_id][face_id].ravel().tolist()): face_id
+        for face_id, solid_id in start_faces.items()
+    }
+    next_start_face = {}
+    for face_id, solid_id in end_faces.items():
+        key = frozenset(match[vertex] for vertex in faces[solid_id][face_id].ravel().tolist())
+        if key not in start_face_by_vertices:
+            raise ValueError(
+                f"Face {face_id} on the end plane of the sector has no face on "
+                "the start plane that the rotation brings onto it"
+            )
+        next_start_face[face_id] = start_face_by_vertices[key]
+    if len(next_start_face) != len(start_faces):
+        raise ValueError(
+            f"The sector has {len(start_faces)} faces on its start plane and "
+            f"{len(end_faces)} on its end plane, so the sectors cannot be joined"
+        )
+
+    # Weld each end plane vertex to the start plane vertex of the next copy,
+    # following chains for the vertices on the axis, which are on both.
+    count = len(vertices)
+    labels = np.arange(symmetry_order * count)
+    if match:
+        end = np.array(list(match), dtype=np.int64)
+        start = np.array(list(match.values()), dtype=np.int64)
+        copies = np.arange(symmetry_order)[:, None]
+        a = (copies * count + end).ravel()
+        b = (((copies + 1) % symmetry_order) * count + start).ravel()
+        while True:
+            lowest = np.minimum(labels[a], labels[b])
+            if (labels[a] == lowest).all() and (labels[b] == lowest).all():
+                break
+            np.minimum.at(labels, a, lowest)
+            np.minimum.at(labels, b, lowest)
+            labels = labels[labels]
+    kept, index = np.unique(labels, return_inverse=True)
+    index = index.reshape(-1)
+
+    all_vertices = np.vstack(
+        [
+            vertices @ _rotation_matrix(axis, copy * sector_angle).T
+            for copy in range(symmetry_order)
+        ]
+    )[kept]
+
+    face_ids = {}
+    all_triangles = {}
+    for copy in range(symmetry_order):
+        for position, (solid_id, solid_faces) in enumerate(faces.items()):
+            triangles_by_face = {}
+            for face_id, triangles in solid_faces.items():
+                face_copy = copy
+                if face_id in next_start_face:
+                    face_copy = (copy + 1) % symmetry_order
+                    face_id = next_start_face[face_id]
+                    triangles = faces[start_faces[face_id]][face_id][:, ::-1]
+                key = (face_copy, face_id)
+                if key not in face_ids:
+                    face_ids[key] = len(face_ids) + 1
+                triangles_by_face[face_ids[key]] = index[triangles + face_copy * count]
+            all_triangles[copy * len(faces) + position + 1] = triangles_by_face
+
+    print(
+        f"Replicated {len(faces)} solids of one sector into {len(all_triangles)} "
+        f"solids of {symmetry_order} sectors"
+    )
+    return all_vertices, all_triangles, list(material_tags) * symmetry_order
+
+
+def _check_decimation_tolerance(tolerance):
+    """Raise unless tolerance is a number greater than 0.
+
+    bool is a subclass of int, so it is tested for first as in
+    _check_positive_int.
+
+    Raises:
+        TypeError: if tolerance is not an int or float, or is a bool.
+        ValueError: if tolerance is not greater than 0.
+    """
+    if isinstance(tolerance, bool) or not isinstance(tolerance, (int, float)):
+        raise TypeError(
+            "decimation_tolerance must be a positive number, got "
+            f"{type(tolerance).__name__}."
+        )
+    if not tolerance > 0:
+        raise ValueError(
+            f"decimation_tolerance={tolerance!r} is not valid, it must be a "
+            "positive number."
+        )
+
+
+def _boundary_loops(triangles):
+    """The loops of edges of a face that only one of its triangles uses, each
+    in the direction the face winds it, or None when a vertex is on two."""
+    edges = set()
+    for a, b, c in triangles.tolist():
+        edges.update(((a, b), (b, c), (c, a)))
+    following = {}
+    for a, b in edges:
+        if (b, a) not in edges:
+            if a in following:
+                return None
+            following[a] = b
+    loops = []
+    while following:
+        start, vertex = following.popitem()
+        loop = [start]
+        while vertex != start:
+            loop.append(vertex)
+            vertex = following.pop(vertex, None)
+            if vertex is None:
+                return None
+        loops.append(loop)
+    return loops
+
+
+def _in_triangle(points, a, b, c):
+    """Which of the 2D points are inside or on the triangle a, b, c."""
+    sides = [
+        (q[0] - p[0]) * (points[:, 1] - p[1]) - (q[1] - p[1]) * (points[:, 0] - p[0])
+        for p, q in ((a, b), (b, c), (c, a))
+    ]
+    return ((sides[0] >= 0) & (sides[1] >= 0) & (sides[2] >= 0)) | (
+        (sides[0] <= 0) & (sides[1] <= 0) & (sides[2] <= 0)
+    )
+
+
+def _bridge_holes(xy, outer, holes):
+    """Join each hole to the outer loop by a pair of coincident edges, so
+    that the face becomes one polygon to be ear clipped.
+
+    Holes are joined from the one reaching furthest along x, each from its
+    vertex furthest along x to a vertex of the polygon it can see in that
+    direction (David Eberly, Triangulation by Ear Clipping).
+    """
+    polygon = list(outer)
+    for hole in sorted(holes, key=lambda hole: -xy[hole, 0].max()):
+        start = int(np.argmax(xy[hole, 0]))
+        hole = hole[start:] + hole[:start]
+        mx, my = xy[hole[0]]
+        ring = np.array(polygon)
+        a = xy[ring]
+        b = xy[np.roll(ring, -1)]
+        before = xy[np.roll(ring, 1)]
+
+        # the nearest point along a ray from the hole towards +x where it
+        # meets the polygon, at a vertex or crossing an edge
+        crossing = ((a[:, 1] > my) & (b[:, 1] < my)) | (
+            (a[:, 1] < my) & (b[:, 1] > my)
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = a[:, 0] + (my - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+        x = np.where(crossing & (x >= mx), x, np.inf)
+        at_vertex = np.where((a[:, 1] == my) & (a[:, 0] >= mx), a[:, 0], np.inf)
+        edge = int(np.argmin(x))
+        target = int(np.argmin(at_vertex))
+        if not min(x[edge], at_vertex[target]) < np.inf:
+            return None
+        if x[edge] < at_vertex[target]:
+            target = edge if a[edge, 0] >= b[edge, 0] else (edge + 1) % len(ring)
+            # a reflex vertex inside the triangle from the hole to the
+            # crossing and on to target would hide target, and the one at
+            # the smallest angle to the ray is then visible instead
+            reflex = (
+                (a[:, 0] - before[:, 0]) * (b[:, 1] - a[:, 1])
+                - (a[:, 1] - before[:, 1]) * (b[:, 0] - a[:, 0])
+            ) < 0
+            hidden = (
+                reflex
+                & _in_triangle(a, (mx, my), (x[edge], my), a[target])
+                & (ring != ring[target])
+                & (a[:, 0] > mx)
+            )
+            if hidden.any():
+                candidates = np.flatnonzero(hidden)
+                offset = a[candidates] - (mx, my)
+                target = candidates[
+                    np.lexsort(
+                        (np.hypot(*offset.T), np.abs(offset[:, 1]) / offset[:, 0])
+                    )[0]
+                ]
+
+        # a vertex where an earlier hole was joined is in the polygon twice,
+        # and the hole has to join the one whose corner faces it
+        for position in np.flatnonzero(ring == ring[target]):
+            dx, dy = mx - a[position, 0], my - a[position, 1]
+            nx, ny = b[position] - a[position]
+            px, py = before[position] - a[position]
+            into = nx * dy - ny * dx > 0
+            out_of = dx * py - dy * px > 0
+            if (into and out_of) if nx * py - ny * px > 0 else (into or out_of):
+                target = position
+                break
+        polygon[target + 1 : target + 1] = hole + [hole[0], polygon[target]]
+    return polygon
+
+
+def _ear_clip(xy, polygon):
+    """Triangles of a counter clockwise polygon, given as indices into xy
+    that may repeat where holes were bridged, or None if it cannot be
+    clipped."""
+    count = len(polygon)
+    ids = np.array(polygon)
+    corners = xy[ids]
+    scale = np.ptp(corners, axis=0).max()
+    following = list(range(1, count)) + [0]
+    preceding = [count - 1] + list(range(count - 1))
+    alive = np.ones(count, dtype=bool)
+
+    def is_ear(p, i, q):
+        a, b, c = corners[p], corners[i], corners[q]
+        cross = (b[0] - a[0]) * (c[1] - b[1]) - (b[1] - a[1]) * (c[0] - b[0])
+        if cross <= 1e-10 * scale * scale:
+            return False
+        # no other vertex may be inside the ear or on its edges
+        others = alive & ~np.isin(ids, (ids[p], ids[i], ids[q]))
+        return not _in_triangle(corners[others], a, b, c).any()
+
+    triangles = []
+    remaining = count
+    position = 0
+    stalled = 0
+    while remaining > 3:
+        p, q = preceding[position], following[position]
+        if is_ear(p, position, q):
+            triangles.append((ids[p], ids[position], ids[q]))
+            following[p] = q
+            preceding[q] = p
+            alive[position] = False
+            remaining -= 1
+            position = p
+            stalled = 0
+        else:
+            position = q
+            stalled += 1
+            if stalled > remaining:
+                return None
+    triangles.append(
+        (ids[preceding[position]], ids[position], ids[following[position]])
+    )
+    return np.array(triangles, dtype=np.int64)
+
+
+def _planar_triangulation(points, triangles):
+    """The fewest triangles spanning the boundary of a planar face.
+
+    The face is triangulated afresh from the loops of vertices along its
+    boundary, by ear clipping with the holes bridged to the outer loop, so
+    whatever meets the face along its boundary still matches it.
+
+    Args:
+        points: the (n, 3) coordinates of all the vertices.
+        triangles: the (m, 3) vertex indices of the triangles of the face.
+
+    Returns:
+        The (k, 3) vertex indices of the new triangles, or None when the
+        face is not planar, already has no vertices inside it, or its
+        boundary is not one outer loop around any holes.
+    """
+    corners = points[triangles]
+    area = np.cross(
+        corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    ).sum(axis=0)
+    if not np.linalg.norm(area) > 0:
+        return None
+    normal = area / np.linalg.norm(area)
+    used = np.unique(triangles)
+    extent = np.ptp(points[used], axis=0).max()
+    if np.abs((points[used] - points[used[0]]) @ normal).max() > 1e-9 * extent:
+        return None
+
+    loops = _boundary_loops(triangles)
+    if loops is None or sum(len(loop) for loop in loops) == len(used):
+        return None
+    across = np.cross(normal, np.eye(3)[np.argmin(np.abs(normal))])
+    across /= np.linalg.norm(across)
+    xy = np.zeros((len(points), 2))
+    xy[used] = points[used] @ np.array([across, np.cross(normal, across)]).T
+
+    def signed_area(loop):
+        x, y = xy[loop].T
+        return (x * np.roll(y, -1) - np.roll(x, -1) * y).sum() / 2
+
+    outer = [loop for loop in loops if signed_area(loop) > 0]
+    if len(outer) != 1:
+        return None
+    polygon = _bridge_holes(
+        xy, outer[0], [loop for loop in loops if loop is not outer[0]]
+    )
+    if polygon is None:
+        return None
+    return _ear_clip(xy, polygon)
+
+
+def _decimate_face(points, triangles, fixed, max_deviation):
+    """Collapse the vertices inside one face onto their neighbours.
+
+    Vertices on the boundary of the face and those in the fixed mask are
+    never removed, so whatever meets the face along its boundary still
+    matches it. Each collapse is chosen by the distance of the removed
+    vertex from the planes of the triangles replacing its fan, added to the
+    distance the triangles around it have already moved, and collapses are
+    made cheapest first while that stays within max_deviation. That sum is
+    an estimate of how far the surface moves, not a bound on the Hausdorff
+    distance between the two meshes: a point between the vertices can end
+    up a little further away than the removed vertices do.
+
+    This runs in plain Python, at around 150 microseconds for each triangle
+    of the face, so decimate_surface can share faces out between processes.
+
+    Args:
+        points: the (n, 3) coordinates of all the vertices.
+        triangles: the (m, 3) vertex indices of the triangles of the face.
+        fixed: a boolean mask over points of vertices that may not be removed.
+        max_deviation: the furthest the surface may move, as estimated.
+
+    Returns:
+        The (k, 3) vertex indices of the decimated triangles, k <= m.
+    """
+    triangles = [list(triangle) for triangle in np.asarray(triangles).tolist()]
+    alive = [True] * len(triangles)
+    deviation = [0.0] * len(triangles)
+    triangles_of = {}
+    edge_uses = {}
+    for index, triangle in enumerate(triangles):
+        for position in range(3):
+            triangles_of.setdefault(triangle[position], set()).add(index)
+            edge = tuple(sorted((triangle[position], triangle[position - 1])))
+            edge_uses[edge] = edge_uses.get(edge, 0) + 1
+    on_boundary = {
+        vertex for edge, uses in edge_uses.items() if uses != 2 for vertex in edge
+    }
+    free = {
+        vertex
+        for vertex in triangles_of
+        if vertex not in on_boundary and not fixed[vertex]
+    }
+
+    coordinates = dict(
+        zip(triangles_of, points[list(triangles_of)].tolist())
+    )
+
+    def ring(vertex):
+        """The neighbours of vertex in order around it, or None when its
+        triangles do not make a disc around it."""
+        following = {}
+        for index in triangles_of[vertex]:
+            triangle = triangles[index]
+            position = triangle.index(vertex)
+            following[triangle[position - 2]] = triangle[position - 1]
+        start = next(iter(following))
+        order = [start]
+        while following.get(order[-1], start) != start:
+            order.append(following[order[-1]])
+            if len(order) > len(following):
+                return None
+        return order if len(order) == len(following) else None
+
+    def links(neighbours, target):
+        """Whether collapsing onto target, one of neighbours, only makes
+        edges that do not already exist other than those of the two
+        triangles it removes (the link condition)."""
+        position = neighbours.index(target)
+        shared = {
+            other for index in triangles_of[target] for other in triangles[index]
+        }.intersection(neighbours)
+        return shared == {
+            neighbours[position - 1],
+            target,
+            neighbours[(position + 1) % len(neighbours)],
+        }
+
+    def best_collapse(vertex):
+        neighbours = ring(vertex)
+        if neighbours is None or len(neighbours) < 3:
+            return None
+        count = len(neighbours)
+        worst = max(deviation[index] for index in triangles_of[vertex])
+        vx, vy, vz = coordinates[vertex]
+        # fan triangle i is (vertex, neighbour i, neighbour i + 1), plain
+        # floats being much quicker than numpy on a handful of triangles
+        fan = []
+        for position in range(count):
+            a, b = neighbours[position], neighbours[(position + 1) % count]
+            (ax, ay, az), (bx, by, bz) = coordinates[a], coordinates[b]
+            ux, uy, uz = ax - vx, ay - vy, az - vz
+            wx, wy, wz = bx - vx, by - vy, bz - vz
+            normal = (uy * wz - uz * wy, uz * wx - ux * wz, ux * wy - uy * wx)
+            fan.append((a, b, normal, sum(n * n for n in normal) ** 0.5))
+
+        best = None
+        for target in neighbours:
+            tx, ty, tz = coordinates[target]
+            cost = worst
+            for a, b, (mx, my, mz), before in fan:
+                if target == a or target == b:
+                    continue
+                (ax, ay, az), (bx, by, bz) = coordinates[a], coordinates[b]
+                ux, uy, uz = ax - tx, ay - ty, az - tz
+                wx, wy, wz = bx - tx, by - ty, bz - tz
+                nx, ny, nz = uy * wz - uz * wy, uz * wx - ux * wz, ux * wy - uy * wx
+                after = (nx * nx + ny * ny + nz * nz) ** 0.5
+                # a folded or degenerate triangle is never acceptable
+                if after <= 1e-12 * before or (
+                    nx * mx + ny * my + nz * mz <= 0.5 * before * after
+                ):
+                    break
+                cost = max(
+                    cost,
+                    worst
+                    + abs((vx - tx) * nx + (vy - ty) * ny + (vz - tz) * nz) / after,
+                )
+                if cost > max_deviation or (best is not None and cost >= best[0]):
+                    break
+            else:
+                if links(neighbours, target):
+                    best = (cost, target)
+        return best
+
+    # Collapses are queued by cost and only worked out again when they are
+    # popped after a collapse next to them has changed their fan, which is
+    # far cheaper than working out every neighbour again after each
+    # collapse. A collapse removes a vertex without moving any, so its cost
+    # depends on its fan alone, but the link condition also depends on the
+    # fan of the target and is checked again before the collapse is made.
+    queue = []
+    queued = set()
+    changed = set()
+
+    def push(vertex):
+        collapse = best_collapse(vertex)
+        if collapse is not None:
+            heapq.heappush(queue, (collapse[0], vertex, collapse[1]))
+            queued.add(vertex)
+
+    for vertex in free:
+        push(vertex)
+    while queue:
+        cost, vertex, target = heapq.heappop(queue)
+        queued.discard(vertex)
+        if vertex in changed or not links(ring(vertex), target):
+            changed.discard(vertex)
+            push(vertex)
+            continue
+        for index in triangles_of.pop(vertex):
+            triangle = triangles[index]
+            if target in triangle:
+                alive[index] = False
+                for other in triangle:
+                    if other != vertex:
+                        triangles_of[other].discard(index)
+            else:
+                triangle[triangle.index(vertex)] = target
+                deviation[index] = cost
+                triangles_of[target].add(index)
+        free.discard(vertex)
+        nearby = {
+            other for index in triangles_of[target] for other in triangles[index]
+        }
+        for other in nearby & free:
+            changed.add(other)
+            if other not in queued:
+                heapq.heappush(queue, (cost, other, None))
+                queued.add(other)
+
+    return np.array(
+        [triangle for triangle, kept in zip(triangles, alive) if kept],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+
+
+def _remesh_in_worker(remesh, points, faces, fixed):
+    """Mesh the faces of one chunk again in a worker process of
+    _remesh_faces, with points holding only the vertices they use."""
+    return {
+        face_id: remesh(points, triangles, fixed)
+        for face_id, triangles in faces.items()
+    }
+
+
+def _remesh_faces(vertices, triangles_by_solid_by_face, remesh, processes=None):
+    """Mesh each face again with remesh, once for a face two solids share.
+
+    Args:
+        vertices: the (x, y, z) coordinates of the mesh.
+        triangles_by_solid_by_face: Dict mapping solid_id -> face_id -> list
+            of triangles, with shared faces under one id as
+            share_coincident_face_ids leaves them.
+        remesh: called with the (n, 3) coordinates, the (m, 3) triangles of
+            a face and a boolean mask of the vertices on more than one face,
+            and returning the new triangles of the face. It has to be
+            picklable when processes is given.
+        processes: share the faces out between this many worker processes,
+            in chunks of about the same number of triangles. Defaults to
+            None, remeshing them in this process.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face, before, after) where before
+        and after map each face id to its triangles as given and as
+        remeshed. Vertices no longer used by any triangle are dropped and
+        the others renumbered.
+    """
+    if len(vertices) and hasattr(vertices[0], "x"):
+        vertices = [(vertex.x, vertex.y, vertex.z) for vertex in vertices]
+    points = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+
+    faces = {}
+    for solid_faces in triangles_by_solid_by_face.values():
+        for face_id, triangles in solid_faces.items():
+            if face_id not in faces:
+                faces[face_id] = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+    # a vertex on more than one face is on a boundary between them
+    faces_using = np.zeros(len(points), dtype=np.int64)
+    for triangles in faces.values():
+        faces_using[np.unique(triangles)] += 1
+    fixed = faces_using > 1
+
+    if processes is None:
+        remeshed = _remesh_in_worker(remesh, points, faces, fixed)
+    else:
+        chunks = [[] for _ in range(min(len(faces), processes * 4))]
+        load = [0] * len(chunks)
+        for face_id in sorted(faces, key=lambda face_id: -len(faces[face_id])):
+            lightest = load.index(min(load))
+            chunks[lightest].append(face_id)
+            load[lightest] += len(faces[face_id])
+        workers = min(processes, len(chunks))
+        print(f"Remeshing {len(faces)} faces in {workers} processes")
+
+        remeshed = {}
+        # spawn, as for tessellate_in_processes
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=max(1, workers), mp_context=context
+        ) as executor:
+            futures = {}
+            for chunk in chunks:
+                # each worker is sent only the vertices its faces use
+                used = np.unique(np.concatenate([faces[face_id].ravel() for face_id in chunk]))
+                local = np.full(len(points), -1, dtype=np.int64)
+                local[used] = np.arange(len(used))
+                future = executor.submit(
+                    _remesh_in_worker,
+                    remesh,
+                    points[used],
+                    {face_id: local[faces[face_id]] for face_id in chunk},
+                    fixed[used],
+                )
+                futures[future] = used
+            for future, used in futures.items():
+                for face_id, triangles in future.result().items():
+                    remeshed[face_id] = used[triangles]
+
+    used = np.unique(
+        np.concatenate([triangles.ravel() for triangles in remeshed.values()])
+        if remeshed
+        else np.empty(0, dtype=np.int64)
+    )
+    index = np.full(len(points), -1, dtype=np.int64)
+    index[used] = np.arange(len(used))
+
+    result = {}
+    for solid_id, solid_faces in triangles_by_solid_by_face.items():
+        result[solid_id] = {}
+        for face_id, triangles in solid_faces.items():
+            triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+            kept = remeshed[face_id]
+            # the other solid on a shared face winds it the other way
+            if len(triangles):
+                turns = np.array([np.roll(triangles[0], turn) for turn in range(3)])
+                if not (faces[face_id][:, None, :] == turns).all(axis=2).any():
+                    kept = kept[:, ::-1]
+            result[solid_id][face_id] = index[kept]
+
+    return points[used], result, faces, remeshed
+
+
+def triangulate_planar_faces(
+    vertices,
+    triangles_by_solid_by_face: dict[int, dict[int, list[list[int]]]],
+):
+    """Replace the triangles of each planar face of a finished surface mesh
+    with the fewest triangles spanning its boundary.
+
+    Meshers place vertices inside planar faces to meet their size limits,
+    although DAGMC only needs the face covered, so a large flat wall meshed
+    with a small maximum size carries many times the triangles it needs.
+    This is a reduction of the triangles after meshing, not a quicker way
+    of meshing: the backend still meshes every planar face in full, and
+    each is then triangulated afresh by ear clipping the loops of vertices
+    along its boundary, as the mesher discretised it, so the faces around
+    it still match it and every volume stays watertight. Faces that are
+    curved, already have no vertices inside them, or have a boundary that
+    is not one outer loop around any holes are left as they are.
+
+    Args:
+        vertices: the (x, y, z) coordinates of the mesh.
+        triangles_by_solid_by_face: Dict mapping solid_id -> face_id -> list
+            of triangles, with shared faces under one id as
+            share_coincident_face_ids leaves them.
+
+    Returns:
+        (vertices, triangles_by_solid_by_face) with the same solids and face
+        ids. Vertices no longer used by any triangle are dropped and the
+        others renumbered.
+    """
+
+    def remesh(points, triangles, fixed):
+        planar = _planar_triangulation(points, triangles)
+        return triangles if planar is None else planar
+
+    vertices, result, before, after = _remesh_faces(
+        vertices, triangles_by_solid_by_face, remesh
+    )
+    changed = [face_id for face_id in before if after[face_id] is not before[face_id]]
+    print(
+        f"Triangulated {len(changed)} planar faces from their boundaries, "
+        f"{sum(len(before[face_id]) for face_id in changed)} triangles down to "
+        f"{sum(len(after[face_id]) for face_id in changed)}"
+    )
+    return vertices, result
+
+
+def decimate_surface(
+    vertices,
+    triangles_by_solid_by_face: dict[int, dict[int, list[list[int]]]],
+    tolerance: float,
+    processes: int | None = None,
+):
+    """Remove triangles from the surface mesh where the faces are flat enough
+    to be described by fewer.
+
+    Tessellators place vertices for the curvature of the whole face and for
+    the size limits they are given, so planar and gently curved faces often
+    come out with far more triangles than their shape needs, and every one
+    of them costs DAGMC time building its bounding volume tree and tracking
+    particles. The vertices inside each face are collapsed onto their
+    neighbours for as long as the surface stays within tolerance of where
+    it was, which leaves a planar face with few vertices inside it, although
+    not always as few as triangulate_planar_faces leaves. The vertices on
+    the boundary of a face, which it shares with the faces around it, and
+    any vertex used by more than one face are never removed, so every
+    volume stays watertight, and a face two solids share is decimated once
+    and written for both of them, keeping the winding each solid gave it.
 
-    id_by_key = {}
-    solid_ids_by_key = {}
-    remapped = {}
-    for solid_id, faces in triangles_by_solid_by_face.items():
-        shared_faces = {}
-        for triangles in faces.values():
-            key = canonical(triangles)
-            solid_ids_by_key.setdefault(key, []).append(solid_id)
-            if key not in id_by_key:
-                id_by_key[key] = len(id_by_key) + 1
-            shared_faces[id_by_key[key]] = triangles
-        remapped[solid_id] = shared_faces
+    Args:
+        vertices: the (x, y, z) coordinates of the mesh.
+        triangles_by_solid_by_face: Dict mapping solid_id -> face_id -> list
+            of triangles, with shared faces under one id as
+            share_coincident_face_ids leaves them.
+        tolerance: how far the surface may move, in the units of the
+            vertices. Each collapse is measured by the distance of the
+            removed vertex from the planes of the triangles replacing it, so
+            this is an estimate of the deviation rather than a bound on the
+            Hausdorff distance, see _decimate_face.
+        processes: decimate the faces in this many worker processes.
+            Decimation runs in plain Python at around 150 microseconds for
+            each triangle, so a surface mesh of a million triangles takes a
+            few minutes in one process. Worker processes each take a second
+            or two to start, so they pay off only on large meshes. Defaults
+            to None, decimating in this process.
 
-    for key, solid_ids in solid_ids_by_key.items():
-        if len(solid_ids) != len(set(solid_ids)):
-            msg = (
-                f"Solid {solid_ids[0]} has the same face twice, so it cannot be "
-                "written as DAGMC geometry. This points at a degenerate or zero "
-                "thickness feature in the CAD."
-            )
-            raise ValueError(msg)
-        if len(solid_ids) > 2:
-            msg = (
-                f"The face with id {id_by_key[key]} is shared by solids "
-                f"{sorted(solid_ids)}. A DAGMC surface separates at most two "
-                "volumes, so this points at overlapping solids in the CAD."
-            )
-            raise ValueError(msg)
+    Returns:
+        (vertices, triangles_by_solid_by_face) with the same solids and face
+        ids. Vertices no longer used by any triangle are dropped and the
+        others renumbered.
 
-    return remapped
+    Raises:
+        TypeError: if tolerance is not a number, or processes is not an int.
+        ValueError: if tolerance is not greater than 0, or processes is less
+            than 1.
+    """
+    _check_decimation_tolerance(tolerance)
+    if processes is not None:
+        _check_positive_int("processes", processes)
+
+    vertices, result, before, after = _remesh_faces(
+        vertices,
+        triangles_by_solid_by_face,
+        functools.partial(_decimate_face, max_deviation=tolerance),
+        processes,
+    )
+    print(
+        "Decimated the surface mesh from "
+        f"{sum(len(triangles) for triangles in before.values())} to "
+        f"{sum(len(triangles) for triangles in after.values())} triangles"
+    )
+    return vertices, result
 
 
 def define_moab_core_and_tags():
@@ -450,6 +3808,7 @@ def define_moab_core_and_tags():
     return moab_core, tags
 
 
+@_stage("h5m write")
 def vertices_to_h5m(
     vertices: list[tuple[float, float, float]] | list["cadquery.occ_impl.geom.Vector"],
     triangles_by_solid_by_face: dict[int, dict[int, list[list[int]]]],
@@ -1094,19 +4453,146 @@ def _vertices_to_h5m_h5py(
     return h5m_filename
 
 
+def import_brep_file(filename: str) -> cq.Shape:
+    """Reads a BRep file, in either the text or the binary format.
+
+    Args:
+        filename: the filename of the BRep file.
+
+    Returns:
+        the shape in the file.
+    """
+    with open(filename, "rb") as f:
+        header = f.read(64)
+    # the binary format starts "Open CASCADE Topology V", the text one
+    # "DBRep_DrawableShape" or "CASCADE Topology V"
+    if b"Open CASCADE Topology" in header:
+        return cq.Shape.importBin(str(filename))
+    return cq.Shape.importBrep(str(filename))
+
+
+# Imports a shape into gmsh through importShapesNativePointer in a separate
+# Python, so that a gmsh whose OpenCASCADE cannot take the shapes of
+# CadQuery's crashes there rather than in the calling process.
+_NATIVE_POINTER_PROBE = """
+import cadquery as cq
+import gmsh
+
+gmsh.initialize()
+gmsh.option.setNumber("General.Terminal", 0)
+box = cq.Solid.makeBox(1, 2, 3)
+volumes = gmsh.model.occ.importShapesNativePointer(box.wrapped._address())
+gmsh.model.occ.synchronize()
+bbox = gmsh.model.getBoundingBox(3, volumes[0][1])
+if len(volumes) == 1 and all(
+    abs(a - b) < 1e-3 for a, b in zip(bbox, (0, 0, 0, 1, 2, 3))
+):
+    print("native pointer transfer works")
+gmsh.finalize()
+"""
+
+
+def _occ_version(version: str) -> tuple[int, ...]:
+    """The major, minor and maintenance numbers of an OpenCASCADE version."""
+    return tuple(int(number) for number in re.findall(r"\d+", version)[:3])
+
+
+@functools.lru_cache(maxsize=None)
+def _native_pointer_transfer_works(gmsh_occ_version: str) -> bool:
+    """Whether importShapesNativePointer can be given CadQuery's shapes.
+
+    Only when gmsh is built with the same OpenCASCADE version as CadQuery's
+    OCP can the two share shapes in memory, and even then only if the build
+    is compatible, which is tried on a small box in another process. The
+    answer is kept for the rest of the process.
+
+    Args:
+        gmsh_occ_version: the OpenCASCADE version gmsh was built with.
+    """
+    import subprocess
+    import sys
+
+    import OCP
+
+    if _occ_version(OCP.__version__) != _occ_version(gmsh_occ_version):
+        return False
+    try:
+        probe = subprocess.run(
+            [sys.executable, "-c", _NATIVE_POINTER_PROBE],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return probe.returncode == 0 and "native pointer transfer works" in probe.stdout
+
+
+@functools.lru_cache(maxsize=None)
+def _ram_temp_dir() -> str | None:
+    """A directory for temporary files that is held in memory, if there is one.
+
+    Returns None, the default directory of tempfile, where there is not.
+    """
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK | os.X_OK):
+        return str(shm)
+    return None
+
+
+@_stage("gmsh import")
 def get_volumes(gmsh, assembly, method="file", scale_factor=1.0):
+    """Imports the geometry into gmsh.
+
+    Args:
+        gmsh: the initialized gmsh module.
+        assembly: the cq.Assembly or shape to import.
+        method: 'in memory' passes the shapes straight to gmsh, which only
+            works when gmsh is built with the same OpenCASCADE as CadQuery.
+            'file' writes them to a temporary BRep file, held in memory
+            where the system allows, for gmsh to read, and is the default.
+            'auto' uses 'in memory' when a one-off check finds it works and
+            'file' otherwise, and prints which it chose.
+        scale_factor: the factor to scale the geometry by once imported.
+
+    Returns:
+        gmsh and the (dim, tag) of the imported volumes.
+    """
+    if method == "auto":
+        try:
+            build_info = gmsh.option.getString("General.BuildInfo")
+        except Exception:
+            # older gmsh versions do not have the option
+            build_info = ""
+        occ_version = re.search(r"OCC version\s*:\s*([\d.]+)", build_info)
+        if occ_version and _native_pointer_transfer_works(occ_version.group(1)):
+            method = "in memory"
+        else:
+            method = "file"
+        print(f'method="auto" transfers the geometry to gmsh with method="{method}"')
 
     if method == "in memory":
-        volumes = gmsh.model.occ.importShapesNativePointer(assembly.wrapped._address())
+        if isinstance(assembly, cq.Assembly):
+            # the compound has to outlive the import, which only reads it
+            shape = assembly.toCompound()
+        else:
+            shape = assembly
+        volumes = gmsh.model.occ.importShapesNativePointer(shape.wrapped._address())
 
     elif method == "file":
-        with tempfile.NamedTemporaryFile(suffix=".brep") as temp_file:
+        with tempfile.NamedTemporaryFile(suffix=".brep", dir=_ram_temp_dir()) as temp_file:
             if isinstance(assembly, cq.Assembly):
                 assembly.toCompound().exportBrep(temp_file.name)
             else:
                 assembly.exportBrep(temp_file.name)
             volumes = gmsh.model.occ.importShapes(temp_file.name)
 
+    else:
+        raise ValueError(
+            f'method "{method}" not supported. Available options are "auto", '
+            '"in memory" or "file"'
+        )
+
     # updating the model to ensure the entities in the geometry are found
     gmsh.model.occ.synchronize()
 
@@ -1136,6 +4622,7 @@ def init_gmsh():
     return gmsh
 
 
+@_stage("sizing")
 def set_sizes_for_mesh(
     gmsh,
     min_mesh_size: float | None = None,
@@ -1156,7 +4643,9 @@ def set_sizes_for_mesh(
         mesh_algorithm: The Gmsh mesh algorithm number to use. Passed into
             gmsh.option.setNumber("Mesh.Algorithm", mesh_algorithm)
         set_size: a dictionary of volume ids (int) and target mesh sizes
-            (floats) to set for each volume, passed to gmsh.model.mesh.setSize.
+            (floats) to set for each volume, passed to gmsh.model.mesh.setSize
+            on the points of its boundary. A point shared by several volumes
+            takes the smallest of their sizes.
         threads: the number of threads for Gmsh to use. Passed into
             gmsh.option.setNumber("General.NumThreads", threads). 0 uses
             all available cores (default), 1 uses a single thread.
@@ -1181,8 +4670,7 @@ def set_sizes_for_mesh(
 
     if set_size:
         volumes = gmsh.model.getEntities(3)
-        available_volumes = [volume[1] for volume in volumes]
-        print("volumes", volumes)
+        available_volumes = {volume[1] for volume in volumes}
 
         # Ensure all volume IDs in set_size exist in the available volumes
         for volume_id in set_size.keys():
@@ -1211,26 +4699,39 @@ def set_sizes_for_mesh(
                     f"encompass the set_size value."
                 )
 
-        # Step 1: Preprocess boundaries to find the smallest size for shared surfaces
-        boundary_sizes = {}  # Dictionary to store the minimum mesh size for each boundary
+        # A point on the boundary of several sized volumes takes the smallest
+        # of their sizes. The boundaries of all the volumes of one size are
+        # found in one call, recursive=True giving the points directly, and
+        # the smallest size of each point is found over arrays rather than
+        # point by point, which matters with thousands of sized volumes.
+        volume_ids_by_size = {}
         for volume_id, size in set_size.items():
+            volume_ids_by_size.setdefault(size, []).append(volume_id)
+        point_tags = []
+        point_sizes = []
+        for size, volume_ids in volume_ids_by_size.items():
             boundaries = gmsh.model.getBoundary(
-                [(3, volume_id)], recursive=True
-            )  # dim must be set to 3
-            print(f"Boundaries for volume {volume_id}: {boundaries}")
-
-            for boundary in boundaries:
-                boundary_key = (boundary[0], boundary[1])  # (dimension, tag)
-                if boundary_key in boundary_sizes:
-                    # If the boundary is already processed, keep the smaller size
-                    boundary_sizes[boundary_key] = min(boundary_sizes[boundary_key], size)
-                else:
-                    boundary_sizes[boundary_key] = size
-
-        # Step 2: Apply mesh sizes to all boundaries
-        for boundary, size in boundary_sizes.items():
-            gmsh.model.mesh.setSize([boundary], size)
-            print(f"Set mesh size {size} for boundary {boundary}")
+                [(3, volume_id) for volume_id in volume_ids],
+                combined=False,
+                oriented=False,
+                recursive=True,
+            )
+            tags = [tag for dim, tag in boundaries if dim == 0]
+            point_tags.append(np.asarray(tags, dtype=np.int64))
+            point_sizes.append(np.full(len(tags), size, dtype=np.float64))
+        tags, inverse = np.unique(np.concatenate(point_tags), return_inverse=True)
+        sizes = np.full(len(tags), np.inf)
+        np.minimum.at(sizes, inverse, np.concatenate(point_sizes))
+
+        # one call for all the points that end up with each size
+        for size in np.unique(sizes):
+            gmsh.model.mesh.setSize(
+                [(0, int(tag)) for tag in tags[sizes == size]], float(size)
+            )
+        print(
+            f"Set mesh sizes on {len(tags)} points of {len(set_size)} volumes, "
+            f"{len(np.unique(sizes))} distinct sizes"
+        )
 
     return gmsh
 
@@ -1248,6 +4749,15 @@ def mesh_to_vertices_and_triangles(
     """
 
     n = 3  # number of verts in a triangles
+    # node tags only run from 1 without gaps in a model meshed once, after
+    # mesh.clear() (see CadToDagmc.gmsh_session) they carry on from where
+    # the cleared mesh left off, so they are mapped to vertex indices through
+    # their sorted order rather than by subtracting 1
+    all_tags, all_coords, _ = gmsh.model.mesh.getNodes()
+    order = np.argsort(all_tags)
+    sorted_tags = np.asarray(all_tags)[order]
+    all_coords = np.asarray(all_coords).reshape(-1, n)[order]
+
     triangles_by_solid_by_face = {}
     for dim_and_vol in dims_and_vol_ids:
         # removes all groups so that the following getEntitiesForPhysicalGroup
@@ -1274,10 +4784,7 @@ def mesh_to_vertices_and_triangles(
         nodes_in_each_surface = {}
         for surface in surfaces:
             _, _, nodeTags = gmsh.model.mesh.getElements(2, surface)
-            nodeTags = nodeTags[0].tolist()
-            shifted_node_tags = []
-            for nodeTag in nodeTags:
-                shifted_node_tags.append(nodeTag - 1)
+            shifted_node_tags = np.searchsorted(sorted_tags, nodeTags[0]).tolist()
             grouped_node_tags = [
                 shifted_node_tags[i : i + n]
                 for i in range(0, len(shifted_node_tags), n)
@@ -1285,9 +4792,7 @@ def mesh_to_vertices_and_triangles(
             nodes_in_each_surface[surface] = grouped_node_tags
         triangles_by_solid_by_face[vol_id] = nodes_in_each_surface
 
-    _, all_coords, _ = gmsh.model.mesh.getNodes()
-
-    vertices = [all_coords[i : i + n].tolist() for i in range(0, len(all_coords), n)]
+    vertices = all_coords.tolist()
 
     return vertices, triangles_by_solid_by_face
 
@@ -1328,6 +4833,7 @@ def check_material_tags(material_tags, iterable_solids):
                 warnings.warn(msg)
 
 
+@_stage("brep-order mapping")
 def order_material_ids_by_brep_order(original_ids, scrambled_id, material_tags):
     material_tags_in_brep_order = []
     for brep_id in scrambled_id:
@@ -1524,6 +5030,223 @@ def _get_material_tags_from_gmsh() -> list[str]:
     return material_tags
 
 
+# the number of nodes of each gmsh element type, for stepping over the
+# elements of binary msh files that are not triangles
+_MSH_NODES_PER_ELEMENT = {
+    1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6, 10: 9, 11: 10,
+    12: 27, 13: 18, 14: 14, 15: 1, 16: 8, 17: 20, 18: 15, 19: 13, 20: 9,
+    21: 10, 22: 12, 23: 15, 24: 15, 25: 21, 26: 4, 27: 5, 28: 6, 29: 20,
+    30: 35, 31: 56, 92: 64, 93: 125,
+}
+
+
+class _MshReader:
+    """Reads the numbers of the sections of an MSH 4.1 file, ASCII or binary.
+
+    The headers of sections and entities are read number by number, and the
+    blocks of nodes and elements, which hold nearly all of the file, straight
+    into arrays a block at a time.
+    """
+
+    def __init__(self, f, binary, size_t_size, byte_order):
+        self.f = f
+        self.binary = binary
+        self.dtypes = {
+            "int": np.dtype(f"{byte_order}i4"),
+            "size_t": np.dtype(f"{byte_order}u{size_t_size}"),
+            "double": np.dtype(f"{byte_order}f8"),
+        }
+        self.tokens = []
+
+    def numbers(self, kind, count=1) -> np.ndarray:
+        """The next count numbers, of kind "int", "size_t" or "double"."""
+        dtype = self.dtypes[kind]
+        if self.binary:
+            values = np.frombuffer(self.f.read(count * dtype.itemsize), dtype)
+        else:
+            while len(self.tokens) < count:
+                self.tokens.extend(self.f.readline().split())
+            values = self.tokens[:count]
+            del self.tokens[:count]
+            values = [float(value) if kind == "double" else int(value) for value in values]
+        return np.asarray(values, dtype=float if kind == "double" else np.int64)
+
+    def number(self, kind) -> int | float:
+        return self.numbers(kind)[0].item()
+
+    def block(self, kind, rows, columns) -> np.ndarray:
+        """The next rows lines of columns numbers each, as a 2D array."""
+        dtype = self.dtypes[kind]
+        if self.binary:
+            values = np.frombuffer(self.f.read(rows * columns * dtype.itemsize), dtype)
+        else:
+            text = b"".join(itertools.islice(self.f, rows)).decode()
+            values = np.fromstring(
+                text, dtype=float if kind == "double" else np.int64, sep=" "
+            )
+        values = values.astype(float if kind == "double" else np.int64, copy=False)
+        return values.reshape(rows, columns)
+
+    def skip_block(self, kind, rows, columns):
+        """Steps over the next rows lines of columns numbers each."""
+        if self.binary:
+            self.f.seek(rows * columns * self.dtypes[kind].itemsize, os.SEEK_CUR)
+        else:
+            for _ in itertools.islice(self.f, rows):
+                pass
+
+    def skip_to(self, line):
+        """Steps over everything up to and including line."""
+        self.tokens = []
+        for read_line in self.f:
+            if read_line.strip() == line:
+                return
+        raise ValueError(f"msh file ended before {line.decode()}")
+
+
+def read_gmsh_mesh_file(filename: str):
+    """Reads the surface mesh of each volume from an MSH 4.1 file, without gmsh.
+
+    The file is read section by section, ASCII or binary, with the nodes and
+    triangles going straight into arrays, so the memory used grows with the
+    size of the file and no gmsh session is needed. This makes it safe to
+    convert several files at once in parallel processes.
+
+    Args:
+        filename: the filename of the msh file, in the MSH 4.1 format.
+
+    Returns:
+        vertices, triangles_by_solid_by_face and material_tags. vertices holds
+        every node of the mesh in the order of its tag, the triangles of each
+        surface bounding each volume are zero-based indices into it, and
+        material_tags are the names of the 3D physical groups in the order of
+        their tags.
+
+    Raises:
+        ValueError: if the file is not a gmsh msh file.
+        NotImplementedError: if the file is in another version of the format
+            than 4.1, or the mesh is partitioned.
+    """
+    with open(filename, "rb") as f:
+        if f.readline().strip() != b"$MeshFormat":
+            raise ValueError(f"{filename} is not a gmsh msh file")
+        version, file_type, data_size = f.readline().split()[:3]
+        if version != b"4.1":
+            raise NotImplementedError(
+                f"{filename} is in version {version.decode()} of the msh format, "
+                "only version 4.1 can be read without gmsh"
+            )
+        binary = file_type == b"1"
+        byte_order = "<"
+        if binary:
+            # the int 1 written in the byte order of the file
+            byte_order = "<" if int.from_bytes(f.read(4), "little") == 1 else ">"
+        reader = _MshReader(f, binary, int(data_size), byte_order)
+        reader.skip_to(b"$EndMeshFormat")
+
+        physical_names = {}
+        volumes = {}
+        node_tags = []
+        node_coordinates = []
+        triangles_by_surface = {}
+        for line in f:
+            section = line.strip()
+            if not section.startswith(b"$"):
+                continue
+            section = section[1:]
+
+            if section == b"PhysicalNames":
+                # written as text in binary files too
+                for _ in range(int(f.readline())):
+                    dim, tag, name = f.readline().decode().split(maxsplit=2)
+                    physical_names[(int(dim), int(tag))] = name.strip().strip('"')
+
+            elif section == b"Entities":
+                counts = reader.numbers("size_t", 4)
+                for _ in range(counts[0]):
+                    reader.numbers("int")
+                    reader.numbers("double", 3)
+                    reader.numbers("int", reader.number("size_t"))
+                for dim in (1, 2, 3):
+                    for _ in range(counts[dim]):
+                        tag = reader.number("int")
+                        reader.numbers("double", 6)
+                        physical_tags = reader.numbers("int", reader.number("size_t"))
+                        bounding = reader.numbers("int", reader.number("size_t"))
+                        if dim == 3:
+                            volumes[tag] = (physical_tags, np.abs(bounding))
+
+            elif section == b"PartitionedEntities":
+                raise NotImplementedError(
+                    f"{filename} holds a partitioned mesh, which can only be read with gmsh"
+                )
+
+            elif section == b"Nodes":
+                blocks = reader.number("size_t")
+                reader.numbers("size_t", 3)
+                for _ in range(blocks):
+                    dim = reader.number("int")
+                    reader.number("int")
+                    parametric = reader.number("int")
+                    count = reader.number("size_t")
+                    node_tags.append(reader.block("size_t", count, 1).ravel())
+                    coordinates = reader.block(
+                        "double", count, 3 + (dim if parametric else 0)
+                    )
+                    node_coordinates.append(coordinates[:, :3])
+
+            elif section == b"Elements":
+                blocks = reader.number("size_t")
+                reader.numbers("size_t", 3)
+                for _ in range(blocks):
+                    dim = reader.number("int")
+                    tag = reader.number("int")
+                    element_type = reader.number("int")
+                    count = reader.number("size_t")
+                    if dim == 2 and element_type == 2:
+                        triangles = reader.block("size_t", count, 4)[:, 1:]
+                        triangles_by_surface.setdefault(tag, []).append(triangles)
+                    elif element_type in _MSH_NODES_PER_ELEMENT:
+                        reader.skip_block(
+                            "size_t", count, 1 + _MSH_NODES_PER_ELEMENT[element_type]
+                        )
+                    else:
+                        raise ValueError(
+                            f"{filename} holds elements of unknown type {element_type}"
+                        )
+
+            elif section.startswith(b"End"):
+                continue
+
+            reader.skip_to(b"$End" + section)
+
+    if node_tags:
+        node_tags = np.concatenate(node_tags)
+        order = np.argsort(node_tags)
+        sorted_tags = node_tags[order]
+        vertices = np.concatenate(node_coordinates)[order]
+    else:
+        sorted_tags = np.zeros(0, dtype=np.int64)
+        vertices = np.zeros((0, 3))
+
+    triangles_by_solid_by_face = {}
+    for volume_id in sorted(volumes):
+        triangles_by_solid_by_face[volume_id] = {
+            int(surface): np.searchsorted(
+                sorted_tags,
+                np.vstack(triangles_by_surface.get(surface, [np.zeros((0, 3), np.int64)])),
+            )
+            for surface in volumes[volume_id][1]
+        }
+
+    volume_groups = sorted(
+        {int(tag) for physical_tags, _ in volumes.values() for tag in physical_tags}
+    )
+    material_tags = [physical_names.get((3, tag), "") for tag in volume_groups]
+
+    return vertices, triangles_by_solid_by_face, material_tags
+
+
 def export_gmsh_file_to_dagmc_h5m_file(
     gmsh_filename: str,
     material_tags: list[str] | None = None,
@@ -1531,8 +5254,12 @@ def export_gmsh_file_to_dagmc_h5m_file(
     dagmc_filename: str = "dagmc.h5m",
     h5m_backend: str = "h5py",
 ) -> str:
-    """Saves a DAGMC h5m file of the geometry GMsh file. This function
-    initializes and finalizes Gmsh.
+    """Saves a DAGMC h5m file of the geometry GMsh file.
+
+    Files in the MSH 4.1 format, ASCII or binary, are read without gmsh, see
+    read_gmsh_mesh_file, so several can be converted at once in parallel
+    processes. Other versions of the format, and partitioned meshes, are read
+    with gmsh, which is initialized and finalized by this function.
 
     Args:
         gmsh_filename (str): the filename of the GMSH mesh file.
@@ -1550,46 +5277,714 @@ def export_gmsh_file_to_dagmc_h5m_file(
     Returns:
         str: The filename of the generated DAGMC h5m file.
 
-    Raises:
-        ValueError: If the number of material tags does not match the number of volumes in the GMSH object.
+    Raises:
+        ValueError: If the number of material tags does not match the number of volumes in the GMSH object.
+    """
+
+    try:
+        vertices, triangles_by_solid_by_face, physical_names = read_gmsh_mesh_file(
+            gmsh_filename
+        )
+        if material_tags is None:
+            material_tags = physical_names
+            print(f"Material tags: {material_tags}")
+        volume_count = len(triangles_by_solid_by_face)
+    except NotImplementedError as error:
+        print(f"{error}, reading it with gmsh")
+        # gmsh is a global singleton; finalize it on every exit path so a
+        # file that fails to read does not leave it initialized
+        gmsh.initialize()
+        try:
+            gmsh.open(str(gmsh_filename))
+
+            if material_tags is None:
+                material_tags = _get_material_tags_from_gmsh()
+
+            dims_and_vol_ids = gmsh.model.getEntities(3)
+            volume_count = len(dims_and_vol_ids)
+
+            vertices, triangles_by_solid_by_face = mesh_to_vertices_and_triangles(
+                dims_and_vol_ids=dims_and_vol_ids
+            )
+        finally:
+            if gmsh.isInitialized():
+                gmsh.finalize()
+
+    if volume_count != len(material_tags):
+        msg = f"Number of volumes {volume_count} is not equal to number of material tags {len(material_tags)}"
+        raise ValueError(msg)
+
+    h5m_filename = vertices_to_h5m(
+        vertices=vertices,
+        triangles_by_solid_by_face=triangles_by_solid_by_face,
+        material_tags=material_tags,
+        h5m_filename=dagmc_filename,
+        implicit_complement_material_tag=implicit_complement_material_tag,
+        method=h5m_backend,
+    )
+
+    return h5m_filename
+
+
+def _vertex_array(vertices) -> np.ndarray:
+    """vertices as an (n, 3) float array, from CadQuery vectors or sequences."""
+    if len(vertices) and hasattr(vertices[0], "x"):
+        vertices = [(vertex.x, vertex.y, vertex.z) for vertex in vertices]
+    return np.asarray(vertices, dtype=float).reshape(-1, 3)
+
+
+def _read_only_tessellation(vertices, triangles_by_solid_by_face):
+    """Copies of vertices and of the triangles of each face as arrays that
+    cannot be written to, for a tessellation that is kept and handed out to
+    more than one export."""
+    vertices = _vertex_array(vertices).copy()
+    vertices.setflags(write=False)
+    read_only = {}
+    for solid_id, faces in triangles_by_solid_by_face.items():
+        read_only[solid_id] = {}
+        for face_id, triangles in faces.items():
+            triangles = np.array(triangles, dtype=np.int64).reshape(-1, 3)
+            triangles.setflags(write=False)
+            read_only[solid_id][face_id] = triangles
+    return vertices, read_only
+
+
+def _copy_of_mapping(triangles_by_solid_by_face):
+    """New dicts holding the same triangles, so that faces can be added to
+    and removed from the copy without changing the original."""
+    return {
+        solid_id: dict(faces) for solid_id, faces in triangles_by_solid_by_face.items()
+    }
+
+
+def _remove_gmsh_volumes(gmsh, dims_and_vol_ids, kept_volume_ids):
+    """Removes the volumes not in kept_volume_ids from the gmsh model, with
+    the faces, curves and points only they use, so that they are not meshed.
+
+    The volumes go in one occ.remove call and one synchronize, as each call
+    has OCC work through the topology of the whole model. The mesh already
+    made on the entities that are kept stays, so generating in 3D after 2D
+    only adds the tetrahedra.
+
+    Args:
+        gmsh: the gmsh object, with the model synchronized.
+        dims_and_vol_ids: the (dim, tag) of each volume in the model.
+        kept_volume_ids: the tags of the volumes to keep.
+    """
+    removed = [
+        (volume_dim, volume_id)
+        for volume_dim, volume_id in dims_and_vol_ids
+        if volume_id not in kept_volume_ids
+    ]
+    if removed:
+        gmsh.model.occ.remove(removed, recursive=True)
+        gmsh.model.occ.synchronize()
+
+
+def _gmsh_tetrahedra(volume_ids):
+    """The tetrahedra gmsh made in each of volume_ids, as a tet mesh.
+
+    Returns:
+        (vertices, tetrahedra, volume_ids): the nodes the tetrahedra use as an
+        (n, 3) array, the tetrahedra as an (m, 4) array of zero-based indices
+        into them and the volume each tetrahedron is in.
+    """
+    node_tags, coordinates, _ = gmsh.model.mesh.getNodes()
+    order = np.argsort(node_tags)
+    node_tags = node_tags[order]
+    coordinates = coordinates.reshape(-1, 3)[order]
+
+    tetrahedra = []
+    tet_volume_ids = []
+    for volume_id in volume_ids:
+        _, tet_node_tags = gmsh.model.mesh.getElementsByType(4, volume_id)
+        tetrahedra.append(np.searchsorted(node_tags, tet_node_tags).reshape(-1, 4))
+        tet_volume_ids.append(np.full(len(tetrahedra[-1]), volume_id, dtype=np.int64))
+    tetrahedra = np.vstack(tetrahedra)
+
+    used, tetrahedra = np.unique(tetrahedra, return_inverse=True)
+    return (
+        coordinates[used],
+        tetrahedra.reshape(-1, 4),
+        np.concatenate(tet_volume_ids),
+    )
+
+
+@dataclass
+class MeshResult:
+    """The mesh of a model, made once by CadToDagmc.mesh and written to any
+    number of files.
+
+    Args:
+        vertices: the (n, 3) coordinates of the surface mesh.
+        triangles_by_solid_by_face: the triangles of each face of each volume,
+            as zero-based indices into vertices. A face two volumes share has
+            one id and is wound outward from each of them.
+        material_tags: the material tag of each volume, in the order of
+            triangles_by_solid_by_face.
+        part_ids: the index in CadToDagmc.parts of the part each volume was
+            made from, in the same order.
+        tet_vertices: the (n, 3) coordinates of the tet mesh, or None when no
+            volumes were filled with tetrahedra.
+        tetrahedra: the (m, 4) tetrahedra, as zero-based indices into
+            tet_vertices, or None.
+        tet_volume_ids: the id of the volume each tetrahedron is in, or None.
+    """
+
+    vertices: np.ndarray
+    triangles_by_solid_by_face: dict[int, dict[int, np.ndarray]]
+    material_tags: list[str]
+    part_ids: list[int]
+    tet_vertices: np.ndarray | None = None
+    tetrahedra: np.ndarray | None = None
+    tet_volume_ids: np.ndarray | None = None
+
+    def to_h5m(
+        self,
+        filename: str = "dagmc.h5m",
+        implicit_complement_material_tag: str | None = None,
+        h5m_backend: str = "h5py",
+    ) -> str:
+        """Write the surface mesh as a DAGMC h5m file.
+
+        Args:
+            filename: the filename to use for the saved DAGMC file.
+            implicit_complement_material_tag: the name of the material tag to
+                use for the implicit complement (void space).
+            h5m_backend: 'pymoab' or 'h5py' for writing the h5m file.
+
+        Returns:
+            str: the filename of the h5m file.
+        """
+        return vertices_to_h5m(
+            vertices=self.vertices,
+            triangles_by_solid_by_face=self.triangles_by_solid_by_face,
+            material_tags=self.material_tags,
+            h5m_filename=filename,
+            implicit_complement_material_tag=implicit_complement_material_tag,
+            method=h5m_backend,
+        )
+
+    def to_vtk(self, filename: str = "umesh.vtk") -> str:
+        """Write the tet mesh as a VTK file for openmc.UnstructuredMesh with
+        library="moab".
+
+        Args:
+            filename: the filename to use for the saved VTK file.
+
+        Returns:
+            str: the filename of the VTK file.
+
+        Raises:
+            ValueError: if no volumes were filled with tetrahedra.
+        """
+        if self.tetrahedra is None:
+            raise ValueError(
+                "The mesh has no tetrahedra to write to a VTK file. Mesh with "
+                "unstructured_volumes for gmsh, or tet_volumes and "
+                "target_edge_length for cad-to-dagmc-mesher."
+            )
+        if Path(filename).parent:
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        write_vtk(filename, self.tet_vertices, self.tetrahedra)
+        print(f"written unstructured mesh file {filename}")
+        return filename
+
+    def to_msh(self, filename: str = "mesh.msh") -> str:
+        """Write the mesh as a gmsh MSH 4.1 file.
+
+        Each face is a surface entity holding its triangles and each volume
+        a volume entity bounded by its faces, in a physical group named after
+        its material tag. The tetrahedra, if there are any, are in their
+        volumes and share the nodes that coincide with the surface mesh.
+
+        Args:
+            filename: the filename to use for the saved msh file.
+
+        Returns:
+            str: the filename of the msh file.
+        """
+        vertices = self.vertices
+        surface_vertex_count = len(vertices)
+        if self.tetrahedra is not None:
+            vertices = np.vstack([vertices, self.tet_vertices])
+        nodes, remap = _merge_coincident_vertices(vertices)
+
+        triangles_by_face = {}
+        surfaces_by_volume = {}
+        for solid_id, triangles_on_each_face in self.triangles_by_solid_by_face.items():
+            surfaces_by_volume[solid_id] = []
+            for face_id, triangles in triangles_on_each_face.items():
+                # a face is written once, with the winding of the first
+                # volume it bounds, and is reversed in the other
+                if face_id in triangles_by_face:
+                    surfaces_by_volume[solid_id].append(-face_id)
+                else:
+                    triangles_by_face[face_id] = remap[
+                        np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+                    ]
+                    surfaces_by_volume[solid_id].append(face_id)
+        tetrahedra_by_volume = {}
+        if self.tetrahedra is not None:
+            tetrahedra = remap[surface_vertex_count + self.tetrahedra]
+            for solid_id in surfaces_by_volume:
+                tetrahedra_by_volume[solid_id] = tetrahedra[
+                    self.tet_volume_ids == solid_id
+                ]
+
+        # each node is written in the first entity that uses it, and the
+        # nodes no element uses are left out, so the node tags are numbered
+        # from 1 in the order they are written without gaps
+        blocks = [(2, face_id, triangles) for face_id, triangles in triangles_by_face.items()]
+        blocks += [(3, solid_id, tets) for solid_id, tets in tetrahedra_by_volume.items()]
+        node_blocks = []
+        node_tags = np.zeros(len(nodes), dtype=np.int64)
+        node_count = 0
+        for dimension, entity_id, elements in blocks:
+            used = np.unique(elements)
+            used = used[node_tags[used] == 0]
+            node_tags[used] = np.arange(node_count + 1, node_count + len(used) + 1)
+            node_count += len(used)
+            if len(used):
+                node_blocks.append((dimension, entity_id, used))
+
+        physical_tags = {}
+        for material_tag in self.material_tags:
+            physical_tags.setdefault(material_tag, len(physical_tags) + 1)
+
+        def bounding_box(elements):
+            points = nodes[np.unique(elements)]
+            return " ".join(map(str, [*points.min(axis=0), *points.max(axis=0)]))
+
+        element_count = sum(len(elements) for _, _, elements in blocks)
+        element_tag = 1
+        if Path(filename).parent:
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, "w") as f:
+            f.write("$MeshFormat\n4.1 0 8\n$EndMeshFormat\n")
+            f.write(f"$PhysicalNames\n{len(physical_tags)}\n")
+            f.writelines(
+                f'3 {tag} "{material_tag}"\n' for material_tag, tag in physical_tags.items()
+            )
+            f.write("$EndPhysicalNames\n")
+
+            f.write(f"$Entities\n0 0 {len(triangles_by_face)} {len(surfaces_by_volume)}\n")
+            f.writelines(
+                f"{face_id} {bounding_box(triangles)} 0 0\n"
+                for face_id, triangles in triangles_by_face.items()
+            )
+            for material_tag, (solid_id, surfaces) in zip(
+                self.material_tags, surfaces_by_volume.items()
+            ):
+                faces = [triangles_by_face[abs(face_id)] for face_id in surfaces]
+                f.write(
+                    f"{solid_id} {bounding_box(np.vstack(faces))} "
+                    f"1 {physical_tags[material_tag]} {len(surfaces)} "
+                    f"{' '.join(map(str, surfaces))}\n"
+                )
+            f.write("$EndEntities\n")
+
+            f.write(f"$Nodes\n{len(node_blocks)} {node_count} 1 {node_count}\n")
+            for dimension, entity_id, used in node_blocks:
+                f.write(f"{dimension} {entity_id} 0 {len(used)}\n")
+                f.writelines(f"{tag}\n" for tag in node_tags[used])
+                f.writelines(f"{x} {y} {z}\n" for x, y, z in nodes[used])
+            f.write("$EndNodes\n")
+
+            f.write(
+                f"$Elements\n{len(blocks)} {element_count} 1 {element_count}\n"
+            )
+            for dimension, entity_id, elements in blocks:
+                # gmsh element type 2 is a 3 node triangle and 4 a 4 node tetrahedron
+                f.write(f"{dimension} {entity_id} {2 * dimension - 2} {len(elements)}\n")
+                f.writelines(
+                    f"{element_tag + i} {' '.join(map(str, element))}\n"
+                    for i, element in enumerate(node_tags[elements])
+                )
+                element_tag += len(elements)
+            f.write("$EndElements\n")
+        print(f"written gmsh mesh file {filename}")
+        return filename
+
+    def to_npz(self, filename: str = "mesh.npz") -> str:
+        """Write the mesh as a numpy npz file, which from_npz reads back.
+
+        Args:
+            filename: the filename to use for the saved npz file.
+
+        Returns:
+            str: the filename of the npz file.
+        """
+        faces = [
+            (face_id, np.asarray(triangles, dtype=np.int64).reshape(-1, 3))
+            for triangles_on_each_face in self.triangles_by_solid_by_face.values()
+            for face_id, triangles in triangles_on_each_face.items()
+        ]
+        arrays = {
+            "vertices": self.vertices,
+            "triangles": np.vstack(
+                [triangles for _, triangles in faces] or [np.empty((0, 3), np.int64)]
+            ),
+            "solid_ids": np.array(list(self.triangles_by_solid_by_face), dtype=np.int64),
+            "faces_per_solid": np.array(
+                [len(faces) for faces in self.triangles_by_solid_by_face.values()],
+                dtype=np.int64,
+            ),
+            "face_ids": np.array([face_id for face_id, _ in faces], dtype=np.int64),
+            "triangles_per_face": np.array(
+                [len(triangles) for _, triangles in faces], dtype=np.int64
+            ),
+            "material_tags": np.array(self.material_tags, dtype=str),
+            "part_ids": np.array(self.part_ids, dtype=np.int64),
+        }
+        if self.tetrahedra is not None:
+            arrays["tet_vertices"] = self.tet_vertices
+            arrays["tetrahedra"] = self.tetrahedra
+            arrays["tet_volume_ids"] = self.tet_volume_ids
+        if Path(filename).parent:
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, "wb") as f:
+            np.savez(f, **arrays)
+        return filename
+
+    @classmethod
+    def from_npz(cls, filename: str) -> "MeshResult":
+        """Read a mesh that to_npz wrote.
+
+        Args:
+            filename: the npz file to read.
+
+        Returns:
+            MeshResult: the mesh.
+        """
+        with np.load(filename) as data:
+            triangles = np.split(
+                data["triangles"], np.cumsum(data["triangles_per_face"])[:-1]
+            )
+            face_ids = data["face_ids"].tolist()
+            triangles_by_solid_by_face = {}
+            start = 0
+            for solid_id, face_count in zip(
+                data["solid_ids"].tolist(), data["faces_per_solid"].tolist()
+            ):
+                triangles_by_solid_by_face[solid_id] = dict(
+                    zip(
+                        face_ids[start : start + face_count],
+                        triangles[start : start + face_count],
+                    )
+                )
+                start += face_count
+            tets = {
+                name: data[name] if name in data else None
+                for name in ("tet_vertices", "tetrahedra", "tet_volume_ids")
+            }
+            return cls(
+                vertices=data["vertices"],
+                triangles_by_solid_by_face=triangles_by_solid_by_face,
+                material_tags=data["material_tags"].tolist(),
+                part_ids=data["part_ids"].tolist(),
+                **tets,
+            )
+
+
+class _ExportCache:
+    """What the exports of a CadToDagmc can share while its parts are unchanged.
+
+    Every export used to build a fresh assembly from the parts, imprint it and
+    tessellate it again, even when the same model was exported twice in a row,
+    for example to h5m with one backend and to msh with another. This keeps
+    the assembly, its imprint for each set of boolean operation options, and
+    the cadquery backend's tessellation for each set of tolerances, so that an
+    export with settings seen before skips the work.
+
+    The thread, process, memory and strategy options of an ImprintOptions do
+    not change the imprint, so only the boolean operation options and the
+    arguments given to cadquery's imprint tell imprints apart. Only the
+    latest tessellation of each imprint is kept, as each can be as large as
+    the mesh it holds. With keep set to False nothing but the assembly is
+    kept, and every export imprints and tessellates afresh.
     """
 
-    gmsh.initialize()
-    gmsh.open(gmsh_filename)
+    def __init__(self, parts, names=None, keep=True):
+        self.parts = tuple(parts)
+        self.keep = keep
+        # the imprint maps solids back to the parts by the names in the
+        # assembly, so a cache that is to take another's imprints is given
+        # its names, see names
+        if names is None:
+            names = [None] * (len(self.parts) + 1)
+        self.assembly = cq.Assembly(name=names[0])
+        for part, name in zip(self.parts, names[1:]):
+            # cadquery_direct_mesh_plugin places solids it does not imprint by
+            # the location of their assembly child alone, ignoring the
+            # location of the shape, so the location is moved onto the child
+            self.assembly.add(
+                part.located(cq.Location()), loc=part.location(), name=name
+            )
+        self.imprints = {}
+        self.tessellations = {}
+
+    @property
+    def names(self) -> list[str]:
+        """The name of the assembly followed by those of its children."""
+        return [self.assembly.name] + [child.name for child in self.assembly.children]
+
+    def holds(self, parts) -> bool:
+        """Whether this was made for exactly these parts, in this order."""
+        return len(parts) == len(self.parts) and all(
+            part is cached for part, cached in zip(parts, self.parts)
+        )
 
-    if material_tags is None:
-        material_tags = _get_material_tags_from_gmsh()
+    def imprint(self, assembly, options, imprint_kwargs, run):
+        """Return the imprint of assembly, calling run only if there is none yet.
 
-    dims_and_vol_ids = gmsh.model.getEntities(3)
+        Imprints of any other assembly than this cache's own are not kept, as
+        the names in their mapping to the original solids would not match.
+        """
+        if assembly is not self.assembly or not self.keep:
+            return run()
+        key = (
+            tuple(getattr(options, name) for name in _BOP_OPTION_NAMES),
+            tuple(sorted(imprint_kwargs.items())),
+        )
+        if key in self.imprints:
+            print("Reusing the imprint of a previous export")
+        else:
+            self.imprints[key] = run()
+        return self.imprints[key]
+
+    def store_tessellation(self, key, tessellation):
+        """Keep the tessellation made for key, in place of any other made
+        from the same imprint, the first item of key."""
+        if not self.keep:
+            return
+        for other in [other for other in self.tessellations if other[0] == key[0]]:
+            del self.tessellations[other]
+        self.tessellations[key] = tessellation
+
+    def clean_triangulations(self):
+        """Remove the triangulations earlier exports left on the shapes.
+
+        BRepMesh keeps a triangulation that is already finer than asked for,
+        so without this a coarser export after a finer one would come out at
+        the finer size.
+        """
+        from OCP.BRepTools import BRepTools
 
-    if len(dims_and_vol_ids) != len(material_tags):
-        msg = f"Number of volumes {len(dims_and_vol_ids)} is not equal to number of material tags {len(material_tags)}"
-        raise ValueError(msg)
+        shapes = list(self.parts) + [compound for compound, _ in self.imprints.values()]
+        for shape in shapes:
+            BRepTools.Clean_s(shape.wrapped)
 
-    vertices, triangles_by_solid_by_face = mesh_to_vertices_and_triangles(
-        dims_and_vol_ids=dims_and_vol_ids
-    )
 
-    gmsh.finalize()
+class _GmshSession:
+    """The gmsh model kept alive between the gmsh exports of a CadToDagmc.
 
-    h5m_filename = vertices_to_h5m(
-        vertices=vertices,
-        triangles_by_solid_by_face=triangles_by_solid_by_face,
-        material_tags=material_tags,
-        h5m_filename=dagmc_filename,
-        implicit_complement_material_tag=implicit_complement_material_tag,
-        method=h5m_backend,
-    )
+    Every gmsh export used to finalize gmsh, write the imprinted geometry to a
+    temporary brep, import it into a new model and synchronize. Within a
+    CadToDagmc.gmsh_session the model is kept, and an export of the same
+    assembly at the same scale_factor only clears the mesh and the sizes of
+    the previous one before meshing it again.
+    """
 
-    return h5m_filename
+    def __init__(self):
+        # (assembly, scale_factor) of the geometry in the gmsh model, or None
+        # when there is none that can be meshed again, for example after an
+        # export removed some of its volumes
+        self.geometry = None
+        self.volumes = None
+
+    def model(self, assembly, method, scale_factor):
+        """Return gmsh and the volumes of assembly, importing it only if the
+        model does not hold it already."""
+        if (
+            self.geometry is not None
+            and self.geometry[0] is assembly
+            and self.geometry[1] == scale_factor
+            and gmsh.isInitialized()
+        ):
+            print("Reusing the geometry of the gmsh session")
+            gmsh.model.mesh.clear()
+            gmsh.model.removePhysicalGroups()
+            # set_sizes_for_mesh leaves the options it is not given as they
+            # are, so they are put back to the gmsh defaults, as are those
+            # of the files export_gmsh_mesh_file writes
+            gmsh.option.setNumber("Mesh.MeshSizeMin", 0)
+            gmsh.option.setNumber("Mesh.MeshSizeMax", 1e22)
+            gmsh.option.setNumber("Mesh.Binary", 0)
+            gmsh.option.setNumber("Mesh.PartitionSplitMeshFiles", 0)
+            gmsh.model.mesh.setSize(gmsh.model.getEntities(0), 1e22)
+            return gmsh, self.volumes
+
+        self.geometry = None
+        _, self.volumes = get_volumes(
+            init_gmsh(), assembly, method=method, scale_factor=scale_factor
+        )
+        self.geometry = (assembly, scale_factor)
+        return gmsh, self.volumes
 
 
 class CadToDagmc:
-    """Converts Step files and CadQuery parts to a DAGMC h5m file"""
+    """Converts Step files and CadQuery parts to a DAGMC h5m file
 
-    def __init__(self):
+    Args:
+        incremental_imprint: keep the imprint of each export so that the next
+            export only re-imprints the solids that changed in the meantime,
+            for example by replacing an entry of parts, and the solids
+            around them. The rest of the previous imprint is reused, which
+            turns a design loop that changes one part of a large model from
+            a full imprint per export into a small one. The previous imprint
+            is held in imprint_history, whose clear method forgets it.
+        record_timings: record the wall and CPU time export_dagmc_h5m_file
+            and mesh spend in each stage, imprint, tessellation, h5m write
+            and so on. The StageTimings of the last of them is held in
+            timings, and export_dagmc_h5m_file also writes it next to the
+            h5m, named after it with ".timings.json" added. Recording costs
+            next to nothing, and nothing is recorded without it.
+
+        cache: keep the assembly, its imprint and the cadquery backend's
+            tessellation between exports while parts is unchanged, so that
+            exporting the same model again with equal settings, to another
+            format or with another backend, skips the work already done.
+            The imprint holds a second copy of the BRep of every solid, and
+            the latest tessellation of each imprint is kept too, at around
+            the size of the h5m it was written to, so a large model can hold
+            several gigabytes between exports. clear_cache frees them, and
+            False keeps nothing but the assembly, imprinting and
+            tessellating afresh on every export. Defaults to True.
+
+    Within gmsh_session the gmsh model is kept between the gmsh exports too.
+    """
+
+    def __init__(
+        self,
+        incremental_imprint: bool = False,
+        record_timings: bool = False,
+        cache: bool = True,
+    ):
         self.parts = []
         self.material_tags = []
+        self.imprint_history = ImprintHistory() if incremental_imprint else None
+        self.record_timings = record_timings
+        self.timings = None
+        self.cache = cache
+        self._cache = None
+        self._gmsh_session = None
+
+    def clear_cache(self):
+        """Forget the assembly, imprints and tessellations kept from earlier
+        exports, freeing the memory they hold."""
+        self._cache = None
+
+    def _cached(self) -> _ExportCache:
+        """The cache for the current parts, started afresh if they changed."""
+        if self._cache is None or not self._cache.holds(self.parts):
+            with _stage("assembly build"):
+                self._cache = _ExportCache(self.parts, keep=self.cache)
+        return self._cache
+
+    @contextmanager
+    def _recording_timings(self, filename: str | None = None):
+        """Record the stages of the export in the block in a new StageTimings
+        in timings, written to filename afterwards if one is given, even if
+        the export fails part way."""
+        global _timings
+
+        if not self.record_timings:
+            yield
+            return
+
+        self.timings = StageTimings()
+        previous, _timings = _timings, self.timings
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.timings.wall_time = time.perf_counter() - start_wall
+            self.timings.cpu_time = time.process_time() - start_cpu
+            _timings = previous
+            if filename is not None:
+                # an export that failed may not have made the folder yet
+                Path(filename).parent.mkdir(parents=True, exist_ok=True)
+                print(f"written stage timings {self.timings.to_json(filename)}")
+
+    @_stage("imprint")
+    def _imprint(self, threads: int | ImprintOptions | None):
+        """imprint_assembly on the cached assembly, reusing an earlier imprint."""
+        cache = self._cached()
+        return cache.imprint(
+            cache.assembly,
+            _as_imprint_options(threads),
+            _imprint_assembly_kwargs(cq.occ_impl.assembly.imprint),
+            lambda: imprint_assembly(
+                cache.assembly, threads=threads, history=self.imprint_history
+            ),
+        )
+
+    @contextmanager
+    def gmsh_session(self):
+        """Keep the gmsh model between the gmsh exports made within the block.
+
+        The geometry is imported into gmsh by the first gmsh export, and the
+        exports after it that mesh the same imprint at the same scale_factor
+        only clear the mesh and apply their own sizes before meshing again,
+        rather than importing the geometry into a new model each time. This
+        makes sweeping mesh sizes over a large model much quicker. gmsh is
+        finalized when the block is left, however it is left.
+
+        An export that removes volumes from the model, such as
+        export_unstructured_mesh_file with volumes, leaves the next export
+        to import the geometry again.
+
+        Example:
+            with my_model.gmsh_session():
+                for size in [10, 5, 2]:
+                    my_model.export_gmsh_mesh_file(
+                        filename=f"mesh_{size}.msh", max_mesh_size=size
+                    )
+
+        Yields:
+            this CadToDagmc.
+        """
+        if self._gmsh_session is not None:
+            raise ValueError("A gmsh session is already open on this model")
+        self._gmsh_session = _GmshSession()
+        try:
+            yield self
+        finally:
+            self._gmsh_session = None
+            if gmsh.isInitialized():
+                gmsh.finalize()
+
+    @contextmanager
+    def _gmsh_model(self, assembly, method, scale_factor):
+        """gmsh with assembly imported, and the volumes it was imported as.
+
+        Outside of gmsh_session the geometry is imported into a new model
+        that is finalized on leaving, on every exit path (including a
+        mid-mesh exception) so repeated calls don't accumulate models, see
+        issue #187. Within it the session's model is used, and forgotten if
+        the export fails, as the model may be left part way through a change.
+        """
+        session = self._gmsh_session
+        if session is None:
+            # only set once init_gmsh() has run, so that an error raised by it
+            # is not masked by finalizing a session that was never started
+            gmsh_session_started = False
+            try:
+                model = init_gmsh()
+                gmsh_session_started = True
+                yield get_volumes(
+                    model, assembly, method=method, scale_factor=scale_factor
+                )
+            finally:
+                if gmsh_session_started and gmsh.isInitialized():
+                    gmsh.finalize()
+        else:
+            try:
+                yield session.model(assembly, method, scale_factor)
+            except BaseException:
+                session.geometry = None
+                raise
 
     def add_stp_file(
         self,
@@ -1649,6 +6044,50 @@ class CadToDagmc:
             cadquery_object=scaled_part, material_tags=material_tags
         )
 
+    def add_brep_file(
+        self,
+        filename: str,
+        scale_factor: float = 1.0,
+        material_tags: list[str] | None = None,
+    ) -> int:
+        """Loads the parts from a BRep file into the model.
+
+        BRep is OpenCASCADE's own format, so the shapes are read as they are
+        without the translation that STEP files go through, which is much
+        quicker for large models. Both the text format, written by
+        cadquery's exportBrep, and the binary format, written by exportBin,
+        are read, and told apart by the header of the file.
+
+        Args:
+            filename: the filename of the BRep file to load.
+            material_tags: the names of the DAGMC material tags to assign, one
+                per volume and in the same order as the volumes in the file.
+                BRep files hold no assembly structure, so "assembly_names" and
+                "assembly_materials" are not available.
+            scale_factor: a scaling factor to apply to the geometry that can be
+                used to increase the size or decrease the size of the geometry.
+                Useful when converting the geometry to cm for use in neutronics
+                simulations.
+
+        Returns:
+            int: number of volumes in the BRep file.
+        """
+        if material_tags in ("assembly_names", "assembly_materials"):
+            raise ValueError(
+                f"BRep files hold no assembly structure, so material_tags cannot "
+                f"be {material_tags!r}. Pass one material tag per volume instead."
+            )
+
+        part = import_brep_file(filename)
+
+        if scale_factor == 1.0:
+            scaled_part = part
+        else:
+            scaled_part = part.scale(scale_factor)
+        return self.add_cadquery_object(
+            cadquery_object=scaled_part, material_tags=material_tags
+        )
+
     def add_cadquery_object(
         self,
         cadquery_object: (
@@ -1755,7 +6194,7 @@ class CadToDagmc:
         mesh_algorithm: int = 1,
         method: str = "file",
         scale_factor: float = 1.0,
-        imprint: bool | int = True,
+        imprint: bool | int | ImprintOptions | dict = True,
         set_size: dict[int | str, float] | None = None,
         volumes: Iterable[int] | None = None,
         threads: int = 0,
@@ -1789,13 +6228,16 @@ class CadToDagmc:
             mesh_algorithm: The Gmsh mesh algorithm number to use. Passed into
                 gmsh.option.setNumber("Mesh.Algorithm", mesh_algorithm)
             method: the method to use to import the geometry into gmsh. Options
-                are 'file' or 'in memory'. 'file' is the default and will write
-                the geometry to a temporary file before importing it into gmsh.
-                'in memory' will import the geometry directly into gmsh but
-                requires the version of OpenCASCADE used to build gmsh to be
-                the same as the version used by CadQuery. This is possible to
-                ensure when installing the package with Conda but harder when
-                installing from PyPI.
+                are 'file', 'in memory' or 'auto'. 'file' is the default and
+                will write the geometry to a temporary file, in memory where
+                the system allows, before importing it into gmsh. 'in memory'
+                will import the geometry directly into gmsh but requires the
+                version of OpenCASCADE used to build gmsh to be the same as
+                the version used by CadQuery. This is possible to ensure when
+                installing the package with Conda but harder when installing
+                from PyPI. 'auto' uses 'in memory' when a check, made once per
+                process, finds that it works, and 'file' otherwise, printing
+                which it chose.
             scale_factor: a scaling factor to apply to the geometry that can be
                 used to enlarge or shrink the geometry. Useful when converting
                 the geometry to cm for use in neutronics.
@@ -1810,6 +6252,10 @@ class CadToDagmc:
                 that follows it keeps all its threads whichever backend is used, and
                 the thread count is restored afterwards so the cadquery operations
                 that follow are unaffected.
+                An ImprintOptions, or a dict of its fields, gives finer control,
+                for example imprint={"processes": 8, "threads": 4} imprints
+                clusters of solids that do not touch each other in 8 worker
+                processes of 4 threads each.
             set_size: a dictionary mapping volume IDs (int) or material tag names
                 (str) to target mesh sizes (floats). Material tags are resolved to
                 all volume IDs that have that tag. Only used by the gmsh backend.
@@ -1880,30 +6326,17 @@ class CadToDagmc:
                 scale_factor=scale_factor,
             )
 
-        assembly = cq.Assembly()
-        for part in self.parts:
-            assembly.add(part)
+        assembly = self._cached().assembly
 
         if imprint:
             print("Imprinting assembly for unstructured mesh generation")
-            imprinted_assembly, _ = imprint_assembly(assembly, threads=imprint_threads)
+            imprinted_assembly, _ = self._imprint(imprint_threads)
         else:
             imprinted_assembly = assembly
 
-        # gmsh is a global singleton; finalize the session on every exit path
-        # (including a mid-mesh exception) so repeated calls don't accumulate
-        # models. gmsh_session_started is only set once init_gmsh() has bound
-        # the local gmsh name, keeping the finally safe if init_gmsh() itself
-        # raises. See issue #187.
-        gmsh_session_started = False
-        try:
-            gmsh = init_gmsh()
-            gmsh_session_started = True
-
-            gmsh, volumes_in_model = get_volumes(
-                gmsh, imprinted_assembly, method=method, scale_factor=scale_factor
-            )
-
+        with self._gmsh_model(
+            imprinted_assembly, method, scale_factor
+        ) as (gmsh, volumes_in_model):
             # Resolve any material tag strings in set_size to volume IDs
             resolved_set_size = None
             if set_size:
@@ -1922,13 +6355,11 @@ class CadToDagmc:
             )
 
             if volumes:
-                for volume_id in volumes_in_model:
-                    if volume_id[1] not in volumes:
-                        gmsh.model.occ.remove([volume_id], recursive=True)
+                _remove_gmsh_volumes(gmsh, volumes_in_model, volumes)
                 gmsh.option.setNumber("Mesh.SaveAll", 1)
-                gmsh.model.occ.synchronize()
-                # Clear the mesh
-                gmsh.model.mesh.clear()
+                # the model no longer holds the whole geometry to mesh again
+                if self._gmsh_session is not None:
+                    self._gmsh_session.geometry = None
                 gmsh.option.setNumber(
                     "Mesh.SaveElementTagType", 3
                 )  # Save only volume elements
@@ -1946,9 +6377,6 @@ class CadToDagmc:
                 gmsh.write(filename)
 
             return filename
-        finally:
-            if gmsh_session_started and gmsh.isInitialized():
-                gmsh.finalize()
 
     def _export_unstructured_mesh_file_with_mesher(
         self,
@@ -1984,7 +6412,7 @@ class CadToDagmc:
         else:
             tet_volumes = list(tet_volumes)
 
-        _, _, _, tet_data = _mesh_with_cad_to_dagmc_mesher(
+        _, _, _, _, tet_data = _mesh_with_cad_to_dagmc_mesher(
             assembly=assembly,
             material_tags=self.material_tags,
             tolerance=tolerance,
@@ -1993,6 +6421,7 @@ class CadToDagmc:
             target_edge_length=target_edge_length,
             imprint=imprint,
             imprint_threads=imprint_threads,
+            imprint_history=self.imprint_history,
         )
 
         if not tet_data:
@@ -2020,9 +6449,12 @@ class CadToDagmc:
         dimensions: int = 2,
         method: str = "file",
         scale_factor: float = 1.0,
-        imprint: bool | int = True,
+        imprint: bool | int | ImprintOptions | dict = True,
         set_size: dict[int | str, float] | None = None,
         threads: int = 0,
+        binary: bool = False,
+        partitions: int | None = None,
+        split_partitions: bool = False,
     ):
         """Saves a GMesh msh file of the geometry in either 2D surface mesh or
         3D volume mesh.
@@ -2035,13 +6467,16 @@ class CadToDagmc:
             dimensions: The number of dimensions, 2 for a surface mesh 3 for a
                 volume mesh. Passed to gmsh.model.mesh.generate()
             method: the method to use to import the geometry into gmsh. Options
-                are 'file' or 'in memory'. 'file' is the default and will write
-                the geometry to a temporary file before importing it into gmsh.
-                'in memory' will import the geometry directly into gmsh but
-                requires the version of OpenCASCADE used to build gmsh to be
-                the same as the version used by CadQuery. This is possible to
-                ensure when installing the package with Conda but harder when
-                installing from PyPI.
+                are 'file', 'in memory' or 'auto'. 'file' is the default and
+                will write the geometry to a temporary file, in memory where
+                the system allows, before importing it into gmsh. 'in memory'
+                will import the geometry directly into gmsh but requires the
+                version of OpenCASCADE used to build gmsh to be the same as
+                the version used by CadQuery. This is possible to ensure when
+                installing the package with Conda but harder when installing
+                from PyPI. 'auto' uses 'in memory' when a check, made once per
+                process, finds that it works, and 'file' otherwise, printing
+                which it chose.
             scale_factor: a scaling factor to apply to the geometry that can be
                 used to enlarge or shrink the geometry. Useful when converting
                 Useful when converting the geometry to cm for use in neutronics
@@ -2054,39 +6489,44 @@ class CadToDagmc:
                 the number of threads, so fewer threads lowers the peak RAM of large
                 models at the cost of speed. The thread count is restored afterwards so
                 the cadquery operations that follow are unaffected.
+                An ImprintOptions, or a dict of its fields, gives finer control,
+                for example imprint={"processes": 8, "threads": 4} imprints
+                clusters of solids that do not touch each other in 8 worker
+                processes of 4 threads each.
             set_size: a dictionary mapping volume IDs (int) or material tag names
                 (str) to target mesh sizes (floats). Material tags are resolved to
                 all volume IDs that have that tag.
             threads: the number of threads for Gmsh to use. 0 uses all
                 available cores (default), 1 uses a single thread.
+            binary: write the file in the binary form of the MSH 4.1 format
+                rather than as ASCII, which is smaller and many times quicker
+                to write and to read for large meshes.
+            partitions: the number of parts to partition the mesh into with
+                gmsh.model.mesh.partition, one for each rank of a parallel code
+                that is to read it. None, the default, leaves it whole.
+            split_partitions: write each part to a file of its own, named
+                after filename with the number of the part appended, for
+                example mesh_1.msh, so that each rank only reads its share.
+                Needs partitions.
         """
+        if partitions is not None:
+            _check_positive_int("partitions", partitions)
+        elif split_partitions:
+            raise ValueError("split_partitions needs the number of partitions")
 
         imprint, imprint_threads = resolve_imprint(imprint)
 
-        assembly = cq.Assembly()
-        for part in self.parts:
-            assembly.add(part)
+        assembly = self._cached().assembly
 
         if imprint:
             print("Imprinting assembly for mesh generation")
-            imprinted_assembly, _ = imprint_assembly(assembly, threads=imprint_threads)
+            imprinted_assembly, _ = self._imprint(imprint_threads)
         else:
             imprinted_assembly = assembly
 
-        # gmsh is a global singleton; finalize the session on every exit path
-        # (including a mid-mesh exception) so repeated calls don't accumulate
-        # models. gmsh_session_started is only set once init_gmsh() has bound
-        # the local gmsh name, keeping the finally safe if init_gmsh() itself
-        # raises. See issue #187.
-        gmsh_session_started = False
-        try:
-            gmsh = init_gmsh()
-            gmsh_session_started = True
-
-            gmsh, volumes = get_volumes(
-                gmsh, imprinted_assembly, method=method, scale_factor=scale_factor
-            )
-
+        with self._gmsh_model(
+            imprinted_assembly, method, scale_factor
+        ) as (gmsh, volumes):
             # Resolve any material tag strings in set_size to volume IDs
             resolved_set_size = None
             if set_size:
@@ -2106,6 +6546,18 @@ class CadToDagmc:
 
             gmsh.model.mesh.generate(dimensions)
 
+            if partitions is not None:
+                gmsh.model.mesh.partition(partitions)
+                # the partitions change the entities of the model
+                if self._gmsh_session is not None:
+                    self._gmsh_session.geometry = None
+
+            # set every time as a gmsh session keeps the options of the last
+            # export
+            gmsh.option.setNumber("Mesh.MshFileVersion", 4.1)
+            gmsh.option.setNumber("Mesh.Binary", int(binary))
+            gmsh.option.setNumber("Mesh.PartitionSplitMeshFiles", int(split_partitions))
+
             # makes the folder if it does not exist
             if Path(filename).parent:
                 Path(filename).parent.mkdir(parents=True, exist_ok=True)
@@ -2116,17 +6568,20 @@ class CadToDagmc:
             else:
                 gmsh.write(filename)
 
-            print(f"written GMSH mesh file {filename}")
-        finally:
-            if gmsh_session_started and gmsh.isInitialized():
-                gmsh.finalize()
+            if split_partitions:
+                print(
+                    f"written GMSH mesh file {filename} as {partitions} files, "
+                    f"one for each partition"
+                )
+            else:
+                print(f"written GMSH mesh file {filename}")
 
     def export_dagmc_h5m_file(
         self,
         filename: str = "dagmc.h5m",
         implicit_complement_material_tag: str | None = None,
         scale_factor: float = 1.0,
-        imprint: bool | int = True,
+        imprint: bool | int | ImprintOptions | dict = True,
         **kwargs,
     ) -> str:
         """Saves a DAGMC h5m file of the geometry
@@ -2156,6 +6611,10 @@ class CadToDagmc:
                 limited, the meshing that follows it keeps all its threads whichever
                 backend is used, and the thread count is restored afterwards so the
                 cadquery operations that follow are unaffected.
+                An ImprintOptions, or a dict of its fields, gives finer control,
+                for example imprint={"processes": 8, "threads": 4} imprints
+                clusters of solids that do not touch each other in 8 worker
+                processes of 4 threads each.
 
             **kwargs: Backend-specific parameters:
 
@@ -2169,12 +6628,54 @@ class CadToDagmc:
                   'cadquery' when cad-to-dagmc-mesher is not installed.
                 - h5m_backend (str, optional): 'pymoab' or 'h5py' for writing h5m files.
                   Defaults to 'h5py'.
+                - decimation_tolerance (float, optional): decimate the surface
+                  mesh before it is written, collapsing the vertices inside
+                  each face for as long as the surface stays within this
+                  distance of the mesh the backend made, in the units of the
+                  scaled geometry. The distance is estimated from the planes
+                  of the triangles around each removed vertex rather than
+                  measured between the meshes. Vertices on the boundaries of
+                  faces are never removed, so the volumes stay watertight.
+                  Planar faces meshed finely, as gmsh does with
+                  max_mesh_size, lose most of their triangles. Works with
+                  every backend, but not with unstructured_volumes,
+                  tet_volumes or surface_from_tets, as the surface would no
+                  longer match the tet mesh. Decimation takes around 150
+                  microseconds for each triangle. Defaults to None, no
+                  decimation.
+                - decimation_processes (int, optional): decimate the faces in
+                  this many worker processes, which pays off on surface
+                  meshes of hundreds of thousands of triangles or more.
+                  Defaults to None, decimating in this process.
+                - minimal_planar_faces (bool, optional): once the backend has
+                  meshed the surface, replace the triangles of each planar
+                  face with the fewest triangles spanning its boundary, as
+                  the backend discretised it. The backend still meshes the
+                  planar faces in full, so this reduces the triangles DAGMC
+                  gets but does not make meshing quicker. Curved faces keep
+                  the mesh the backend made. This matters most with gmsh,
+                  where max_mesh_size fills large flat walls with triangles.
+                  Works with every backend, but like decimation_tolerance
+                  not with a tet mesh. With decimation_tolerance the planar
+                  faces are triangulated before the rest is decimated.
+                  Defaults to False.
+                - surface_from_tets (bool, optional): fill every volume with
+                  tetrahedra in one meshing pass and write the faces of the
+                  tetrahedra on the boundary of each volume as its surface,
+                  with one surface for each pair of volumes that touch and one
+                  for the outside of each volume rather than one for each CAD
+                  face. The surface and the tet mesh are then conformal by
+                  construction. unstructured_volumes or tet_volumes still
+                  choose the volumes of the tet mesh written. Needs the gmsh
+                  backend, or the cad-to-dagmc-mesher backend with
+                  target_edge_length. Defaults to False.
 
                 For GMSH backend:
                 - min_mesh_size (float): minimum mesh element size
                 - max_mesh_size (float): maximum mesh element size
                 - mesh_algorithm (int): GMSH mesh algorithm (default: 1)
-                - method (str): import method 'file' or 'in memory' (default: 'file')
+                - method (str): import method 'file', 'in memory' or 'auto'
+                  (default: 'file')
                 - set_size (dict[int | str, float]): volume IDs (int) or material tag
                   names (str) mapped to target mesh sizes. Material tags are resolved
                   to all volume IDs that have that tag.
@@ -2186,16 +6687,68 @@ class CadToDagmc:
                   available cores (default), 1 uses a single thread.
 
                 For CadQuery backend:
-                - tolerance (float): meshing tolerance (default: 0.1), in the
-                  units of the scaled geometry (see scale_factor above)
+                - tolerance (float | dict[str, float]): meshing tolerance
+                  (default: 0.1), in the units of the scaled geometry (see
+                  scale_factor above). A dict maps material tags to the
+                  tolerance of the solids with that tag, and the other solids
+                  keep the default or take relative_tolerance. A face two
+                  solids share is meshed with the finer of their tolerances.
+                - relative_tolerance (float): the tolerance of each solid as a
+                  fraction of the diagonal of its bounding box, so large
+                  components are meshed more coarsely than small ones. Solids
+                  named in a tolerance dict keep their value, and a float
+                  tolerance given alongside is the largest any solid gets.
+                - max_triangles (int): the most triangles the h5m may have. The
+                  tolerances are scaled by one factor, solved for from a few
+                  coarse tessellations, so that the model comes in under it,
+                  and the model is then tessellated once, or again if the
+                  estimate was low. A tolerance, tolerance dict or
+                  relative_tolerance given alongside sets the proportions
+                  between solids and the finest tolerance that may be used.
+                  Selects the cadquery backend when no backend is given.
                 - angular_tolerance (float): angular tolerance (default: 0.1)
+                - processes (int): tessellate the solids in this many worker
+                  processes instead of in this one. Selects the cadquery
+                  backend when no backend is given. After imprinting the
+                  solids are independent, so shared faces come out the same
+                  from whichever worker meshes them and are welded back
+                  together. Scripts using this need an
+                  ``if __name__ == "__main__":`` guard.
+                - incremental (bool): keep the tessellation of each solid in a
+                  file next to the h5m, named after it with
+                  ".tessellation.npz" added, and on the next export to the
+                  same filename only mesh the solids that changed and their
+                  neighbours again. Selects the cadquery backend when no
+                  backend is given. Defaults to False.
+                - instancing (bool): mesh solids that are the same shape at
+                  different locations, such as repeated parts of a STEP
+                  assembly, once and move the vertices into place for the
+                  others. Solids sharing a face with another solid are always
+                  meshed on their own, as the copies of a shared face only
+                  weld into one surface when their vertices are equal to the
+                  last bit, so imprinted copies that touch their neighbours,
+                  such as bolts in a plate, save nothing. How many solids
+                  were instanced is printed. Selects the cadquery backend
+                  when no backend is given. Defaults to False.
+                - symmetry_order (int): the parts are one sector of a machine
+                  made of this many identical sectors. Only the sector is
+                  imprinted and meshed, and the mesh is rotated into place for
+                  the others, with the vertices on the cut planes welded so
+                  that the result is watertight. Selects the cadquery backend
+                  when no backend is given.
+                - symmetry_axis (tuple[float, float, float]): the direction of
+                  the axis of symmetry, which passes through the origin
+                  (default: (0, 0, 1)).
 
                 For cad-to-dagmc-mesher backend:
-                - tolerance (float): surface meshing tolerance (default: 0.01),
-                  in the units of the scaled geometry (see scale_factor above).
-                  With scale_factor=100 the 0.01 default is a 0.1 mm deflection,
-                  which on a large model can produce a very fine mesh and
-                  exhaust memory; scale the value with scale_factor.
+                - tolerance (float | dict[str, float]): surface meshing
+                  tolerance (default: 0.01), in the units of the scaled
+                  geometry (see scale_factor above). With scale_factor=100 the
+                  0.01 default is a 0.1 mm deflection, which on a large model
+                  can produce a very fine mesh and exhaust memory; scale the
+                  value with scale_factor. A dict maps material tags to
+                  tolerances, as for the CadQuery backend.
+                - relative_tolerance (float): as for the CadQuery backend.
                 - angular_tolerance (float): surface angular tolerance (default: 0.2)
                 - tet_volumes (Iterable[str]): material tag names of the volumes to
                   fill with tetrahedra for an unstructured volume mesh.
@@ -2212,11 +6765,199 @@ class CadToDagmc:
         Raises:
             ValueError: If invalid parameter combinations are used.
         """
+        h5m_backend = kwargs.get("h5m_backend", "h5py")
+        umesh_filename = kwargs.get("umesh_filename", "umesh.vtk")
+
+        with self._recording_timings(_timings_filename(filename)):
+            result = self._mesh(
+                scale_factor, imprint, kwargs, _tessellation_cache_filename(filename)
+            )
+
+            dagmc_filename = result.to_h5m(
+                filename, implicit_complement_material_tag, h5m_backend
+            )
+            if result.tetrahedra is None:
+                return dagmc_filename
+            return dagmc_filename, result.to_vtk(umesh_filename)
+
+    def export_dagmc_h5m_files(
+        self,
+        resolutions: Iterable[dict],
+        implicit_complement_material_tag: str | None = None,
+        scale_factor: float = 1.0,
+        imprint: bool | int | ImprintOptions | dict = True,
+        resolution_processes: int | None = None,
+        **kwargs,
+    ) -> list:
+        """Saves a DAGMC h5m file of the geometry at each of several mesh
+        resolutions, imprinting it once for all of them.
+
+        Useful for mesh convergence studies, where the imprint is the same for
+        every resolution and only the tessellation changes.
+
+        Args:
+            resolutions: one dict for each file, holding its filename and the
+                arguments that set its resolution, for example
+                [{"filename": "coarse.h5m", "tolerance": 1.0},
+                {"filename": "fine.h5m", "tolerance": 0.1}]. The arguments are
+                those of export_dagmc_h5m_file and are used over kwargs.
+            implicit_complement_material_tag: the name of the material tag to
+                use for the implicit complement (void space).
+            scale_factor: a scaling factor to apply to the geometry, as for
+                export_dagmc_h5m_file.
+            imprint: whether to imprint the geometry or not, as for
+                export_dagmc_h5m_file.
+            resolution_processes: mesh this many resolutions at once in worker
+                processes. The first resolution is meshed here, imprinting the
+                geometry, and the workers are given that imprint so none of
+                them imprints again. Scripts using this need an
+                ``if __name__ == "__main__":`` guard. Defaults to None, every
+                resolution meshed here one after the other.
+            **kwargs: the arguments of export_dagmc_h5m_file shared by every
+                resolution.
+
+        Returns:
+            list: what export_dagmc_h5m_file returned for each resolution, in
+            the order of resolutions.
+
+        Raises:
+            ValueError: if a resolution has no filename or two have the same.
+        """
+        resolutions = [dict(resolution) for resolution in resolutions]
+        if not resolutions:
+            raise ValueError("resolutions is empty, give at least one resolution.")
+        filenames = []
+        for resolution in resolutions:
+            if "filename" not in resolution:
+                raise ValueError(
+                    f"The resolution {resolution} has no filename, each one needs "
+                    "the filename of its h5m file."
+                )
+            filenames.append(str(resolution["filename"]))
+        if len(set(filenames)) != len(filenames):
+            raise ValueError(
+                f"The filenames of the resolutions must differ, got {filenames}."
+            )
+        if resolution_processes is not None:
+            _check_positive_int("resolution_processes", resolution_processes)
+
+        exports = [
+            {
+                "implicit_complement_material_tag": implicit_complement_material_tag,
+                "scale_factor": scale_factor,
+                "imprint": imprint,
+                **kwargs,
+                **resolution,
+            }
+            for resolution in resolutions
+        ]
+
+        results = [self.export_dagmc_h5m_file(**exports[0])]
+        if resolution_processes is None or len(exports) == 1:
+            results += [self.export_dagmc_h5m_file(**export) for export in exports[1:]]
+            return results
+
+        workers = min(resolution_processes, len(exports) - 1)
+        print(f"Meshing {len(exports) - 1} more resolutions in {workers} processes")
+        # spawn rather than fork, see _imprint_in_processes
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(
+                    _export_resolution,
+                    self.parts,
+                    self.material_tags,
+                    self._cached().names,
+                    self._cached().imprints,
+                    export,
+                )
+                for export in exports[1:]
+            ]
+            results += [future.result() for future in futures]
+        return results
+
+    def mesh(
+        self,
+        scale_factor: float = 1.0,
+        imprint: bool | int | ImprintOptions | dict = True,
+        **kwargs,
+    ) -> MeshResult:
+        """Meshes the geometry once, to be written to any number of files.
+
+        Imprinting and meshing are the slow part of an export, and the
+        MeshResult returned holds everything they make, so writing an h5m, a
+        msh, a vtk and an npz from it costs one meshing pass instead of one
+        for each file.
+
+        Args:
+            scale_factor: a scaling factor to apply to the geometry, as for
+                export_dagmc_h5m_file.
+            imprint: whether to imprint the geometry or not, as for
+                export_dagmc_h5m_file.
+            **kwargs: the backend selection and backend-specific parameters
+                of export_dagmc_h5m_file, apart from h5m_backend and
+                umesh_filename, which are given to the writers of the
+                MeshResult instead. unstructured_volumes for gmsh, or
+                tet_volumes and target_edge_length for cad-to-dagmc-mesher,
+                fill volumes with tetrahedra for MeshResult.to_vtk. As there
+                is no h5m filename to keep the tessellations next to,
+                incremental is the filename to keep them in rather than
+                True.
+
+        Returns:
+            MeshResult: the surface mesh, the tet mesh if one was asked for,
+            the material tags and which part each volume was made from.
+
+        Raises:
+            ValueError: If invalid parameter combinations are used.
+        """
+        for key, writer in (("h5m_backend", "to_h5m"), ("umesh_filename", "to_vtk")):
+            if key in kwargs:
+                raise ValueError(
+                    f"{key} is an argument of MeshResult.{writer}, not of mesh"
+                )
+
+        tessellation_filename = None
+        incremental = kwargs.get("incremental", False)
+        if incremental is not False:
+            if not isinstance(incremental, (str, os.PathLike)):
+                raise ValueError(
+                    f"incremental={incremental!r} is not valid for mesh, it must "
+                    "be the filename to keep the tessellations in, for example "
+                    "incremental='model.tessellation.npz'"
+                )
+            tessellation_filename = Path(incremental)
+            kwargs["incremental"] = True
+
+        with self._recording_timings():
+            return self._mesh(scale_factor, imprint, kwargs, tessellation_filename)
 
+    def _mesh(
+        self,
+        scale_factor: float,
+        imprint: bool | int | ImprintOptions | dict,
+        kwargs: dict,
+        tessellation_filename: Path | None,
+    ) -> MeshResult:
+        """The meshing behind mesh and export_dagmc_h5m_file.
+
+        kwargs are checked and the backend chosen as documented on
+        export_dagmc_h5m_file, and an incremental tessellation is kept in
+        tessellation_filename.
+        """
+        kwargs = dict(kwargs)
         imprint, imprint_threads = resolve_imprint(imprint)
 
         # Define all acceptable kwargs
-        cadquery_keys = {"tolerance", "angular_tolerance"}
+        cadquery_keys = {"tolerance", "angular_tolerance", "relative_tolerance"}
+        cadquery_only_keys = {
+            "processes",
+            "incremental",
+            "instancing",
+            "symmetry_order",
+            "symmetry_axis",
+            "max_triangles",
+        }
         gmsh_keys = {
             "min_mesh_size",
             "max_mesh_size",
@@ -2227,8 +6968,27 @@ class CadToDagmc:
             "unstructured_volumes",
             "threads",
         }
-        cad_to_dagmc_mesher_keys = {"tolerance", "angular_tolerance", "tet_volumes", "target_edge_length"}
-        all_acceptable_keys = cadquery_keys | gmsh_keys | cad_to_dagmc_mesher_keys | {"meshing_backend", "h5m_backend"}
+        cad_to_dagmc_mesher_keys = {
+            "tolerance",
+            "angular_tolerance",
+            "relative_tolerance",
+            "tet_volumes",
+            "target_edge_length",
+        }
+        all_acceptable_keys = (
+            cadquery_keys
+            | cadquery_only_keys
+            | gmsh_keys
+            | cad_to_dagmc_mesher_keys
+            | {
+                "meshing_backend",
+                "h5m_backend",
+                "decimation_tolerance",
+                "decimation_processes",
+                "minimal_planar_faces",
+                "surface_from_tets",
+            }
+        )
 
         # Check for invalid kwargs
         invalid_keys = set(kwargs.keys()) - all_acceptable_keys
@@ -2241,8 +7001,34 @@ class CadToDagmc:
         # Handle meshing_backend - either from kwargs or auto-detect
         meshing_backend = kwargs.pop("meshing_backend", None)
 
-        # Handle h5m_backend - pymoab or h5py
-        h5m_backend = kwargs.pop("h5m_backend", "h5py")
+        # h5m_backend is used by the writer, after meshing
+        kwargs.pop("h5m_backend", None)
+
+        # decimation_tolerance and minimal_planar_faces apply to the mesh of
+        # whichever backend is used
+        decimation_tolerance = kwargs.pop("decimation_tolerance", None)
+        if decimation_tolerance is not None:
+            _check_decimation_tolerance(decimation_tolerance)
+        decimation_processes = kwargs.pop("decimation_processes", None)
+        if decimation_processes is not None:
+            _check_positive_int("decimation_processes", decimation_processes)
+        minimal_planar_faces = kwargs.pop("minimal_planar_faces", False)
+        surface_from_tets = kwargs.pop("surface_from_tets", False)
+        # both change the surface after the tetrahedra are made against it,
+        # which would leave the two meshes no longer conformal
+        if decimation_tolerance is not None or minimal_planar_faces:
+            tet_mesh_keys = {
+                "surface_from_tets": surface_from_tets,
+                "unstructured_volumes": kwargs.get("unstructured_volumes"),
+                "tet_volumes": kwargs.get("tet_volumes"),
+            }
+            for key, value in tet_mesh_keys.items():
+                if value:
+                    raise ValueError(
+                        f"{key} cannot be combined with decimation_tolerance or "
+                        "minimal_planar_faces, as the surface would then no "
+                        "longer match the boundary of the tetrahedra."
+                    )
 
         if meshing_backend is None:
             # Auto-select meshing_backend based on kwargs. tolerance and
@@ -2261,7 +7047,25 @@ class CadToDagmc:
             has_cadquery = any(key in kwargs for key in cadquery_keys)
             has_gmsh = any(key in kwargs for key in gmsh_keys)
             has_mesher = any(key in kwargs for key in mesher_only_keys)
-            if has_mesher:
+            provided_cadquery_only = [
+                key for key in sorted(cadquery_only_keys) if key in kwargs
+            ]
+            if provided_cadquery_only and (has_mesher or has_gmsh):
+                provided_other = [
+                    key
+                    for key in sorted(gmsh_keys | mesher_only_keys)
+                    if key in kwargs
+                ]
+                raise ValueError(
+                    "Ambiguous backend: cadquery-specific arguments were provided "
+                    "along with arguments of another backend.\n"
+                    f"Provided cadquery arguments: {provided_cadquery_only}\n"
+                    f"Provided other arguments: {provided_other}\n"
+                    "Please set meshing_backend explicitly."
+                )
+            elif provided_cadquery_only:
+                meshing_backend = "cadquery"
+            elif has_mesher:
                 provided_gmsh = [key for key in sorted(gmsh_only_keys) if key in kwargs]
                 if provided_gmsh:
                     provided_mesher = [
@@ -2371,17 +7175,36 @@ class CadToDagmc:
         method = "file"
         set_size = None
         unstructured_volumes = None
-        umesh_filename = "umesh.vtk"
         threads = 0
+        processes = None
+        incremental = False
+        instancing = False
+        symmetry_order = None
+        symmetry_axis = (0.0, 0.0, 1.0)
+        max_triangles = None
         tet_data = None
+        tet_mesh = (None, None, None)
 
         # Extract backend-specific parameters with defaults
         if meshing_backend == "cadquery":
             # CadQuery parameters
             tolerance = kwargs.get("tolerance", 0.1)
             angular_tolerance = kwargs.get("angular_tolerance", 0.1)
-
-            if scale_factor != 1.0:
+            processes = kwargs.get("processes")
+            incremental = kwargs.get("incremental", False)
+            instancing = kwargs.get("instancing", False)
+            symmetry_order = kwargs.get("symmetry_order")
+            symmetry_axis = kwargs.get("symmetry_axis", (0.0, 0.0, 1.0))
+            relative_tolerance = kwargs.get("relative_tolerance")
+            max_triangles = kwargs.get("max_triangles")
+            if processes is not None:
+                _check_positive_int("processes", processes)
+            if symmetry_order is not None:
+                _check_symmetry_order(symmetry_order)
+
+            if scale_factor != 1.0 and not (
+                isinstance(tolerance, dict) or relative_tolerance is not None
+            ):
                 # Transitional warning: tolerance used to be in unscaled units
                 # for this backend only. Remove in a future release once the
                 # consistent behaviour has been out for a while.
@@ -2406,6 +7229,12 @@ class CadToDagmc:
                     "unstructured_volumes and tet_volumes must be None when "
                     "using 'cadquery' backend."
                 )
+            if surface_from_tets:
+                raise ValueError(
+                    "CadQuery backend cannot be used for volume meshing, so "
+                    "surface_from_tets needs the 'gmsh' or "
+                    "'cad-to-dagmc-mesher' backend."
+                )
 
             # Warn about unused GMSH and cad-to-dagmc-mesher parameters
             gmsh_params = [
@@ -2433,13 +7262,19 @@ class CadToDagmc:
             method = kwargs.get("method", "file")
             set_size = kwargs.get("set_size")
             unstructured_volumes = kwargs.get("unstructured_volumes")
-            umesh_filename = kwargs.get("umesh_filename", "umesh.vtk")
             threads = kwargs.get("threads", 0)
 
             # Warn about unused CadQuery and cad-to-dagmc-mesher parameters
             non_gmsh_params = [
                 "tolerance",
                 "angular_tolerance",
+                "relative_tolerance",
+                "processes",
+                "incremental",
+                "instancing",
+                "symmetry_order",
+                "symmetry_axis",
+                "max_triangles",
                 "tet_volumes",
                 "target_edge_length",
             ]
@@ -2453,10 +7288,16 @@ class CadToDagmc:
         elif meshing_backend == "cad-to-dagmc-mesher":
             tolerance = kwargs.get("tolerance", 0.01)
             angular_tolerance = kwargs.get("angular_tolerance", 0.2)
+            unused_params = [
+                param for param in sorted(cadquery_only_keys) if param in kwargs
+            ]
+            if unused_params:
+                warnings.warn(
+                    "The following parameters are ignored when using "
+                    f"cad-to-dagmc-mesher backend: {', '.join(unused_params)}"
+                )
 
-        assembly = cq.Assembly()
-        for part in self.parts:
-            assembly.add(part)
+        assembly = self._cached().assembly
 
         original_ids = get_ids_from_assembly(assembly)
 
@@ -2466,95 +7307,259 @@ class CadToDagmc:
             msg = f"Number of volumes {len(original_ids)} is not equal to number of material tags {len(self.material_tags)}"
             raise ValueError(msg)
 
-        # The gmsh backend opens a gmsh session (gmsh is a global singleton).
-        # Wrap the whole meshing and export in try/finally so the session is
-        # always finalized - on every return path and even if meshing raises
-        # part way through. Without this, repeated calls accumulate gmsh models
-        # in the session (see issue #187). gmsh_session_started is only set once
-        # init_gmsh() has run, so the finally never touches the (function-local)
-        # gmsh name before it is bound and never finalizes a session the caller
-        # may own when using a non-gmsh backend.
-        gmsh_session_started = False
-        try:
-            # Use the CadQuery direct mesh plugin
-            if meshing_backend == "cadquery":
-                import cadquery_direct_mesh_plugin
-                # tolerance is documented as being in the units of the scaled
-                # geometry, matching the gmsh and cad-to-dagmc-mesher backends
-                # (both of which scale the geometry before meshing it). This
-                # backend is the odd one out: the plugin tessellates the
-                # unscaled solids and multiplies the resulting vertices by
-                # scale_factor afterwards, so the tolerance it is given is in
-                # unscaled units. Convert so the same number means the same
-                # deflection on the output mesh whichever backend is used.
+        # Use the CadQuery direct mesh plugin
+        if meshing_backend == "cadquery":
+            import cadquery_direct_mesh_plugin
+            # tolerance is documented as being in the units of the scaled
+            # geometry, matching the gmsh and cad-to-dagmc-mesher backends
+            # (both of which scale the geometry before meshing it). This
+            # backend is the odd one out: the plugin tessellates the
+            # unscaled solids and multiplies the resulting vertices by
+            # scale_factor afterwards, so the tolerance it is given is in
+            # unscaled units. Convert so the same number means the same
+            # deflection on the output mesh whichever backend is used.
+            # A tolerance for each solid is worked out once the solids
+            # are imprinted, see below.
+            per_solid_tolerance = (
+                isinstance(tolerance, dict) or relative_tolerance is not None
+            )
+            if per_solid_tolerance:
+                cq_tolerance = (
+                    tuple(tolerance.items())
+                    if isinstance(tolerance, dict)
+                    else kwargs.get("tolerance"),
+                    relative_tolerance,
+                    tuple(self.material_tags),
+                )
+            else:
                 cq_tolerance = tolerance / scale_factor
-                # Mesh the assembly using CadQuery's direct-mesh plugin. The
-                # plugin imprints internally, so the limit is put on the
-                # imprint itself and the tessellation keeps all its threads.
-                with imprint_thread_limit(imprint_threads):
-                    cq_mesh = assembly.toMesh(
-                        imprint=imprint,
-                        tolerance=cq_tolerance,
-                        angular_tolerance=angular_tolerance,
-                        scale_factor=scale_factor,
-                    )
 
-                # Fix the material tag order for imprinted assemblies
-                if cq_mesh["imprinted_assembly"] is not None:
-                    imprinted_solids_with_org_id = cq_mesh[
-                        "imprinted_solids_with_orginal_ids"
-                    ]
-
-                    scrambled_ids = get_ids_from_imprinted_assembly(
-                        imprinted_solids_with_org_id
-                    )
+            # Both ways of tessellating below give the same mesh, so it is
+            # decided by the imprint and the tolerances alone.
+            imprint_key = None
+            if imprint:
+                options = _as_imprint_options(imprint_threads)
+                imprint_key = tuple(
+                    getattr(options, name) for name in _BOP_OPTION_NAMES
+                )
+            # an incremental export also has to write its tessellations
+            # to tessellation_filename
+            tessellation_key = (
+                imprint_key,
+                cq_tolerance,
+                angular_tolerance,
+                scale_factor,
+                tessellation_filename if incremental else None,
+                instancing,
+                max_triangles,
+                symmetry_order,
+            )
+            cache = self._cached()
 
-                    material_tags_in_brep_order = order_material_ids_by_brep_order(
-                        original_ids, scrambled_ids, self.material_tags
-                    )
+            if tessellation_key in cache.tessellations:
+                print("Reusing the tessellation of a previous export")
+                vertices, triangles_by_solid_by_face, scrambled_ids = (
+                    cache.tessellations[tessellation_key]
+                )
+                triangles_by_solid_by_face = _copy_of_mapping(
+                    triangles_by_solid_by_face
+                )
+            else:
+                cache.clean_triangulations()
+                scrambled_ids = None
+                if (
+                    processes is not None
+                    or incremental
+                    or instancing
+                    or per_solid_tolerance
+                    or max_triangles is not None
+                ):
+                    # The same tessellation as the plugin, spread over
+                    # worker processes, taken from the last export where
+                    # the solids have not changed, moved from a congruent
+                    # solid, with a tolerance for each solid, or within a
+                    # triangle budget. Imprinting happens here first, as
+                    # for gmsh.
+                    if imprint:
+                        print("Imprinting assembly for mesh generation")
+                        imprinted_assembly, imprinted_solids_with_org_id = (
+                            self._imprint(imprint_threads)
+                        )
+                        solids = imprinted_assembly.Solids()
+                        scrambled_ids = get_ids_from_imprinted_assembly(
+                            imprinted_solids_with_org_id
+                        )
+                    else:
+                        solids = [
+                            child.obj.moved(child.loc)
+                            for child in assembly.children
+                        ]
+
+                    if per_solid_tolerance:
+                        cq_tolerance = [
+                            solid_tolerance / scale_factor
+                            for solid_tolerance in resolve_tolerances(
+                                solids,
+                                (
+                                    order_material_ids_by_brep_order(
+                                        original_ids,
+                                        scrambled_ids,
+                                        self.material_tags,
+                                    )
+                                    if scrambled_ids is not None
+                                    else self.material_tags
+                                ),
+                                kwargs.get("tolerance"),
+                                relative_tolerance,
+                                default=0.1,
+                                scale_factor=scale_factor,
+                            )
+                        ]
+
+                    if max_triangles is not None:
+                        # every sector takes its share of the budget
+                        vertices, triangles_by_solid_by_face = (
+                            tessellate_within_budget(
+                                solids,
+                                max_triangles // (symmetry_order or 1),
+                                tolerance=cq_tolerance,
+                                angular_tolerance=angular_tolerance,
+                                scale_factor=scale_factor,
+                                processes=processes,
+                                instancing=instancing,
+                                cache_filename=(
+                                    tessellation_filename if incremental else None
+                                ),
+                                coarsen_only=any(
+                                    key in kwargs
+                                    for key in ("tolerance", "relative_tolerance")
+                                ),
+                            )
+                        )
+                    elif incremental:
+                        vertices, triangles_by_solid_by_face = (
+                            tessellate_incrementally(
+                                solids,
+                                tolerance=cq_tolerance,
+                                angular_tolerance=angular_tolerance,
+                                cache_filename=tessellation_filename,
+                                scale_factor=scale_factor,
+                                processes=processes,
+                                instancing=instancing,
+                            )
+                        )
+                    else:
+                        vertices, triangles_by_solid_by_face = _stitch_solids(
+                            _tessellate_each_solid(
+                                solids,
+                                cq_tolerance,
+                                angular_tolerance,
+                                processes,
+                                instancing,
+                            ),
+                            scale_factor,
+                        )
                 else:
-                    material_tags_in_brep_order = self.material_tags
+                    # Mesh the assembly using CadQuery's direct-mesh
+                    # plugin. The plugin imprints internally, so the limit
+                    # is put on the imprint itself and the tessellation
+                    # keeps all its threads.
+                    with imprint_thread_limit(
+                        imprint_threads, self.imprint_history, cache
+                    ), _stage("tessellation"):
+                        cq_mesh = assembly.toMesh(
+                            imprint=imprint,
+                            tolerance=cq_tolerance,
+                            angular_tolerance=angular_tolerance,
+                            scale_factor=scale_factor,
+                        )
+
+                    if cq_mesh["imprinted_assembly"] is not None:
+                        scrambled_ids = get_ids_from_imprinted_assembly(
+                            cq_mesh["imprinted_solids_with_orginal_ids"]
+                        )
 
-                check_material_tags(material_tags_in_brep_order, self.parts)
+                    # Extract the mesh information to allow export to h5m
+                    # from the direct-mesh result
+                    vertices = cq_mesh["vertices"]
+                    triangles_by_solid_by_face = cq_mesh[
+                        "solid_face_triangle_vertex_map"
+                    ]
 
-                # Extract the mesh information to allow export to h5m from the direct-mesh result
-                vertices = cq_mesh["vertices"]
-                triangles_by_solid_by_face = cq_mesh["solid_face_triangle_vertex_map"]
                 if imprint:
                     triangles_by_solid_by_face = share_coincident_face_ids(
                         triangles_by_solid_by_face
                     )
-            # Use gmsh
-            elif meshing_backend == "gmsh":
-                # If assembly is not to be imprinted, pass through the assembly as-is
-                if imprint:
-                    print("Imprinting assembly for mesh generation")
-                    imprinted_assembly, imprinted_solids_with_org_id = (
-                        imprint_assembly(assembly, threads=imprint_threads)
-                    )
-
-                    scrambled_ids = get_ids_from_imprinted_assembly(
-                        imprinted_solids_with_org_id
-                    )
+                # the cache keeps read only arrays, and each export is given
+                # mappings of its own, so that changing the mesh of one export
+                # does not change the mesh of those that reuse it
+                vertices, triangles_by_solid_by_face = _read_only_tessellation(
+                    vertices, triangles_by_solid_by_face
+                )
+                cache.store_tessellation(
+                    tessellation_key,
+                    (vertices, triangles_by_solid_by_face, scrambled_ids),
+                )
+                triangles_by_solid_by_face = _copy_of_mapping(
+                    triangles_by_solid_by_face
+                )
 
-                    material_tags_in_brep_order = order_material_ids_by_brep_order(
-                        original_ids, scrambled_ids, self.material_tags
+            # Fix the material tag order for imprinted assemblies
+            if scrambled_ids is not None:
+                material_tags_in_brep_order = order_material_ids_by_brep_order(
+                    original_ids, scrambled_ids, self.material_tags
+                )
+                part_ids = order_material_ids_by_brep_order(
+                    original_ids, scrambled_ids, range(len(original_ids))
+                )
+            else:
+                material_tags_in_brep_order = self.material_tags
+                part_ids = list(range(len(original_ids)))
+
+            check_material_tags(material_tags_in_brep_order, self.parts)
+
+            if symmetry_order is not None:
+                vertices, triangles_by_solid_by_face, material_tags_in_brep_order = (
+                    replicate_sector(
+                        vertices,
+                        triangles_by_solid_by_face,
+                        material_tags_in_brep_order,
+                        symmetry_order,
+                        symmetry_axis,
                     )
+                )
+                part_ids = part_ids * symmetry_order
+        # Use gmsh
+        elif meshing_backend == "gmsh":
+            # If assembly is not to be imprinted, pass through the assembly as-is
+            if imprint:
+                print("Imprinting assembly for mesh generation")
+                imprinted_assembly, imprinted_solids_with_org_id = (
+                    self._imprint(imprint_threads)
+                )
 
-                else:
-                    material_tags_in_brep_order = self.material_tags
-                    imprinted_assembly = assembly
+                scrambled_ids = get_ids_from_imprinted_assembly(
+                    imprinted_solids_with_org_id
+                )
 
-                check_material_tags(material_tags_in_brep_order, self.parts)
+                material_tags_in_brep_order = order_material_ids_by_brep_order(
+                    original_ids, scrambled_ids, self.material_tags
+                )
+                part_ids = order_material_ids_by_brep_order(
+                    original_ids, scrambled_ids, range(len(original_ids))
+                )
 
-                # Start generating the mesh
-                gmsh = init_gmsh()
-                gmsh_session_started = True
+            else:
+                material_tags_in_brep_order = self.material_tags
+                part_ids = list(range(len(original_ids)))
+                imprinted_assembly = assembly
 
-                gmsh, volumes = get_volumes(
-                    gmsh, imprinted_assembly, method=method, scale_factor=scale_factor
-                )
+            check_material_tags(material_tags_in_brep_order, self.parts)
 
+            # Start generating the mesh
+            with self._gmsh_model(
+                imprinted_assembly, method, scale_factor
+            ) as (gmsh, volumes):
                 # Resolve any material tag strings in set_size to volume IDs
                 resolved_set_size = None
                 if set_size:
@@ -2572,126 +7577,193 @@ class CadToDagmc:
                     threads=threads,
                 )
 
-                gmsh.model.mesh.generate(2)
+                if surface_from_tets:
+                    # one pass makes the tetrahedra of every volume, and the
+                    # surface is taken from them rather than from gmsh
+                    with _stage("volume meshing"):
+                        gmsh.model.mesh.generate(3)
+                    volume_ids = [volume_id for _, volume_id in volumes]
+                    vertices, triangles_by_solid_by_face = surface_from_tetrahedra(
+                        *_gmsh_tetrahedra(volume_ids), volume_ids
+                    )
+                    if unstructured_volumes:
+                        unstructured_volumes = resolve_unstructured_volumes(
+                            unstructured_volumes, volumes, material_tags_in_brep_order
+                        )
+                        tet_mesh = _gmsh_tetrahedra(unstructured_volumes)
+                else:
+                    with _stage("tessellation"):
+                        gmsh.model.mesh.generate(2)
 
-                vertices, triangles_by_solid_by_face = mesh_to_vertices_and_triangles(
-                    dims_and_vol_ids=volumes
-                )
+                        vertices, triangles_by_solid_by_face = (
+                            mesh_to_vertices_and_triangles(dims_and_vol_ids=volumes)
+                        )
 
-            elif meshing_backend == "cad-to-dagmc-mesher":
-                tet_volumes_arg = kwargs.get("tet_volumes", kwargs.get("unstructured_volumes"))
-                target_edge_length = kwargs.get("target_edge_length")
-                umesh_filename = kwargs.get("umesh_filename", umesh_filename)
-
-                # A volume (tet) mesh needs BOTH tet_volumes and
-                # target_edge_length. Passing only one (or asking for a
-                # umesh_filename without them) is a user error: fail fast with a
-                # clear message rather than silently writing no .vtk and
-                # returning a bare string instead of the (h5m, vtk) tuple.
-                wants_umesh = (
-                    bool(tet_volumes_arg)
-                    or target_edge_length is not None
-                    or "umesh_filename" in kwargs
-                )
-                if wants_umesh and not (tet_volumes_arg and target_edge_length):
-                    raise ValueError(
-                        "Writing an unstructured volume mesh with the "
-                        "cad-to-dagmc-mesher backend requires BOTH tet_volumes "
-                        "(material tag names) and target_edge_length. Got "
-                        f"tet_volumes={tet_volumes_arg!r}, "
-                        f"target_edge_length={target_edge_length!r}."
-                    )
+                    if unstructured_volumes:
+                        # Resolve any material tag strings to volume IDs
+                        unstructured_volumes = resolve_unstructured_volumes(
+                            unstructured_volumes, volumes, material_tags_in_brep_order
+                        )
+                        # remove all the unused occ volumes, this prevents them being meshed
+                        _remove_gmsh_volumes(gmsh, volumes, unstructured_volumes)
+                        # the model no longer holds the whole geometry to mesh again
+                        if self._gmsh_session is not None:
+                            self._gmsh_session.geometry = None
+
+                        # the triangles of the faces left are those of the h5m,
+                        # so the tetrahedra are filled in against them
+                        with _stage("volume meshing"):
+                            gmsh.model.mesh.generate(3)
+                        tet_mesh = _gmsh_tetrahedra(unstructured_volumes)
 
-                # scale_factor is applied to the geometry before meshing so the
-                # h5m and .vtk match the gmsh/cadquery backends (which scale).
-                mesher_assembly = _build_assembly(
-                    self.parts, scale_factor,
-                    names=_solid_names(self.material_tags),
+        elif meshing_backend == "cad-to-dagmc-mesher":
+            tet_volumes_arg = kwargs.get("tet_volumes", kwargs.get("unstructured_volumes"))
+            target_edge_length = kwargs.get("target_edge_length")
+
+            # A volume (tet) mesh needs BOTH tet_volumes and
+            # target_edge_length. Passing only one (or asking for a
+            # umesh_filename without them) is a user error: fail fast with a
+            # clear message rather than silently writing no .vtk and
+            # returning a bare string instead of the (h5m, vtk) tuple.
+            if surface_from_tets and not target_edge_length:
+                raise ValueError(
+                    "surface_from_tets with the cad-to-dagmc-mesher backend "
+                    "requires target_edge_length, the length of the edges of "
+                    f"the tetrahedra. Got target_edge_length={target_edge_length!r}."
+                )
+            # with surface_from_tets every volume is filled with tetrahedra
+            # and target_edge_length no longer asks for a tet mesh on its own
+            wants_umesh = (
+                bool(tet_volumes_arg)
+                or (target_edge_length is not None and not surface_from_tets)
+                or "umesh_filename" in kwargs
+            )
+            if wants_umesh and not (tet_volumes_arg and target_edge_length):
+                raise ValueError(
+                    "Writing an unstructured volume mesh with the "
+                    "cad-to-dagmc-mesher backend requires BOTH tet_volumes "
+                    "(material tag names) and target_edge_length. Got "
+                    f"tet_volumes={tet_volumes_arg!r}, "
+                    f"target_edge_length={target_edge_length!r}."
                 )
 
-                vertices, triangles_by_solid_by_face, material_tags_in_brep_order, tet_data = (
-                    _mesh_with_cad_to_dagmc_mesher(
-                        assembly=mesher_assembly,
-                        material_tags=self.material_tags,
-                        tolerance=tolerance,
-                        angular_tolerance=angular_tolerance,
-                        tet_volumes=tet_volumes_arg,
-                        target_edge_length=target_edge_length,
-                        imprint=imprint,
-                        imprint_threads=imprint_threads,
-                    )
+            # scale_factor is applied to the geometry before meshing so the
+            # h5m and .vtk match the gmsh/cadquery backends (which scale).
+            mesher_assembly = _build_assembly(
+                self.parts, scale_factor,
+                names=_solid_names(self.material_tags),
+            )
+
+            if isinstance(tolerance, dict) or "relative_tolerance" in kwargs:
+                tolerance = resolve_tolerances(
+                    self.parts,
+                    self.material_tags,
+                    kwargs.get("tolerance"),
+                    kwargs.get("relative_tolerance"),
+                    default=0.01,
+                    scale_factor=scale_factor,
                 )
 
-            else:
-                raise ValueError(
-                    f'meshing_backend {meshing_backend} not supported. '
-                    'Available options are "cadquery", "gmsh", or "cad-to-dagmc-mesher"'
+            (
+                vertices,
+                triangles_by_solid_by_face,
+                material_tags_in_brep_order,
+                part_ids,
+                tet_data,
+            ) = _mesh_with_cad_to_dagmc_mesher(
+                assembly=mesher_assembly,
+                material_tags=self.material_tags,
+                tolerance=tolerance,
+                angular_tolerance=angular_tolerance,
+                tet_volumes=self.material_tags if surface_from_tets else tet_volumes_arg,
+                target_edge_length=target_edge_length,
+                imprint=imprint,
+                imprint_threads=imprint_threads,
+                imprint_history=self.imprint_history,
+            )
+
+            if surface_from_tets:
+                # the surface the mesher made is replaced by the boundary of
+                # its tetrahedra, and only the volumes of tet_volumes are
+                # kept for the tet mesh
+                solid_ids = list(triangles_by_solid_by_face)
+                tet_vertices, tetrahedra = combine_tet_meshes(tet_data or {})
+                vertices, triangles_by_solid_by_face = surface_from_tetrahedra(
+                    tet_vertices,
+                    tetrahedra,
+                    _tet_volume_ids(tet_data or {}),
+                    solid_ids,
                 )
+                tet_tags = set(tet_volumes_arg or ())
+                tet_data = {
+                    solid_id: tet_data[solid_id]
+                    for solid_id, tag in zip(solid_ids, material_tags_in_brep_order)
+                    if tag in tet_tags and solid_id in tet_data
+                }
 
-            dagmc_filename = vertices_to_h5m(
-                vertices=vertices,
-                triangles_by_solid_by_face=triangles_by_solid_by_face,
-                material_tags=material_tags_in_brep_order,
-                h5m_filename=filename,
-                implicit_complement_material_tag=implicit_complement_material_tag,
-                method=h5m_backend,
+        else:
+            raise ValueError(
+                f'meshing_backend {meshing_backend} not supported. '
+                'Available options are "cadquery", "gmsh", or "cad-to-dagmc-mesher"'
+            )
+
+        if minimal_planar_faces:
+            vertices, triangles_by_solid_by_face = triangulate_planar_faces(
+                vertices, triangles_by_solid_by_face
+            )
+        if decimation_tolerance is not None:
+            vertices, triangles_by_solid_by_face = decimate_surface(
+                vertices,
+                triangles_by_solid_by_face,
+                decimation_tolerance,
+                decimation_processes,
             )
 
-            if meshing_backend == "gmsh" and unstructured_volumes:
-                # Resolve any material tag strings to volume IDs
-                unstructured_volumes = resolve_unstructured_volumes(
-                    unstructured_volumes, volumes, material_tags_in_brep_order
+        # The cad-to-dagmc-mesher backend produces the tetrahedra itself
+        # (when tet_volumes + target_edge_length are given). Combine the
+        # per-solid tet meshes into one without going through gmsh. Keying
+        # on the user's request (both tet args, guaranteed present
+        # together by the check above) rather than on tet_data means a
+        # mesher that unexpectedly yields no tets raises here instead of
+        # silently returning a mesh without them.
+        if meshing_backend == "cad-to-dagmc-mesher" and tet_volumes_arg and target_edge_length:
+            if not tet_data:
+                raise ValueError(
+                    "cad-to-dagmc-mesher produced no tetrahedra despite "
+                    f"tet_volumes={tet_volumes_arg!r} and "
+                    f"target_edge_length={target_edge_length!r}. Check that "
+                    "tet_volumes contains valid material tags."
                 )
-                # remove all the unused occ volumes, this prevents them being meshed
-                for volume_dim, volume_id in volumes:
-                    if volume_id not in unstructured_volumes:
-                        gmsh.model.occ.remove(
-                            [(volume_dim, volume_id)], recursive=True
-                        )
-                gmsh.option.setNumber("Mesh.SaveAll", 1)
-                gmsh.model.occ.synchronize()
+            tet_vertices, tetrahedra = combine_tet_meshes(tet_data)
+            tet_mesh = (tet_vertices, tetrahedra, _tet_volume_ids(tet_data))
 
-                # removes all the 2D groups so that 2D faces are not included in the vtk file
-                all_2d_groups = gmsh.model.getPhysicalGroups(2)
-                for entry in all_2d_groups:
-                    gmsh.model.removePhysicalGroups([entry])
+        return MeshResult(
+            vertices=_vertex_array(vertices),
+            triangles_by_solid_by_face=triangles_by_solid_by_face,
+            material_tags=list(material_tags_in_brep_order),
+            part_ids=list(part_ids),
+            tet_vertices=tet_mesh[0],
+            tetrahedra=tet_mesh[1],
+            tet_volume_ids=tet_mesh[2],
+        )
 
-                gmsh.model.mesh.generate(3)
-                gmsh.option.setNumber(
-                    "Mesh.SaveElementTagType", 3
-                )  # Save only volume elements
-                gmsh.write(umesh_filename)
-
-                return dagmc_filename, umesh_filename
-
-            # The cad-to-dagmc-mesher backend produces the tetrahedra itself
-            # (when tet_volumes + target_edge_length are given). Combine the
-            # per-solid tet meshes and write a .vtk unstructured volume mesh
-            # without going through gmsh. Keying on the user's request (both
-            # tet args, guaranteed present together by the check above) rather
-            # than on tet_data means a mesher that unexpectedly yields no tets
-            # raises here instead of silently returning a bare string.
-            if meshing_backend == "cad-to-dagmc-mesher" and tet_volumes_arg and target_edge_length:
-                if not tet_data:
-                    raise ValueError(
-                        "cad-to-dagmc-mesher produced no tetrahedra despite "
-                        f"tet_volumes={tet_volumes_arg!r} and "
-                        f"target_edge_length={target_edge_length!r}. Check that "
-                        "tet_volumes contains valid material tags."
-                    )
-                tet_vertices, tetrahedra = combine_tet_meshes(tet_data)
-                if Path(umesh_filename).parent:
-                    Path(umesh_filename).parent.mkdir(parents=True, exist_ok=True)
-                write_vtk(umesh_filename, tet_vertices, tetrahedra)
-                print(f"written unstructured mesh file {umesh_filename}")
-                return dagmc_filename, umesh_filename
-
-            return dagmc_filename
-        finally:
-            if gmsh_session_started and gmsh.isInitialized():
-                gmsh.finalize()
 
+def _export_resolution(parts, material_tags, names, imprints, export_kwargs):
+    """Export one resolution of export_dagmc_h5m_files in a worker process.
 
+    The imprints of the parent are put in the cache of a model of the same
+    parts, with an assembly of the same names, so the export finds the
+    imprint it needs there instead of imprinting again.
+    """
+    model = CadToDagmc()
+    model.parts = parts
+    model.material_tags = material_tags
+    model._cache = _ExportCache(parts, names)
+    model._cache.imprints.update(imprints)
+    return model.export_dagmc_h5m_file(**export_kwargs)
+
+
+@_stage("assembly build")
 def _build_assembly(parts, scale_factor: float = 1.0, names=None):
     """Build a CadQuery assembly from parts, optionally scaling each part.
 
@@ -2727,17 +7799,22 @@ def _solid_names(material_tags) -> list[str]:
     return [f"{tag}#{i}" for i, tag in enumerate(material_tags)]
 
 
+@_stage("tessellation")
 def _mesh_with_cad_to_dagmc_mesher(
     assembly, material_tags, tolerance, angular_tolerance,
     tet_volumes, target_edge_length, imprint, imprint_threads=None,
+    imprint_history=None,
 ):
     """Mesh using cad-to-dagmc-mesher and return vertices_to_h5m-compatible output.
 
-    Returns ``(vertices, triangles_by_solid_by_face, material_tags,
-    tet_data)`` where ``tet_data`` is the per-solid tetrahedral mesh dict
+    Returns ``(vertices, triangles_by_solid_by_face, material_tags, part_ids,
+    tet_data)`` where ``part_ids`` is the index in ``material_tags`` each
+    solid was given at, and ``tet_data`` is the per-solid tetrahedral mesh dict
     (``{solid_id: {"vertices": ..., "tetrahedra": ..., ...}}``) or ``None``
     when no solids were volume-meshed. Volume meshing only happens when both
-    ``tet_volumes`` and ``target_edge_length`` are supplied.
+    ``tet_volumes`` and ``target_edge_length`` are supplied. ``tolerance`` is
+    one value for every solid or a list with one for each, in the order of
+    ``material_tags``.
     """
     try:
         from cad_to_dagmc_mesher.cad import (
@@ -2760,11 +7837,14 @@ def _mesh_with_cad_to_dagmc_mesher(
     #    survives the mesher returning solids in a different order.
     names = _solid_names(material_tags)
     tag_by_name = dict(zip(names, material_tags))
+    index_by_name = {name: index for index, name in enumerate(names)}
     tet_tags = set(tet_volumes or ())
+    if not isinstance(tolerance, list):
+        tolerance = [tolerance] * len(names)
     configs = [
         SolidConfig(
             name=name,
-            tolerance=tolerance,
+            tolerance=solid_tolerance,
             angular_tolerance=angular_tolerance,
             target_edge_length=(
                 target_edge_length
@@ -2772,13 +7852,13 @@ def _mesh_with_cad_to_dagmc_mesher(
                 else None
             ),
         )
-        for name in names
+        for name, solid_tolerance in zip(names, tolerance)
     ]
 
     # The mesher imprints internally, so the limit is put on the imprint
     # itself and the meshing keeps all its threads.
     try:
-        with imprint_thread_limit(imprint_threads):
+        with imprint_thread_limit(imprint_threads, imprint_history):
             result = mesh_assembly(
                 assembly,
                 solid_config=configs,
@@ -2788,6 +7868,7 @@ def _mesh_with_cad_to_dagmc_mesher(
             result["vertices"],
             result["triangles_by_solid_by_face"],
             [tag_by_name[name] for name in result["material_tags"]],
+            [index_by_name[name] for name in result["material_tags"]],
             result.get("tet_data"),
         )
     except OverlappingSolidsError as e:
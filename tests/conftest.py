@@ -1,8 +1,13 @@
 """Pytest configuration and fixtures for cad_to_dagmc tests."""
 
 import os
+
+import cadquery as cq
+import h5py
 import pytest
 
+from cad_to_dagmc import CadToDagmc
+
 
 # Check if pymoab is available
 try:
@@ -45,6 +50,42 @@ def h5m_backend(request):
     return request.config.getoption("--h5m-backend")
 
 
+@pytest.fixture
+def ball_in_cup():
+    """Fixture that returns a function making the model of a ball resting in
+    a cup, a new CadToDagmc on each call."""
+
+    def make():
+        model = CadToDagmc()
+        model.add_cadquery_object(cq.Workplane().sphere(5), material_tags=["ball"])
+        model.add_cadquery_object(
+            cq.Workplane().box(12, 12, 8).translate((0, 0, -2)).cut(cq.Workplane().sphere(5)),
+            material_tags=["cup"],
+        )
+        return model
+
+    return make
+
+
+def read_h5m(filename):
+    """The vertex coordinates and triangle connectivity of an h5m file."""
+    with h5py.File(filename, "r") as f:
+        return (
+            f["tstt/nodes/coordinates"][()],
+            f["tstt/elements/Tri3/connectivity"][()],
+        )
+
+
+def topology(shape):
+    """The number of solids, faces, edges and vertices of shape."""
+    return (
+        len(shape.Solids()),
+        len(shape.Faces()),
+        len(shape.Edges()),
+        len(shape.Vertices()),
+    )
+
+
 def pytest_collection_modifyitems(config, items):
     """Skip tests if required dependencies are not installed."""
     skip_pymoab = pytest.mark.skip(reason="pymoab not installed")
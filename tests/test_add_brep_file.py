@@ -0,0 +1,76 @@
+"""Tests for loading BRep files, text and binary, with add_brep_file."""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc, import_brep_file
+
+
+def _two_cubes():
+    return cq.Compound.makeCompound(
+        [
+            cq.Solid.makeBox(1, 1, 1),
+            cq.Solid.makeBox(1, 1, 1).translate((1, 0, 0)),
+        ]
+    )
+
+
+@pytest.fixture(params=["text", "binary"])
+def brep_file(request, tmp_path):
+    filename = tmp_path / f"two_cubes_{request.param}.brep"
+    if request.param == "text":
+        _two_cubes().exportBrep(str(filename))
+    else:
+        _two_cubes().exportBin(str(filename))
+    return filename
+
+
+def test_both_formats_are_read(brep_file):
+    shape = import_brep_file(brep_file)
+
+    assert len(shape.Solids()) == 2
+    assert shape.BoundingBox().xlen == pytest.approx(2)
+
+
+def test_text_brep_from_the_tests_is_read():
+    model = CadToDagmc()
+
+    assert model.add_brep_file("tests/test_two_joined_cubes.brep", material_tags=["a", "b"]) == 2
+    assert model.material_tags == ["a", "b"]
+
+
+def test_scale_factor_scales_the_parts(brep_file):
+    model = CadToDagmc()
+    model.add_brep_file(brep_file, scale_factor=10, material_tags=["a", "b"])
+
+    assert [part.BoundingBox().xlen for part in model.parts] == pytest.approx([10, 10])
+
+
+def test_wrong_number_of_material_tags_is_rejected(brep_file):
+    with pytest.raises(ValueError):
+        CadToDagmc().add_brep_file(brep_file, material_tags=["a"])
+
+
+@pytest.mark.parametrize("material_tags", ["assembly_names", "assembly_materials"])
+def test_assembly_tags_are_rejected(brep_file, material_tags):
+    with pytest.raises(ValueError, match="assembly structure"):
+        CadToDagmc().add_brep_file(brep_file, material_tags=material_tags)
+
+
+def test_h5m_matches_adding_the_shape(tmp_path, brep_file):
+    from_file = CadToDagmc()
+    from_file.add_brep_file(brep_file, material_tags=["a", "b"])
+    from_file.export_dagmc_h5m_file(
+        filename=str(tmp_path / "from_file.h5m"), meshing_backend="cadquery"
+    )
+    from_shape = CadToDagmc()
+    from_shape.add_cadquery_object(_two_cubes(), material_tags=["a", "b"])
+    from_shape.export_dagmc_h5m_file(
+        filename=str(tmp_path / "from_shape.h5m"), meshing_backend="cadquery"
+    )
+
+    with h5py.File(tmp_path / "from_file.h5m") as a, h5py.File(tmp_path / "from_shape.h5m") as b:
+        for key in ["tstt/nodes/coordinates", "tstt/elements/Tri3/connectivity"]:
+            np.testing.assert_array_equal(a[key][()], b[key][()])
@@ -0,0 +1,179 @@
+"""Tests for decimating the surface mesh before it is written.
+
+The vertices inside each face are collapsed onto their neighbours while the
+surface stays within the tolerance. The vertices on the boundaries of faces
+are kept, so every volume has to stay closed and a face two volumes share
+has to stay one surface, wound the other way for the second volume.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import decimate_surface, tessellate_in_processes
+
+
+def _grid_boxes(n=8):
+    """Two unit cubes side by side with each face split into an n by n grid,
+    as a mesher with a small maximum size leaves planar faces. Face 2 is
+    the face between them."""
+    index = {}
+    vertices = []
+
+    def grid_face(origin, u, v):
+        # wound so that the normal is u x v
+        grid = []
+        for i in range(n + 1):
+            row = []
+            for j in range(n + 1):
+                point = tuple(
+                    np.round(np.add(origin, np.multiply(u, i / n) + np.multiply(v, j / n)), 9)
+                )
+                if point not in index:
+                    index[point] = len(vertices)
+                    vertices.append(point)
+                row.append(index[point])
+            grid.append(row)
+        triangles = []
+        for i in range(n):
+            for j in range(n):
+                a, b, c, d = grid[i][j], grid[i + 1][j], grid[i + 1][j + 1], grid[i][j + 1]
+                triangles += [[a, b, c], [a, c, d]]
+        return triangles
+
+    def cube(x):
+        return [
+            grid_face((x, 0, 0), (0, 0, 1), (0, 1, 0)),
+            grid_face((x + 1, 0, 0), (0, 1, 0), (0, 0, 1)),
+            grid_face((x, 0, 0), (1, 0, 0), (0, 0, 1)),
+            grid_face((x, 1, 0), (0, 0, 1), (1, 0, 0)),
+            grid_face((x, 0, 0), (0, 1, 0), (1, 0, 0)),
+            grid_face((x, 0, 1), (1, 0, 0), (0, 1, 0)),
+        ]
+
+    first = cube(0)
+    second = cube(1)
+    triangles_by_solid_by_face = {
+        1: {face_id: triangles for face_id, triangles in enumerate(first, start=1)},
+        2: {2: [triangle[::-1] for triangle in first[1]]},
+    }
+    triangles_by_solid_by_face[2].update(
+        {face_id: triangles for face_id, triangles in zip(range(7, 12), second[1:])}
+    )
+    return np.array(vertices), triangles_by_solid_by_face
+
+
+def _edges(faces):
+    triangles = np.vstack([np.asarray(triangles) for triangles in faces.values()])
+    return np.vstack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+
+
+def _is_closed(faces):
+    edges = _edges(faces)
+    # each edge is used once in each direction
+    return len(np.unique(edges, axis=0)) == len(edges) and (
+        len(np.unique(np.sort(edges, axis=1), axis=0)) * 2 == len(edges)
+    )
+
+
+def test_planar_faces_keep_only_their_boundary():
+    n = 8
+    vertices, triangles = decimate_surface(*_grid_boxes(n), tolerance=1e-6)
+
+    for faces in triangles.values():
+        for face_triangles in faces.values():
+            # a polygon of 4 n boundary vertices needs 4 n - 2 triangles
+            assert len(face_triangles) == 4 * n - 2
+    # only the vertices on the 12 corners and 20 edges are left
+    assert len(vertices) == 12 + 20 * (n - 1)
+
+
+def test_volumes_stay_closed_and_share_the_face():
+    vertices, triangles = decimate_surface(*_grid_boxes(), tolerance=1e-6)
+
+    assert all(_is_closed(faces) for faces in triangles.values())
+    first, second = (np.asarray(triangles[solid_id][2]) for solid_id in (1, 2))
+    np.testing.assert_array_equal(first, second[:, ::-1])
+    # the cubes are unchanged
+    np.testing.assert_allclose(vertices.min(axis=0), [0, 0, 0])
+    np.testing.assert_allclose(vertices.max(axis=0), [2, 1, 1])
+
+
+def _torus_distance(points, major=10.0, minor=3.0):
+    radial = np.linalg.norm(points[:, :2], axis=1) - major
+    return np.abs(np.hypot(radial, points[:, 2]) - minor)
+
+
+@pytest.mark.parametrize("tolerance", [0.05, 0.2])
+def test_curved_faces_stay_within_the_tolerance(tolerance):
+    vertices, triangles = tessellate_in_processes(
+        [cq.Solid.makeTorus(10, 3)], 0.01, 0.2
+    )
+    original = sum(len(t) for faces in triangles.values() for t in faces.values())
+
+    vertices, triangles = decimate_surface(vertices, triangles, tolerance)
+
+    faces = np.vstack([np.asarray(t) for t in triangles[1].values()])
+    corners = vertices[faces]
+    samples = np.vstack(
+        [corners.mean(axis=1), (corners + np.roll(corners, 1, axis=1)).reshape(-1, 3) / 2]
+    )
+    assert _torus_distance(samples).max() <= tolerance + 0.01
+    assert len(faces) < original / 2
+
+
+def test_worker_processes_give_the_same_mesh(capsys):
+    vertices, triangles = tessellate_in_processes(
+        [cq.Solid.makeTorus(10, 3), cq.Workplane().sphere(5).val()], 0.01, 0.2
+    )
+
+    expected = decimate_surface(vertices, triangles, 0.05)
+    result = decimate_surface(vertices, triangles, 0.05, processes=2)
+
+    np.testing.assert_array_equal(result[0], expected[0])
+    for solid_id, faces in expected[1].items():
+        for face_id, face_triangles in faces.items():
+            np.testing.assert_array_equal(result[1][solid_id][face_id], face_triangles)
+    assert "in 2 processes" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "tolerance, error",
+    [
+        (0, ValueError),
+        (-1.0, ValueError),
+        (float("nan"), ValueError),
+        ("0.1", TypeError),
+        (True, TypeError),
+        (None, TypeError),
+    ],
+)
+def test_bad_tolerance_is_rejected(tolerance, error):
+    with pytest.raises(error, match="decimation_tolerance"):
+        decimate_surface(*_grid_boxes(), tolerance=tolerance)
+
+
+def test_export_dagmc_h5m_file_writes_fewer_triangles(tmp_path, capsys):
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().sphere(5), material_tags=["ball"])
+    model.add_cadquery_object(
+        cq.Solid.makeTorus(10, 3).translate((0, 0, 20)), material_tags=["ring"]
+    )
+
+    def triangles(name, **kwargs):
+        model.export_dagmc_h5m_file(
+            filename=str(tmp_path / name),
+            meshing_backend="cadquery",
+            tolerance=0.01,
+            angular_tolerance=0.2,
+            **kwargs,
+        )
+        with h5py.File(tmp_path / name, "r") as f:
+            return len(f["tstt/elements/Tri3/connectivity"])
+
+    assert triangles("decimated.h5m", decimation_tolerance=0.05) < (
+        triangles("dagmc.h5m") / 2
+    )
+    assert "Decimated the surface mesh" in capsys.readouterr().out
@@ -0,0 +1,149 @@
+"""Tests for reusing imprints and tessellations between exports.
+
+A CadToDagmc keeps the imprint of its parts, and the cadquery backend's
+tessellation of them, for as long as the parts stay the same. A repeated
+export has to give the same file as the first, and anything that changes the
+mesh, a tolerance or a part, has to be meshed again.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+from conftest import read_h5m
+
+
+def _model(**kwargs):
+    model = CadToDagmc(**kwargs)
+    model.add_cadquery_object(cq.Workplane().sphere(5), material_tags=["ball"])
+    model.add_cadquery_object(
+        cq.Workplane().box(20, 20, 2).translate((0, 0, -6)), material_tags=["plate"]
+    )
+    return model
+
+
+def _export(model, filename, tolerance):
+    model.export_dagmc_h5m_file(
+        filename=str(filename),
+        meshing_backend="cadquery",
+        tolerance=tolerance,
+        angular_tolerance=1.0,
+    )
+    return read_h5m(filename)
+
+
+def test_repeated_export_reuses_the_tessellation(tmp_path, capsys):
+    model = _model()
+    first = _export(model, tmp_path / "first.h5m", 0.5)
+    capsys.readouterr()
+    second = _export(model, tmp_path / "second.h5m", 0.5)
+
+    assert "Reusing the tessellation" in capsys.readouterr().out
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_new_tolerance_reuses_the_imprint(tmp_path, capsys):
+    model = _model()
+    _export(model, tmp_path / "first.h5m", 0.5)
+    capsys.readouterr()
+    _export(model, tmp_path / "second.h5m", 0.2)
+
+    out = capsys.readouterr().out
+    assert "Reusing the imprint" in out
+    assert "Reusing the tessellation" not in out
+
+
+def test_coarser_export_after_a_finer_one_is_coarse(tmp_path):
+    """BRepMesh keeps a finer triangulation left on the shapes by an earlier
+    export unless it is removed first."""
+    model = _model()
+    coarse, _ = _export(model, tmp_path / "coarse.h5m", 0.5)
+    fine, _ = _export(model, tmp_path / "fine.h5m", 0.01)
+    model.clear_cache()
+    coarse_again, _ = _export(model, tmp_path / "coarse_again.h5m", 0.5)
+
+    assert len(fine) > len(coarse)
+    assert len(coarse_again) == len(coarse)
+
+
+def test_replacing_a_part_meshes_again(tmp_path, capsys):
+    model = _model()
+    _export(model, tmp_path / "first.h5m", 0.5)
+    model.parts[0] = cq.Solid.makeSphere(4)
+    capsys.readouterr()
+    _export(model, tmp_path / "second.h5m", 0.5)
+
+    assert "Reusing" not in capsys.readouterr().out
+
+
+def test_clear_cache_meshes_again(tmp_path, capsys):
+    model = _model()
+    _export(model, tmp_path / "first.h5m", 0.5)
+    model.clear_cache()
+    capsys.readouterr()
+    _export(model, tmp_path / "second.h5m", 0.5)
+
+    assert "Reusing" not in capsys.readouterr().out
+
+
+def test_only_the_latest_tessellation_is_kept(tmp_path, capsys):
+    model = _model()
+    _export(model, tmp_path / "coarse.h5m", 0.5)
+    _export(model, tmp_path / "fine.h5m", 0.2)
+
+    assert len(model._cache.tessellations) == 1
+    capsys.readouterr()
+    _export(model, tmp_path / "fine_again.h5m", 0.2)
+    assert "Reusing the tessellation" in capsys.readouterr().out
+
+
+def test_without_cache_nothing_is_reused(tmp_path, capsys):
+    model = _model(cache=False)
+    _export(model, tmp_path / "first.h5m", 0.5)
+    capsys.readouterr()
+    _export(model, tmp_path / "second.h5m", 0.5)
+
+    assert "Reusing" not in capsys.readouterr().out
+    assert model._cache.imprints == {}
+    assert model._cache.tessellations == {}
+
+
+def test_renamed_material_tags_are_written(tmp_path):
+    model = _model()
+    _export(model, tmp_path / "first.h5m", 0.5)
+    model.material_tags = ["steel", "water"]
+    _export(model, tmp_path / "second.h5m", 0.5)
+
+    with h5py.File(tmp_path / "second.h5m", "r") as f:
+        names = bytes(f["tstt/tags/NAME/values"][()].tobytes())
+    assert b"mat:steel" in names
+    assert b"mat:water" in names
+
+
+@pytest.mark.parametrize("imprint", [True, False])
+def test_gmsh_export_reuses_the_imprint(tmp_path, capsys, imprint):
+    model = _model()
+    _export(model, tmp_path / "dagmc.h5m", 0.5)
+    capsys.readouterr()
+    model.export_gmsh_mesh_file(filename=str(tmp_path / "dagmc.msh"), imprint=imprint)
+
+    assert ("Reusing the imprint" in capsys.readouterr().out) == imprint
+
+
+def test_changing_a_mesh_result_leaves_the_cache_alone():
+    model = _model()
+    first = model.mesh(meshing_backend="cadquery", tolerance=0.5)
+    faces = sum(len(faces) for faces in first.triangles_by_solid_by_face.values())
+    solid_id = next(iter(first.triangles_by_solid_by_face))
+    first.triangles_by_solid_by_face[solid_id].popitem()
+
+    second = model.mesh(meshing_backend="cadquery", tolerance=0.5)
+
+    assert second.triangles_by_solid_by_face is not first.triangles_by_solid_by_face
+    assert sum(len(f) for f in second.triangles_by_solid_by_face.values()) == faces
+    triangles = next(iter(second.triangles_by_solid_by_face[solid_id].values()))
+    with pytest.raises(ValueError):
+        triangles[0, 0] = 0
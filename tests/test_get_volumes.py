@@ -1,7 +1,13 @@
+import inspect
+import re
+import subprocess
+
 import cadquery as cq
+import OCP
 import pytest
 
 import cad_to_dagmc
+from cad_to_dagmc.core import _native_pointer_transfer_works, _occ_version
 
 try:
     import openmc
@@ -44,6 +50,110 @@ def test_get_volumes(scale_factor, expected_bbox):
         assert abs(a - b) <= 0.000001  # tolerance
 
 
+@pytest.mark.parametrize("method", ["auto", "in memory"])
+def test_get_volumes_methods_match_file(method):
+    result = cq.Workplane("XY").box(10, 10, 10)
+    assembly = cq.Assembly()
+    assembly.add(result)
+    imprinted_assembly, _ = cq.occ_impl.assembly.imprint(assembly)
+
+    gmsh = cad_to_dagmc.init_gmsh()
+    if method == "in memory":
+        build_info = gmsh.option.getString("General.BuildInfo")
+        occ_version = re.search(r"OCC version\s*:\s*([\d.]+)", build_info)
+        if not (occ_version and _native_pointer_transfer_works(occ_version.group(1))):
+            pytest.skip("gmsh cannot take CadQuery shapes in memory")
+    gmsh, volumes = cad_to_dagmc.get_volumes(gmsh, imprinted_assembly, method=method)
+    bbox = gmsh.model.getBoundingBox(-1, -1)
+    gmsh, file_volumes = cad_to_dagmc.get_volumes(
+        cad_to_dagmc.init_gmsh(), imprinted_assembly, method="file"
+    )
+
+    assert volumes == file_volumes
+    for a, b in zip(bbox, gmsh.model.getBoundingBox(-1, -1)):
+        assert abs(a - b) <= 0.000001
+    gmsh.finalize()
+
+
+@pytest.mark.parametrize(
+    "function",
+    [
+        cad_to_dagmc.get_volumes,
+        cad_to_dagmc.CadToDagmc.export_gmsh_mesh_file,
+        cad_to_dagmc.CadToDagmc.export_unstructured_mesh_file,
+    ],
+)
+def test_file_is_the_default_method(function):
+    assert inspect.signature(function).parameters["method"].default == "file"
+
+
+def test_auto_prints_the_method_it_chose(monkeypatch, capsys):
+    monkeypatch.setattr(
+        cad_to_dagmc.core, "_native_pointer_transfer_works", lambda version: False
+    )
+    gmsh = cad_to_dagmc.init_gmsh()
+    try:
+        cad_to_dagmc.get_volumes(gmsh, cq.Workplane().box(1, 1, 1).val(), method="auto")
+    finally:
+        gmsh.finalize()
+
+    assert 'method="file"' in capsys.readouterr().out
+
+
+def test_get_volumes_rejects_unknown_method():
+    gmsh = cad_to_dagmc.init_gmsh()
+    with pytest.raises(ValueError, match="pointer"):
+        cad_to_dagmc.get_volumes(gmsh, cq.Workplane().box(1, 1, 1).val(), method="pointer")
+    gmsh.finalize()
+
+
+def test_different_occ_versions_are_not_probed(monkeypatch):
+    def run(*args, **kwargs):
+        raise AssertionError("the probe should not run")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    _native_pointer_transfer_works.cache_clear()
+    try:
+        assert not _native_pointer_transfer_works("1.0.0")
+    finally:
+        _native_pointer_transfer_works.cache_clear()
+
+
+def test_probe_result_is_kept(monkeypatch):
+    calls = []
+
+    def run(*args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, "native pointer transfer works\n", "")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    _native_pointer_transfer_works.cache_clear()
+    try:
+        assert _native_pointer_transfer_works(OCP.__version__)
+        assert _native_pointer_transfer_works(OCP.__version__)
+    finally:
+        _native_pointer_transfer_works.cache_clear()
+    assert len(calls) == 1
+
+
+def test_crashing_probe_falls_back(monkeypatch):
+    monkeypatch.setattr(
+        subprocess,
+        "run",
+        lambda *args, **kwargs: subprocess.CompletedProcess(args, -11, "", ""),
+    )
+    _native_pointer_transfer_works.cache_clear()
+    try:
+        assert not _native_pointer_transfer_works(OCP.__version__)
+    finally:
+        _native_pointer_transfer_works.cache_clear()
+
+
+def test_occ_versions_compare_without_build_numbers():
+    assert _occ_version("7.9.3.1") == _occ_version("7.9.3") == (7, 9, 3)
+    assert _occ_version("7.8.1.dev") != _occ_version("7.9.1")
+
+
 @pytest.mark.parametrize(
     "scale_factor, expected_bbox_lower_left, expected_bbox_upper_right, meshing_backend",
     [
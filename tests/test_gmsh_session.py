@@ -0,0 +1,118 @@
+"""Tests for keeping the gmsh model between exports with CadToDagmc.gmsh_session.
+
+Within a session the geometry is imported into gmsh once, and an export with
+other sizes only clears the mesh before meshing again. Every export has to
+give the same mesh as it would on its own, and gmsh has to be finalized when
+the session ends.
+"""
+
+import gmsh
+import numpy as np
+import pytest
+
+from conftest import read_h5m
+
+
+def test_session_meshes_like_separate_exports(tmp_path, capsys, ball_in_cup):
+    model = ball_in_cup()
+    sizes = [
+        {"max_mesh_size": 4.0},
+        {"min_mesh_size": 0.5, "max_mesh_size": 2.0, "set_size": {"ball": 0.5}},
+        {"max_mesh_size": 3.0},
+    ]
+    with model.gmsh_session():
+        for index, size in enumerate(sizes):
+            model.export_dagmc_h5m_file(
+                filename=str(tmp_path / f"session_{index}.h5m"),
+                meshing_backend="gmsh",
+                **size,
+            )
+        assert gmsh.isInitialized()
+    assert not gmsh.isInitialized()
+    assert capsys.readouterr().out.count("Reusing the geometry of the gmsh session") == 2
+
+    for index, size in enumerate(sizes):
+        ball_in_cup().export_dagmc_h5m_file(
+            filename=str(tmp_path / f"alone_{index}.h5m"),
+            meshing_backend="gmsh",
+            **size,
+        )
+        # compared without the order, as gmsh numbers the nodes of a mesh
+        # made after mesh.clear() on from those of the cleared one
+        alone = read_h5m(tmp_path / f"alone_{index}.h5m")
+        session = read_h5m(tmp_path / f"session_{index}.h5m")
+        np.testing.assert_allclose(
+            np.unique(alone[0], axis=0), np.unique(session[0], axis=0)
+        )
+        assert len(alone[1]) == len(session[1])
+
+
+def test_session_is_shared_by_the_gmsh_exports(tmp_path, capsys, ball_in_cup):
+    model = ball_in_cup()
+    with model.gmsh_session():
+        model.export_gmsh_mesh_file(
+            filename=str(tmp_path / "coarse.msh"), max_mesh_size=4.0
+        )
+        model.export_gmsh_mesh_file(
+            filename=str(tmp_path / "fine.msh"), max_mesh_size=1.0
+        )
+        model.export_unstructured_mesh_file(
+            filename=str(tmp_path / "umesh.vtk"), max_mesh_size=4.0
+        )
+
+    assert capsys.readouterr().out.count("Reusing the geometry of the gmsh session") == 2
+    assert (tmp_path / "coarse.msh").stat().st_size < (tmp_path / "fine.msh").stat().st_size
+    assert (tmp_path / "umesh.vtk").is_file()
+
+
+def test_removing_volumes_imports_the_geometry_again(tmp_path, capsys, ball_in_cup):
+    model = ball_in_cup()
+    with model.gmsh_session():
+        model.export_unstructured_mesh_file(
+            filename=str(tmp_path / "ball.vtk"), max_mesh_size=4.0, volumes=[1]
+        )
+        model.export_gmsh_mesh_file(filename=str(tmp_path / "mesh.msh"))
+
+    assert "Reusing the geometry of the gmsh session" not in capsys.readouterr().out
+
+
+def test_other_scale_factor_imports_the_geometry_again(tmp_path, capsys, ball_in_cup):
+    model = ball_in_cup()
+    with model.gmsh_session():
+        model.export_gmsh_mesh_file(filename=str(tmp_path / "mm.msh"))
+        model.export_gmsh_mesh_file(filename=str(tmp_path / "cm.msh"), scale_factor=0.1)
+
+    assert "Reusing the geometry of the gmsh session" not in capsys.readouterr().out
+
+
+def test_session_ends_on_error_and_forgets_the_model(
+    tmp_path, monkeypatch, capsys, ball_in_cup
+):
+    model = ball_in_cup()
+    generate = gmsh.model.mesh.generate
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("simulated meshing failure")
+
+    with pytest.raises(RuntimeError, match="simulated meshing failure"):
+        with model.gmsh_session():
+            model.export_gmsh_mesh_file(filename=str(tmp_path / "first.msh"))
+            monkeypatch.setattr("gmsh.model.mesh.generate", boom)
+            with pytest.raises(RuntimeError):
+                model.export_gmsh_mesh_file(filename=str(tmp_path / "failed.msh"))
+            monkeypatch.setattr("gmsh.model.mesh.generate", generate)
+            capsys.readouterr()
+            model.export_gmsh_mesh_file(filename=str(tmp_path / "again.msh"))
+            assert "Reusing the geometry" not in capsys.readouterr().out
+            raise RuntimeError("simulated meshing failure")
+
+    assert not gmsh.isInitialized()
+    assert model._gmsh_session is None
+
+
+def test_sessions_do_not_nest(ball_in_cup):
+    model = ball_in_cup()
+    with model.gmsh_session():
+        with pytest.raises(ValueError, match="already open"):
+            with model.gmsh_session():
+                pass
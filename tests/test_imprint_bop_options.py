@@ -0,0 +1,149 @@
+"""Tests for the boolean operation options of ImprintOptions.
+
+Setting any of use_obb, glue, fuzzy_value, non_destructive or run_parallel
+swaps cadquery's imprint for a BOPAlgo_Builder configured from them. With the
+values cadquery itself uses, that has to give the same imprint, and
+tune_imprint_options has to tell the settings that change the result apart
+from the ones that only change how fast it is reached.
+"""
+
+import cadquery as cq
+import pytest
+
+from cad_to_dagmc import CadToDagmc, ImprintOptions
+from cad_to_dagmc.core import imprint_assembly, tune_imprint_options
+from conftest import topology
+
+
+def _overlapping_boxes():
+    """A box overlapping a second, shorter box, so the imprint has a region
+    belonging to both."""
+    assembly = cq.Assembly()
+    assembly.add(cq.Workplane().box(10, 10, 10), name="big")
+    assembly.add(cq.Workplane().box(10, 4, 8).translate((0, 5, 0)), name="small")
+    return assembly
+
+
+class TestValidation:
+    def test_unknown_glue_is_rejected(self):
+        with pytest.raises(ValueError, match="glue"):
+            ImprintOptions(glue="partial")
+
+    @pytest.mark.parametrize("fuzzy_value", [-1.0, True, "0.1"])
+    def test_invalid_fuzzy_value_is_rejected(self, fuzzy_value):
+        with pytest.raises(ValueError, match="fuzzy_value"):
+            ImprintOptions(fuzzy_value=fuzzy_value)
+
+    @pytest.mark.parametrize("name", ["use_obb", "non_destructive", "run_parallel"])
+    def test_non_bool_flags_are_rejected(self, name):
+        with pytest.raises(TypeError, match=name):
+            ImprintOptions(**{name: 1})
+
+
+def _short_names(ids):
+    return sorted(tuple(name.split("/")[-1] for name in names) for names in ids)
+
+
+def test_cadquery_defaults_match_the_cadquery_imprint():
+    reference, reference_ids = imprint_assembly(_overlapping_boxes())
+    imprinted, imprinted_ids = imprint_assembly(
+        _overlapping_boxes(),
+        threads=ImprintOptions(
+            use_obb=True, glue="shift", non_destructive=False, run_parallel=True
+        ),
+    )
+
+    assert topology(imprinted) == topology(reference)
+    assert _short_names(imprinted_ids.values()) == _short_names(
+        reference_ids.values()
+    )
+
+
+def test_glue_off_splits_out_the_overlap():
+    imprinted, imprinted_ids = imprint_assembly(
+        _overlapping_boxes(), threads=ImprintOptions(glue="off")
+    )
+
+    assert len(imprinted.Solids()) == 3
+    # the overlap is traced back to both boxes
+    assert _short_names(imprinted_ids.values()) == [
+        ("big",),
+        ("big", "small"),
+        ("small",),
+    ]
+
+
+def test_tune_imprint_options_flags_glue_off_on_overlaps():
+    best, results = tune_imprint_options(_overlapping_boxes())
+
+    for result in results:
+        assert result["safe"] == (result["options"].glue != "off")
+    assert best.glue != "off"
+
+
+def test_tune_imprint_options_rejects_results_that_differ():
+    """A fuzzy value as large as this merges edges that should stay apart."""
+    assembly = cq.Assembly()
+    assembly.add(cq.Workplane().box(10, 10, 10))
+    assembly.add(cq.Workplane().box(10, 4, 10).translate((0, 7, 0.5)))
+    too_fuzzy = ImprintOptions(fuzzy_value=1.0)
+    obb = ImprintOptions(use_obb=False)
+
+    best, results = tune_imprint_options(assembly, candidates=[too_fuzzy, obb])
+
+    assert [result["options"] for result in results[1:]] == [too_fuzzy, obb]
+    assert results[0]["safe"]
+    assert not results[1]["safe"]
+    assert "faces" in results[1]["reason"]
+    assert results[2]["safe"]
+    assert best != too_fuzzy
+
+
+def test_tune_imprint_options_leaves_the_assembly_alone():
+    assembly = _overlapping_boxes()
+    before = [
+        (solid, solid.Volume())
+        for shape, _, _, _ in assembly
+        for solid in shape.Solids()
+    ]
+
+    tune_imprint_options(
+        assembly, candidates=[ImprintOptions(glue="off", non_destructive=False)]
+    )
+
+    after = [solid for shape, _, _, _ in assembly for solid in shape.Solids()]
+    assert len(after) == len(before)
+    for (solid, volume), solid_after in zip(before, after):
+        assert solid_after.isSame(solid)
+        assert solid_after.Volume() == pytest.approx(volume)
+
+
+def test_tune_imprint_options_needs_two_solids():
+    assembly = cq.Assembly()
+    assembly.add(cq.Workplane().box(1, 1, 1))
+    with pytest.raises(ValueError, match="two solids"):
+        tune_imprint_options(assembly)
+
+
+@pytest.mark.parametrize("meshing_backend", ["gmsh", "cadquery"])
+def test_export_dagmc_h5m_file_with_bop_options(tmp_path, meshing_backend):
+    model = CadToDagmc()
+    model.add_cadquery_object(
+        cq.Workplane().box(10, 10, 10).union(
+            cq.Workplane().box(2, 2, 2).translate((0, 0, 6))
+        ),
+        material_tags=["mat1"],
+    )
+    model.add_cadquery_object(
+        cq.Workplane().box(10, 10, 10).translate((10, 0, 0)),
+        material_tags=["mat2"],
+    )
+    h5m_filename = tmp_path / "dagmc.h5m"
+
+    model.export_dagmc_h5m_file(
+        filename=str(h5m_filename),
+        meshing_backend=meshing_backend,
+        imprint={"use_obb": True, "glue": "shift", "threads": 1},
+    )
+
+    assert h5m_filename.is_file()
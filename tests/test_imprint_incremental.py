@@ -0,0 +1,125 @@
+"""Tests for incremental imprinting with an ImprintHistory.
+
+After a part changes only the solids near it are imprinted again and the
+rest of the previous imprint is spliced back in, so the result has to match
+imprinting everything afresh: the same shared faces, edges and vertices, and
+each solid traced back to the same part.
+"""
+
+import cadquery as cq
+import pytest
+
+from cad_to_dagmc import CadToDagmc, ImprintHistory, ImprintOptions
+from cad_to_dagmc.core import imprint_assembly
+from conftest import topology
+
+
+def _row_of_cubes(swap=None, remove=None, n=8):
+    """A flat grid of touching unit cubes, every other column shifted so that
+    neighbouring faces only partly overlap. The cube at index swap is
+    replaced by a cylinder and the one at index remove left out."""
+    assembly = cq.Assembly()
+    index = 0
+    for i in range(n):
+        for j in range(n):
+            shift = 0.3 if i % 2 else 0.0
+            if index == swap:
+                solid = cq.Solid.makeCylinder(0.4, 1).translate(
+                    (i + 0.5, j + shift + 0.5, 0)
+                )
+            else:
+                solid = cq.Solid.makeBox(1, 1, 1).translate((i, j + shift, 0))
+            if index != remove:
+                assembly.add(solid, name=f"part{index}")
+            index += 1
+    return assembly
+
+
+def _names(ids):
+    return sorted(tuple(name.split("/")[-1] for name in names) for names in ids)
+
+
+@pytest.mark.parametrize(
+    "options", [None, ImprintOptions(strategy="tree", block_size=8)]
+)
+def test_changes_match_a_fresh_imprint(options):
+    history = ImprintHistory()
+    for change in [{}, {"swap": 21}, {"swap": 5}, {"remove": 42}, {}]:
+        incremental, incremental_ids = imprint_assembly(
+            _row_of_cubes(**change), threads=options, history=history
+        )
+        fresh, fresh_ids = imprint_assembly(_row_of_cubes(**change), threads=options)
+
+        assert topology(incremental) == topology(fresh)
+        assert _names(incremental_ids.values()) == _names(fresh_ids.values())
+
+
+def test_solids_away_from_the_change_are_reused():
+    history = ImprintHistory()
+    before, _ = imprint_assembly(_row_of_cubes(), history=history)
+    after, _ = imprint_assembly(_row_of_cubes(swap=63), history=history)
+
+    reused = [
+        solid
+        for solid in after.Solids()
+        if any(solid.isSame(previous) for previous in before.Solids())
+    ]
+    # only the corner cube, its neighbours and the solids around those change
+    assert len(reused) > 50
+
+
+def test_nothing_changed_reuses_everything(capsys):
+    history = ImprintHistory()
+    before, _ = imprint_assembly(_row_of_cubes(), history=history)
+    after, _ = imprint_assembly(_row_of_cubes(), history=history)
+
+    assert "No solids have changed" in capsys.readouterr().out
+    assert all(a.isSame(b) for a, b in zip(after.Solids(), before.Solids()))
+
+
+def test_clear_imprints_everything_again(capsys):
+    history = ImprintHistory()
+    imprint_assembly(_row_of_cubes(), history=history)
+    history.clear()
+    capsys.readouterr()
+    imprint_assembly(_row_of_cubes(swap=21), history=history)
+
+    assert "Re-imprinting" not in capsys.readouterr().out
+
+
+def test_changed_imprint_options_imprint_everything_again(capsys):
+    history = ImprintHistory()
+    imprint_assembly(_row_of_cubes(), history=history)
+    capsys.readouterr()
+    imprinted, _ = imprint_assembly(
+        _row_of_cubes(), threads=ImprintOptions(glue="off"), history=history
+    )
+
+    output = capsys.readouterr().out
+    assert "The imprint options have changed" in output
+    assert "No solids have changed" not in output
+    assert topology(imprinted) == topology(
+        imprint_assembly(_row_of_cubes(), threads=ImprintOptions(glue="off"))[0]
+    )
+
+
+@pytest.mark.parametrize("meshing_backend", ["gmsh", "cadquery"])
+def test_export_dagmc_h5m_file_imprints_incrementally(
+    tmp_path, meshing_backend, capsys
+):
+    model = CadToDagmc(incremental_imprint=True)
+    model.add_cadquery_object(
+        _row_of_cubes(), material_tags=[f"mat{i}" for i in range(64)]
+    )
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "first.h5m"), meshing_backend=meshing_backend
+    )
+
+    model.parts[63] = cq.Solid.makeBox(0.5, 0.5, 0.5).translate((7, 7.3, 0))
+    capsys.readouterr()
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "second.h5m"), meshing_backend=meshing_backend
+    )
+
+    assert "Re-imprinting" in capsys.readouterr().out
+    assert (tmp_path / "second.h5m").is_file()
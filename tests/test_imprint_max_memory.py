@@ -0,0 +1,130 @@
+"""Tests for imprinting within a memory budget.
+
+With max_memory set the number of imprint threads is chosen to fit the
+budget, and the imprint runs in a worker process that is started again on
+fewer threads if it gets close to the budget anyway.
+"""
+
+import cadquery as cq
+import pytest
+
+from cad_to_dagmc import CadToDagmc, ImprintOptions
+from cad_to_dagmc import core
+from cad_to_dagmc.core import imprint_assembly
+
+
+def _grid_of_cubes(n=3):
+    assembly = cq.Assembly()
+    for i in range(n):
+        for j in range(n):
+            for k in range(n):
+                shift = 0.3 if i % 2 else 0.0
+                assembly.add(cq.Solid.makeBox(1, 1, 1).translate((i, j + shift, k)))
+    return assembly
+
+
+class TestParseMemory:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            (1024, 1024),
+            ("48GB", 48 * 10**9),
+            ("48 gb", 48 * 10**9),
+            ("1.5GiB", int(1.5 * 2**30)),
+            ("512MiB", 512 * 2**20),
+            ("2000", 2000),
+        ],
+    )
+    def test_sizes(self, value, expected):
+        assert core._parse_memory(value) == expected
+
+    @pytest.mark.parametrize("value", ["lots", "48 GBs", "GB", "-1GB", 0])
+    def test_invalid_sizes_are_rejected(self, value):
+        with pytest.raises(ValueError, match="max_memory"):
+            core._parse_memory(value)
+
+    @pytest.mark.parametrize("value", [True, 4.0e9, None])
+    def test_non_int_or_str_is_rejected(self, value):
+        with pytest.raises(TypeError, match="max_memory"):
+            core._parse_memory(value)
+
+
+def test_max_memory_cannot_be_combined_with_threads():
+    with pytest.raises(ValueError, match="max_memory"):
+        ImprintOptions(max_memory="8GB", threads=2)
+
+
+def test_max_memory_cannot_be_combined_with_processes():
+    with pytest.raises(ValueError, match="max_memory"):
+        ImprintOptions(max_memory="8GB", processes=2)
+
+
+class TestThreadsForMemory:
+    def test_most_threads_that_fit(self):
+        # 100 + 10 * (5 + 2 * (threads - 1)) <= 250 gives threads <= 6
+        assert core._threads_for_memory(10, 5, 2, 100, 250, 16) == 6
+
+    def test_capped_at_most(self):
+        assert core._threads_for_memory(10, 5, 2, 100, 10**6, 16) == 16
+
+    def test_no_cost_per_thread_uses_them_all(self):
+        assert core._threads_for_memory(10, 5, 0, 100, 250, 16) == 16
+
+    def test_at_least_one_thread_even_when_nothing_fits(self):
+        assert core._threads_for_memory(10, 5, 2, 100, 50, 16) == 1
+
+
+def test_max_memory_matches_a_single_imprint():
+    single, single_ids = imprint_assembly(_grid_of_cubes())
+    budgeted, budgeted_ids = imprint_assembly(
+        _grid_of_cubes(), threads=ImprintOptions(max_memory="64GB")
+    )
+
+    assert len(budgeted.Faces()) == len(single.Faces())
+    assert len(budgeted.Vertices()) == len(single.Vertices())
+    assert len(budgeted_ids) == len(single_ids)
+
+
+def test_threads_are_halved_until_the_imprint_fits(monkeypatch):
+    """The worker is stopped whenever it runs on more than one thread here."""
+    attempts = []
+
+    def imprint_fitting_on_one_thread(solids, options, imprint_kwargs, limit):
+        attempts.append(options.threads)
+        if options.threads > 1:
+            return None, 0, limit
+        return core._imprint_solids(solids, cq.occ_impl.assembly.imprint, {}), 0, 0
+
+    monkeypatch.setattr(
+        core, "_imprint_in_monitored_process", imprint_fitting_on_one_thread
+    )
+    monkeypatch.setattr(core.os, "cpu_count", lambda: 8)
+
+    imprinted, _ = imprint_assembly(
+        _grid_of_cubes(), threads=ImprintOptions(max_memory="64GB")
+    )
+
+    assert attempts == [8, 4, 2, 1]
+    assert len(imprinted.Solids()) == 27
+
+
+def test_going_over_the_budget_on_one_thread_raises():
+    with pytest.raises(MemoryError, match="single thread"):
+        imprint_assembly(_grid_of_cubes(), threads=ImprintOptions(max_memory="1MB"))
+
+
+@pytest.mark.parametrize("meshing_backend", ["gmsh", "cadquery"])
+def test_export_dagmc_h5m_file_with_max_memory(tmp_path, meshing_backend):
+    model = CadToDagmc()
+    model.add_cadquery_object(
+        _grid_of_cubes(2), material_tags=[f"mat{i}" for i in range(8)]
+    )
+    h5m_filename = tmp_path / "dagmc.h5m"
+
+    model.export_dagmc_h5m_file(
+        filename=str(h5m_filename),
+        meshing_backend=meshing_backend,
+        imprint={"max_memory": "64GB"},
+    )
+
+    assert h5m_filename.is_file()
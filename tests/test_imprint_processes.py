@@ -0,0 +1,126 @@
+"""Tests for imprinting clusters of solids in worker processes.
+
+Solids that cannot touch have nothing to imprint against each other, so an
+assembly that falls apart into several such clusters can have each cluster
+imprinted on its own, in parallel processes. The result has to be the same
+imprint, with the same mapping back to the original solids, as imprinting the
+whole assembly in one call.
+"""
+
+import cadquery as cq
+import pytest
+from OCP.OSD import OSD_ThreadPool
+
+from cad_to_dagmc import CadToDagmc, ImprintOptions
+from cad_to_dagmc.core import imprint_assembly, resolve_imprint, touching_clusters
+
+
+def _two_pairs_of_touching_boxes_and_a_sphere():
+    assembly = cq.Assembly()
+    for x in (0, 100):
+        assembly.add(cq.Workplane().box(10, 10, 10).translate((x, 0, 0)))
+        assembly.add(cq.Workplane().box(10, 4, 10).translate((x, 7, 0)))
+    assembly.add(cq.Workplane().sphere(3).translate((50, 50, 50)))
+    return assembly
+
+
+class TestTouchingClusters:
+    def test_touching_solids_share_a_cluster(self):
+        solids = [
+            cq.Solid.makeBox(1, 1, 1),
+            cq.Solid.makeBox(1, 1, 1).translate((1, 0, 0)),
+            cq.Solid.makeBox(1, 1, 1).translate((10, 0, 0)),
+        ]
+        assert touching_clusters(solids) == [[0, 1], [2]]
+
+    def test_clusters_are_closed_over_touching(self):
+        """0 touches 1 and 1 touches 2, so all three are one cluster even
+        though 0 and 2 are apart."""
+        solids = [
+            cq.Solid.makeBox(1, 1, 1).translate((2, 0, 0)),
+            cq.Solid.makeBox(1, 1, 1).translate((20, 0, 0)),
+            cq.Solid.makeBox(1, 1, 1),
+            cq.Solid.makeBox(1, 1, 1).translate((1, 0, 0)),
+        ]
+        assert touching_clusters(solids) == [[0, 2, 3], [1]]
+
+    def test_solids_apart_in_one_axis_only_are_separate(self):
+        solids = [
+            cq.Solid.makeBox(1, 1, 1),
+            cq.Solid.makeBox(1, 1, 1).translate((0, 0, 5)),
+        ]
+        assert touching_clusters(solids) == [[0], [1]]
+
+    def test_no_solids(self):
+        assert touching_clusters([]) == []
+
+
+class TestResolveImprintOptions:
+    def test_options_are_passed_through(self):
+        options = ImprintOptions(processes=2, threads=1)
+        assert resolve_imprint(options) == (True, options)
+
+    def test_dict_becomes_options(self):
+        assert resolve_imprint({"processes": 2}) == (
+            True,
+            ImprintOptions(processes=2),
+        )
+
+    def test_unknown_dict_keys_are_rejected(self):
+        with pytest.raises(TypeError, match="unknown options"):
+            resolve_imprint({"proceses": 2})
+
+    @pytest.mark.parametrize("processes", [0, -2])
+    def test_processes_below_one_is_rejected(self, processes):
+        with pytest.raises(ValueError, match="processes"):
+            ImprintOptions(processes=processes)
+
+    @pytest.mark.parametrize("threads", [True, 2.0, "2"])
+    def test_non_int_threads_is_rejected(self, threads):
+        with pytest.raises(TypeError, match="threads"):
+            ImprintOptions(threads=threads)
+
+
+def test_processes_do_not_change_the_imprint():
+    in_process, in_process_ids = imprint_assembly(
+        _two_pairs_of_touching_boxes_and_a_sphere()
+    )
+    assembly = _two_pairs_of_touching_boxes_and_a_sphere()
+    in_workers, in_workers_ids = imprint_assembly(assembly, processes=2)
+
+    assert len(in_workers.Solids()) == len(in_process.Solids())
+    # the faces the touching boxes share are only counted once, so matching
+    # face counts show the shared faces survived the trip back from the workers
+    assert len(in_workers.Faces()) == len(in_process.Faces())
+
+    original_names = {name for _, name, _, _ in assembly}
+    assert sorted(in_workers_ids.values()) == sorted(
+        (name,) for name in original_names
+    )
+
+
+def test_the_thread_pool_is_left_alone_by_processes():
+    before = OSD_ThreadPool.DefaultPool_s().NbThreads()
+    imprint_assembly(
+        _two_pairs_of_touching_boxes_and_a_sphere(),
+        threads=ImprintOptions(processes=2, threads=1),
+    )
+    assert OSD_ThreadPool.DefaultPool_s().NbThreads() == before
+
+
+@pytest.mark.parametrize("meshing_backend", ["gmsh", "cadquery"])
+def test_export_dagmc_h5m_file_imprints_in_processes(tmp_path, meshing_backend):
+    model = CadToDagmc()
+    model.add_cadquery_object(
+        _two_pairs_of_touching_boxes_and_a_sphere(),
+        material_tags=["a", "b", "c", "d", "e"],
+    )
+    h5m_filename = tmp_path / "dagmc.h5m"
+
+    model.export_dagmc_h5m_file(
+        filename=str(h5m_filename),
+        meshing_backend=meshing_backend,
+        imprint={"processes": 2, "threads": 1},
+    )
+
+    assert h5m_filename.is_file()
@@ -138,6 +138,26 @@ class TestImprintThreadLimit:
             wrapped_params = inspect.signature(cq.occ_impl.assembly.imprint).parameters
         assert list(wrapped_params) == list(real_params)
 
+    def test_arguments_given_by_position_are_passed_on(self):
+        calls = []
+        real_imprint = cq.occ_impl.assembly.imprint
+
+        def fake_imprint(assy, glue="full", tolerance=None):
+            calls.append((glue, tolerance))
+            return real_imprint(assy)
+
+        cq.occ_impl.assembly.imprint = fake_imprint
+        try:
+            with imprint_thread_limit(2):
+                cq.occ_impl.assembly.imprint(_two_touching_boxes(), "partial", 0.1)
+                cq.occ_impl.assembly.imprint(
+                    assy=_two_touching_boxes(), tolerance=0.2
+                )
+        finally:
+            cq.occ_impl.assembly.imprint = real_imprint
+
+        assert calls == [("partial", 0.1), ("full", 0.2)]
+
     def test_none_leaves_the_imprint_alone(self):
         real_imprint = cq.occ_impl.assembly.imprint
         with imprint_thread_limit(None):
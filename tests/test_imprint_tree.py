@@ -0,0 +1,91 @@
+"""Tests for the "tree" imprint strategy.
+
+The tree strategy imprints spatial blocks of solids on their own and then
+imprints the solids along the boundaries between blocks as the blocks are
+merged. It is there to bound the peak RAM of the imprint on large assemblies,
+so it has to produce exactly the topology imprinting everything at once does:
+the writers rely on touching solids sharing their faces, edges and vertices.
+"""
+
+import cadquery as cq
+import pytest
+
+from cad_to_dagmc import CadToDagmc, ImprintOptions
+from cad_to_dagmc.core import imprint_assembly
+from conftest import topology
+
+
+def _grid_of_cubes(offset=0.0):
+    """27 touching unit cubes, with every other column shifted by offset so
+    that neighbouring faces only partly overlap when it is not 0."""
+    assembly = cq.Assembly()
+    for i in range(3):
+        for j in range(3):
+            for k in range(3):
+                shift = offset if i % 2 else 0.0
+                assembly.add(cq.Solid.makeBox(1, 1, 1).translate((i, j + shift, k)))
+    return assembly
+
+
+@pytest.mark.parametrize("offset", [0.0, 0.3])
+@pytest.mark.parametrize("block_size", [1, 4, 13])
+def test_tree_matches_a_single_imprint(offset, block_size):
+    """Shared faces, edges and vertices are only counted once, so equal counts
+    show the blocks were stitched back together with everything shared that
+    should be."""
+    single, single_ids = imprint_assembly(_grid_of_cubes(offset))
+    tree, tree_ids = imprint_assembly(
+        _grid_of_cubes(offset),
+        threads=ImprintOptions(strategy="tree", block_size=block_size),
+    )
+
+    assert topology(tree) == topology(single)
+    assert len(tree_ids) == len(single_ids)
+
+
+def test_tree_keeps_the_original_ids():
+    assembly = _grid_of_cubes(0.3)
+    _, tree_ids = imprint_assembly(
+        assembly, threads=ImprintOptions(strategy="tree", block_size=4)
+    )
+
+    assert sorted(tree_ids.values()) == sorted(
+        (name,) for _, name, _, _ in assembly
+    )
+
+
+def test_tree_with_processes_matches_a_single_imprint():
+    single, _ = imprint_assembly(_grid_of_cubes(0.3))
+    tree, _ = imprint_assembly(
+        _grid_of_cubes(0.3),
+        threads=ImprintOptions(strategy="tree", block_size=4, processes=2),
+    )
+
+    assert topology(tree) == topology(single)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError, match="strategy"):
+        ImprintOptions(strategy="octree")
+
+
+def test_block_size_below_one_is_rejected():
+    with pytest.raises(ValueError, match="block_size"):
+        ImprintOptions(strategy="tree", block_size=0)
+
+
+@pytest.mark.parametrize("meshing_backend", ["gmsh", "cadquery"])
+def test_export_dagmc_h5m_file_with_tree_imprint(tmp_path, meshing_backend):
+    model = CadToDagmc()
+    model.add_cadquery_object(
+        _grid_of_cubes(0.3), material_tags=[f"mat{i}" for i in range(27)]
+    )
+    h5m_filename = tmp_path / "dagmc.h5m"
+
+    model.export_dagmc_h5m_file(
+        filename=str(h5m_filename),
+        meshing_backend=meshing_backend,
+        imprint={"strategy": "tree", "block_size": 4},
+    )
+
+    assert h5m_filename.is_file()
@@ -0,0 +1,106 @@
+"""Tests for incremental exports that only mesh the solids that changed.
+
+The tessellation of every solid is kept in a file next to the h5m, and the
+next export takes the solids that did not change from it. The result has to
+be the same mesh as meshing everything afresh.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import tessellate_incrementally
+
+
+def _grid(swap=None, n=4):
+    """Touching unit cubes, every other column shifted so that neighbouring
+    faces only partly overlap, with the cube at index swap replaced by a
+    cylinder."""
+    solids = []
+    for i in range(n):
+        for j in range(n):
+            shift = 0.3 if i % 2 else 0.0
+            if len(solids) == swap:
+                solid = cq.Solid.makeCylinder(0.4, 1).translate(
+                    (i + 0.5, j + shift + 0.5, 0)
+                )
+            else:
+                solid = cq.Solid.makeBox(1, 1, 1).translate((i, j + shift, 0))
+            solids.append(solid)
+    return solids
+
+
+def _export(tmp_path, name, solids, **kwargs):
+    model = CadToDagmc()
+    for index, solid in enumerate(solids):
+        model.add_cadquery_object(solid, material_tags=[f"mat{index}"])
+    filename = tmp_path / name
+    model.export_dagmc_h5m_file(
+        filename=str(filename), meshing_backend="cadquery", tolerance=0.01, **kwargs
+    )
+    with h5py.File(filename, "r") as f:
+        return (
+            f["tstt/nodes/coordinates"][()],
+            f["tstt/elements/Tri3/connectivity"].shape,
+            f["tstt/sets/list"].shape,
+        )
+
+
+def test_changed_export_matches_a_fresh_one(tmp_path, capsys):
+    _export(tmp_path, "dagmc.h5m", _grid(), incremental=True)
+    capsys.readouterr()
+    incremental = _export(tmp_path, "dagmc.h5m", _grid(swap=5), incremental=True)
+    fresh = _export(tmp_path, "fresh.h5m", _grid(swap=5))
+
+    assert "reusing the tessellation of" in capsys.readouterr().out
+    assert len(incremental[0]) == len(fresh[0])
+    np.testing.assert_array_equal(
+        np.sort(incremental[0], axis=0), np.sort(fresh[0], axis=0)
+    )
+    assert incremental[1:] == fresh[1:]
+
+
+def test_tessellations_are_kept_next_to_the_h5m(tmp_path):
+    _export(tmp_path, "dagmc.h5m", _grid(), incremental=True)
+
+    assert (tmp_path / "dagmc.h5m.tessellation.npz").is_file()
+
+
+def test_unchanged_export_meshes_nothing(tmp_path, capsys):
+    _export(tmp_path, "dagmc.h5m", _grid(), incremental=True)
+    capsys.readouterr()
+    _export(tmp_path, "dagmc.h5m", _grid(), incremental=True)
+
+    assert "No solids have changed" in capsys.readouterr().out
+
+
+def test_new_tolerance_meshes_everything(tmp_path, capsys):
+    _export(tmp_path, "dagmc.h5m", _grid(), incremental=True)
+    capsys.readouterr()
+    _export(tmp_path, "dagmc.h5m", _grid(), incremental=True, angular_tolerance=0.5)
+
+    assert "reusing the tessellation" not in capsys.readouterr().out.lower()
+
+
+def test_moved_solid_is_meshed_again(tmp_path, capsys):
+    solids = [cq.Solid.makeBox(1, 1, 1), cq.Solid.makeSphere(1).translate((5, 0, 0))]
+    tessellate_incrementally(solids, 0.01, 0.1, tmp_path / "cache.npz")
+    solids[1] = solids[1].translate((0, 5, 0))
+    capsys.readouterr()
+    vertices, _ = tessellate_incrementally(solids, 0.01, 0.1, tmp_path / "cache.npz")
+
+    assert "Meshing 1 changed solids and 0 of their neighbours" in (
+        capsys.readouterr().out
+    )
+    assert vertices[:, 1].max() > 5
+
+
+def test_removed_solids_are_dropped_from_the_file(tmp_path):
+    solids = [cq.Solid.makeBox(1, 1, 1).translate((2 * i, 0, 0)) for i in range(3)]
+    tessellate_incrementally(solids, 0.1, 0.1, tmp_path / "cache.npz")
+    tessellate_incrementally(solids[:2], 0.1, 0.1, tmp_path / "cache.npz")
+
+    with np.load(tmp_path / "cache.npz") as data:
+        assert len(data["fingerprints"]) == 2
+        assert data["faces_per_solid"].tolist() == [6, 6]
@@ -0,0 +1,119 @@
+"""Tests for meshing congruent solids once.
+
+Solids that are one shape at several locations are meshed once and the
+vertices moved into place for the others, which has to give the same mesh
+as meshing each of them. Solids that share a face with another solid are
+always meshed on their own, so the shared face still welds into one surface.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import _congruent_solids, imprint_assembly
+
+
+def _bolt():
+    return (
+        cq.Workplane()
+        .cylinder(10, 1)
+        .union(cq.Workplane().sphere(1.5).translate((0, 0, 5)))
+        .val()
+    )
+
+
+def _bolts_on_a_plate(gap=0.0):
+    """A plate with a grid of bolts, each turned by a different angle, on
+    it, or floating gap above it."""
+    assembly = cq.Assembly()
+    assembly.add(cq.Workplane().box(40, 40, 2).translate((0, 0, -1)), name="plate")
+    bolt = _bolt()
+    for i in range(3):
+        for j in range(3):
+            assembly.add(
+                bolt,
+                name=f"bolt{i}{j}",
+                loc=cq.Location(
+                    (i * 10 - 10, j * 10 - 10, 5 + gap), (0, 0, 1), 20 * i + j
+                ),
+            )
+    return assembly
+
+
+def _export(tmp_path, name, assembly, **kwargs):
+    model = CadToDagmc()
+    model.add_cadquery_object(assembly, material_tags=["plate"] + ["bolt"] * 9)
+    filename = tmp_path / name
+    model.export_dagmc_h5m_file(
+        filename=str(filename), meshing_backend="cadquery", tolerance=0.05, **kwargs
+    )
+    with h5py.File(filename, "r") as f:
+        return (
+            f["tstt/nodes/coordinates"][()],
+            f["tstt/elements/Tri3/connectivity"].shape,
+            f["tstt/sets/list"].shape,
+        )
+
+
+def test_located_copies_are_grouped():
+    bolt = _bolt()
+    solids = [
+        bolt.moved(cq.Location((10 * i, 0, 0), (0, 0, 1), 30 * i)) for i in range(4)
+    ] + [cq.Solid.makeBox(1, 1, 1)]
+
+    representatives, instances = _congruent_solids(solids)
+
+    assert len(representatives) == 2
+    assert [representative for representative, _ in instances] == [0, 0, 0, 0, 1]
+    assert instances[4][1] is None
+    np.testing.assert_allclose(instances[1][1][:, 3], [10, 0, 0], atol=1e-12)
+
+
+def test_solids_sharing_a_face_are_not_grouped(capsys):
+    box = cq.Solid.makeBox(1, 1, 1)
+    assembly = (
+        cq.Assembly()
+        .add(box)
+        .add(box, loc=cq.Location((1, 0, 0)))
+        .add(box, loc=cq.Location((5, 0, 0)))
+    )
+    compound, _ = imprint_assembly(assembly)
+    representatives, instances = _congruent_solids(compound.Solids())
+
+    assert len(representatives) == 3
+    assert (
+        "Instancing 0 of 3 solids, meshing 3 solids for all of them. 2 solids "
+        "share a face" in capsys.readouterr().out
+    )
+
+
+@pytest.mark.parametrize("gap", [0.0, 1.0])
+@pytest.mark.parametrize("imprint", [True, False])
+def test_instanced_export_matches_meshing_every_solid(tmp_path, imprint, gap):
+    each = _export(tmp_path, "each.h5m", _bolts_on_a_plate(gap), imprint=imprint)
+    instanced = _export(
+        tmp_path,
+        "instanced.h5m",
+        _bolts_on_a_plate(gap),
+        imprint=imprint,
+        instancing=True,
+    )
+
+    assert instanced[1:] == each[1:]
+    assert len(instanced[0]) == len(each[0])
+    np.testing.assert_allclose(
+        np.sort(instanced[0], axis=0), np.sort(each[0], axis=0), atol=1e-9
+    )
+
+
+def test_located_parts_are_placed_without_imprinting(tmp_path):
+    """The direct-mesh plugin places the solids it does not imprint by the
+    location of their assembly child, not that of the shape."""
+    vertices, _, _ = _export(
+        tmp_path, "dagmc.h5m", _bolts_on_a_plate(gap=1.0), imprint=False
+    )
+
+    assert vertices[:, 0].max() > 10
+    assert vertices[:, 2].max() > 12
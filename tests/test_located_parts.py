@@ -0,0 +1,46 @@
+"""Tests for placing parts that carry a location of their own.
+
+The assembly every export is made from puts the location of each part on its
+assembly child rather than on the shape, as cadquery_direct_mesh_plugin
+places the solids it does not imprint by the child alone. Every backend has
+to place the parts where they are, whether it imprints them or not.
+"""
+
+import cadquery as cq
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+
+
+def _model():
+    """A unit cube at the origin and a copy of it located 10 along x."""
+    box = cq.Solid.makeBox(1, 1, 1)
+    model = CadToDagmc()
+    model.add_cadquery_object(box, material_tags=["fixed"])
+    model.add_cadquery_object(
+        box.located(cq.Location((10, 0, 0), (0, 0, 1), 90)), material_tags=["moved"]
+    )
+    return model
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"meshing_backend": "cadquery", "imprint": False},
+        {"meshing_backend": "cadquery"},
+        {"meshing_backend": "gmsh", "max_mesh_size": 0.5},
+        {"meshing_backend": "cad-to-dagmc-mesher"},
+    ],
+    ids=["cadquery without imprint", "cadquery", "gmsh", "cad-to-dagmc-mesher"],
+)
+def test_located_parts_are_placed_by_every_backend(kwargs):
+    result = _model().mesh(**kwargs)
+
+    bounds = []
+    for faces in result.triangles_by_solid_by_face.values():
+        vertices = result.vertices[np.unique(np.vstack(list(faces.values())))]
+        bounds.append((vertices.min(axis=0), vertices.max(axis=0)))
+    bounds.sort(key=lambda bound: bound[0][0])
+    np.testing.assert_allclose(bounds[0], [[0, 0, 0], [1, 1, 1]], atol=1e-6)
+    np.testing.assert_allclose(bounds[1], [[9, 0, 0], [10, 1, 1]], atol=1e-6)
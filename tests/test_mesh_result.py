@@ -0,0 +1,229 @@
+"""Tests for meshing a model once and writing the mesh to several files.
+
+CadToDagmc.mesh returns a MeshResult, whose writers have to give the same
+h5m as export_dagmc_h5m_file and read back what they wrote.
+"""
+
+import cadquery as cq
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc, MeshResult
+from conftest import read_h5m
+
+
+def _model():
+    """A box with a smaller box against its side, added in the opposite
+    order to their position."""
+    model = CadToDagmc()
+    model.add_cadquery_object(
+        cq.Workplane().box(1, 1, 1).translate((1.5, 0, 0)), material_tags=["small"]
+    )
+    model.add_cadquery_object(cq.Workplane().box(2, 2, 2), material_tags=["large"])
+    return model
+
+
+def _read_msh_sections(filename):
+    sections = {}
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith("$") and not line.startswith("$End"):
+            end = lines.index(f"$End{line[1:]}", index)
+            sections[line[1:]] = lines[index + 1 : end]
+    return sections
+
+
+def _tet():
+    """A mesh of one unit cube volume with a single tetrahedron in it that
+    shares a corner with the surface."""
+    vertices = np.array(
+        [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=float
+    )
+    triangles = np.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]])
+    return MeshResult(
+        vertices=vertices,
+        triangles_by_solid_by_face={1: {1: triangles[:2], 2: triangles[2:]}},
+        material_tags=["steel"],
+        part_ids=[0],
+        tet_vertices=vertices[[3, 1, 2, 0]],
+        tetrahedra=np.array([[3, 1, 2, 0]]),
+        tet_volume_ids=np.array([1]),
+    )
+
+
+def test_to_h5m_matches_export_dagmc_h5m_file(tmp_path):
+    model = _model()
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "export.h5m"), meshing_backend="cadquery"
+    )
+    result = model.mesh(meshing_backend="cadquery")
+    result.to_h5m(str(tmp_path / "mesh.h5m"))
+
+    for exported, meshed in zip(
+        read_h5m(tmp_path / "export.h5m"), read_h5m(tmp_path / "mesh.h5m")
+    ):
+        np.testing.assert_array_equal(exported, meshed)
+
+
+def test_part_ids_follow_the_imprinted_order():
+    model = _model()
+    result = model.mesh(meshing_backend="cadquery", processes=1)
+
+    assert sorted(result.part_ids) == [0, 1]
+    assert result.material_tags == [
+        model.material_tags[part_id] for part_id in result.part_ids
+    ]
+    assert isinstance(result.vertices, np.ndarray)
+    assert result.vertices.shape[1] == 3
+
+
+def test_npz_round_trip(tmp_path):
+    result = _model().mesh(meshing_backend="cadquery")
+    result.to_npz(tmp_path / "mesh.npz")
+    loaded = MeshResult.from_npz(tmp_path / "mesh.npz")
+
+    np.testing.assert_array_equal(loaded.vertices, result.vertices)
+    assert loaded.material_tags == result.material_tags
+    assert loaded.part_ids == result.part_ids
+    assert loaded.tetrahedra is None
+    assert list(loaded.triangles_by_solid_by_face) == list(
+        result.triangles_by_solid_by_face
+    )
+    for solid_id, faces in result.triangles_by_solid_by_face.items():
+        assert list(loaded.triangles_by_solid_by_face[solid_id]) == list(faces)
+        for face_id, triangles in faces.items():
+            np.testing.assert_array_equal(
+                loaded.triangles_by_solid_by_face[solid_id][face_id], triangles
+            )
+
+
+def test_npz_round_trip_keeps_the_tet_mesh(tmp_path):
+    _tet().to_npz(tmp_path / "mesh.npz")
+    loaded = MeshResult.from_npz(tmp_path / "mesh.npz")
+
+    np.testing.assert_array_equal(loaded.tetrahedra, [[3, 1, 2, 0]])
+    np.testing.assert_array_equal(loaded.tet_volume_ids, [1])
+
+
+def test_to_msh_writes_each_shared_face_once(tmp_path):
+    result = _model().mesh(meshing_backend="cadquery")
+    result.to_msh(tmp_path / "mesh.msh")
+    sections = _read_msh_sections(tmp_path / "mesh.msh")
+
+    assert sections["MeshFormat"] == ["4.1 0 8"]
+    assert sections["PhysicalNames"][1:] == [
+        f'3 {tag} "{material_tag}"'
+        for tag, material_tag in enumerate(result.material_tags, start=1)
+    ]
+
+    surface_count, volume_count = map(int, sections["Entities"][0].split()[2:])
+    assert volume_count == 2
+    # imprinting splits the face of the large box that the small one is
+    # against, into the face they share and the rest of it
+    assert surface_count == 6 + 7 - 1
+    volumes = [line.split() for line in sections["Entities"][-2:]]
+    bounding_surfaces = [
+        int(surface) for volume in volumes for surface in volume[11:]
+    ]
+    assert sum(surface < 0 for surface in bounding_surfaces) == 1
+
+    triangle_count = sum(
+        len(triangles)
+        for faces in result.triangles_by_solid_by_face.values()
+        for triangles in faces.values()
+    )
+    shared_face = -min(bounding_surfaces)
+    shared_triangles = len(
+        next(
+            faces[shared_face]
+            for faces in result.triangles_by_solid_by_face.values()
+            if shared_face in faces
+        )
+    )
+    assert int(sections["Elements"][0].split()[1]) == triangle_count - shared_triangles
+
+
+def test_to_msh_shares_the_nodes_of_surface_and_tets(tmp_path):
+    _tet().to_msh(tmp_path / "mesh.msh")
+    sections = _read_msh_sections(tmp_path / "mesh.msh")
+
+    # the corners of the tetrahedron are the nodes of the surface
+    assert sections["Nodes"][0] == "1 4 1 4"
+    assert sections["Elements"][0] == "3 5 1 5"
+    assert sections["Elements"][-1] == "5 1 2 3 4"
+
+
+def test_to_vtk_without_tetrahedra_is_rejected(tmp_path):
+    result = _model().mesh(meshing_backend="cadquery")
+
+    with pytest.raises(ValueError, match="no tetrahedra"):
+        result.to_vtk(tmp_path / "umesh.vtk")
+
+
+def test_to_vtk_writes_the_tet_mesh(tmp_path):
+    _tet().to_vtk(tmp_path / "umesh.vtk")
+
+    text = (tmp_path / "umesh.vtk").read_text()
+    assert "POINTS 4 double" in text
+    assert "CELLS 1 5" in text
+
+
+@pytest.mark.parametrize("key", ["h5m_backend", "umesh_filename"])
+def test_writer_arguments_are_rejected(key):
+    with pytest.raises(ValueError, match=key):
+        _model().mesh(meshing_backend="cadquery", **{key: "h5py"})
+
+
+def test_incremental_needs_a_filename(tmp_path):
+    model = _model()
+    with pytest.raises(ValueError, match="incremental"):
+        model.mesh(meshing_backend="cadquery", incremental=True)
+
+    model.mesh(
+        meshing_backend="cadquery", incremental=str(tmp_path / "mesh.tessellation.npz")
+    )
+    assert (tmp_path / "mesh.tessellation.npz").is_file()
+
+
+def test_gmsh_reads_the_msh_file(tmp_path):
+    import gmsh
+
+    _model().mesh(meshing_backend="cadquery").to_msh(tmp_path / "mesh.msh")
+    gmsh.initialize()
+    try:
+        gmsh.open(str(tmp_path / "mesh.msh"))
+        assert len(gmsh.model.getEntities(3)) == 2
+        assert len(gmsh.model.getEntities(2)) == 12
+        names = {
+            gmsh.model.getPhysicalName(3, tag)
+            for _, tag in gmsh.model.getPhysicalGroups(3)
+        }
+        assert names == {"small", "large"}
+    finally:
+        gmsh.finalize()
+
+
+def test_to_msh_numbers_only_the_nodes_in_use(tmp_path):
+    result = _tet()
+    # a vertex no triangle or tetrahedron uses
+    result.vertices = np.vstack([[[5, 5, 5]], result.vertices])
+    result.triangles_by_solid_by_face = {
+        1: {face_id: t + 1 for face_id, t in result.triangles_by_solid_by_face[1].items()}
+    }
+    result.to_msh(tmp_path / "mesh.msh")
+    sections = _read_msh_sections(tmp_path / "mesh.msh")
+
+    block_count, node_count, min_tag, max_tag = map(int, sections["Nodes"][0].split())
+    assert (node_count, min_tag, max_tag) == (4, 1, 4)
+    lines = sections["Nodes"][1:]
+    tags, coordinates = [], []
+    for _ in range(block_count):
+        count = int(lines.pop(0).split()[3])
+        tags += [int(tag) for tag in lines[:count]]
+        coordinates += [list(map(float, line.split())) for line in lines[count : 2 * count]]
+        lines = lines[2 * count :]
+    assert sorted(tags) == [1, 2, 3, 4]
+    assert [5.0, 5.0, 5.0] not in coordinates
+    # the tetrahedron refers to the renumbered nodes
+    assert sorted(map(int, sections["Elements"][-1].split()[1:])) == [1, 2, 3, 4]
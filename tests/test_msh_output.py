@@ -0,0 +1,86 @@
+"""Tests for the binary and partitioned msh files of export_gmsh_mesh_file."""
+
+import numpy as np
+import pytest
+
+from cad_to_dagmc import read_gmsh_mesh_file
+
+
+def _sections(filename):
+    with open(filename, "rb") as f:
+        return [line.strip() for line in f if line.startswith(b"$")]
+
+
+def test_binary_file_holds_the_same_mesh(tmp_path, ball_in_cup):
+    model = ball_in_cup()
+    model.export_gmsh_mesh_file(filename=str(tmp_path / "ascii.msh"), max_mesh_size=2.0)
+    model.export_gmsh_mesh_file(
+        filename=str(tmp_path / "binary.msh"), max_mesh_size=2.0, binary=True
+    )
+
+    with open(tmp_path / "binary.msh", "rb") as f:
+        assert f.read(22) == b"$MeshFormat\n4.1 1 8\n\x01\x00"
+    assert (tmp_path / "binary.msh").stat().st_size < (tmp_path / "ascii.msh").stat().st_size
+
+    ascii_mesh = read_gmsh_mesh_file(tmp_path / "ascii.msh")
+    binary_mesh = read_gmsh_mesh_file(tmp_path / "binary.msh")
+    np.testing.assert_allclose(ascii_mesh[0], binary_mesh[0])
+    for volume_id, faces in ascii_mesh[1].items():
+        for face_id, triangles in faces.items():
+            np.testing.assert_array_equal(triangles, binary_mesh[1][volume_id][face_id])
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_partitioned_mesh_is_written(tmp_path, binary, ball_in_cup):
+    ball_in_cup().export_gmsh_mesh_file(
+        filename=str(tmp_path / "mesh.msh"),
+        dimensions=3,
+        max_mesh_size=2.0,
+        partitions=4,
+        binary=binary,
+    )
+
+    assert b"$PartitionedEntities" in _sections(tmp_path / "mesh.msh")
+
+
+def test_each_partition_is_written_to_its_own_file(tmp_path, capsys, ball_in_cup):
+    ball_in_cup().export_gmsh_mesh_file(
+        filename=str(tmp_path / "mesh.msh"),
+        dimensions=3,
+        max_mesh_size=2.0,
+        partitions=3,
+        split_partitions=True,
+        binary=True,
+    )
+
+    assert "as 3 files, one for each partition" in capsys.readouterr().out
+    for partition in (1, 2, 3):
+        assert (tmp_path / f"mesh_{partition}.msh").is_file()
+
+
+def test_session_does_not_keep_the_file_options(tmp_path, ball_in_cup):
+    model = ball_in_cup()
+    with model.gmsh_session():
+        model.export_gmsh_mesh_file(
+            filename=str(tmp_path / "binary.msh"), max_mesh_size=2.0, binary=True
+        )
+        model.export_unstructured_mesh_file(
+            filename=str(tmp_path / "umesh.vtk"), max_mesh_size=4.0
+        )
+
+    with open(tmp_path / "umesh.vtk", "rb") as f:
+        assert b"ASCII" in f.read(200)
+
+
+@pytest.mark.parametrize(
+    "kwargs, error",
+    [
+        ({"partitions": 0}, ValueError),
+        ({"partitions": 2.5}, TypeError),
+        ({"partitions": True}, TypeError),
+        ({"split_partitions": True}, ValueError),
+    ],
+)
+def test_bad_partitions_are_rejected(kwargs, error, ball_in_cup):
+    with pytest.raises(error, match="partitions"):
+        ball_in_cup().export_gmsh_mesh_file(**kwargs)
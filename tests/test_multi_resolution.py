@@ -0,0 +1,80 @@
+"""Tests for exporting several mesh resolutions from one imprint.
+
+Every resolution has to give the same h5m as exporting it on its own, while
+the geometry is imprinted once, whether the resolutions are meshed here or
+in worker processes.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import read_h5m
+
+TOLERANCES = [0.5, 0.1, 0.02]
+
+
+def _resolutions(tmp_path, name):
+    return [
+        {"filename": str(tmp_path / f"{name}_{tolerance}.h5m"), "tolerance": tolerance}
+        for tolerance in TOLERANCES
+    ]
+
+
+@pytest.mark.parametrize("resolution_processes", [None, 2])
+def test_each_resolution_matches_its_own_export(
+    tmp_path, capsys, resolution_processes, ball_in_cup
+):
+    filenames = ball_in_cup().export_dagmc_h5m_files(
+        _resolutions(tmp_path, "many"),
+        meshing_backend="cadquery",
+        resolution_processes=resolution_processes,
+    )
+    output = capsys.readouterr().out
+
+    assert filenames == [resolution["filename"] for resolution in _resolutions(tmp_path, "many")]
+    if resolution_processes is None:
+        # the workers print to their own output
+        assert output.count("Reusing the imprint of a previous export") == 2
+    else:
+        assert "Meshing 2 more resolutions in 2 processes" in output
+
+    triangle_counts = []
+    for tolerance in TOLERANCES:
+        ball_in_cup().export_dagmc_h5m_file(
+            filename=str(tmp_path / f"one_{tolerance}.h5m"),
+            meshing_backend="cadquery",
+            tolerance=tolerance,
+        )
+        one = read_h5m(tmp_path / f"one_{tolerance}.h5m")
+        many = read_h5m(tmp_path / f"many_{tolerance}.h5m")
+        for expected, written in zip(one, many):
+            np.testing.assert_array_equal(expected, written)
+        triangle_counts.append(len(many[1]))
+    assert triangle_counts == sorted(triangle_counts)
+
+
+def test_shared_arguments_apply_to_every_resolution(tmp_path, ball_in_cup):
+    ball_in_cup().export_dagmc_h5m_files(
+        [
+            {"filename": str(tmp_path / "a.h5m")},
+            {"filename": str(tmp_path / "b.h5m"), "tolerance": 0.05},
+        ],
+        meshing_backend="cadquery",
+        tolerance=0.5,
+        angular_tolerance=1.0,
+    )
+
+    assert len(read_h5m(tmp_path / "a.h5m")[1]) < len(read_h5m(tmp_path / "b.h5m")[1])
+
+
+@pytest.mark.parametrize(
+    "resolutions, match",
+    [
+        ([], "empty"),
+        ([{"tolerance": 0.1}], "no filename"),
+        ([{"filename": "a.h5m"}, {"filename": "a.h5m", "tolerance": 0.1}], "differ"),
+    ],
+)
+def test_bad_resolutions_are_rejected(resolutions, match, ball_in_cup):
+    with pytest.raises(ValueError, match=match):
+        ball_in_cup().export_dagmc_h5m_files(resolutions, meshing_backend="cadquery")
@@ -0,0 +1,147 @@
+"""Tests for tessellating solids in worker processes.
+
+The solids are shared out between workers and the results welded back
+together, which has to give the same mesh as tessellating them all in one
+process with cadquery_direct_mesh_plugin, including one surface for each face
+two imprinted solids share.
+"""
+
+import cadquery as cq
+import h5py
+import pytest
+
+import cadquery_direct_mesh_plugin  # noqa: F401, registers Assembly.toMesh
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import (
+    imprint_assembly,
+    share_coincident_face_ids,
+    tessellate_in_processes,
+)
+
+
+def _touching_solids():
+    """Boxes in a grid with every other column shifted so that neighbouring
+    faces only partly overlap, and curved solids resting on top."""
+    assembly = cq.Assembly()
+    for i in range(3):
+        for j in range(2):
+            shift = 0.3 if i % 2 else 0.0
+            assembly.add(cq.Solid.makeBox(1, 1, 1).translate((i, j + shift, 0)))
+    assembly.add(cq.Solid.makeCylinder(0.4, 1).translate((0.5, 0.5, 1)))
+    assembly.add(cq.Solid.makeSphere(0.5).translate((2.5, 0.5, 1.5)))
+    return assembly
+
+
+def _counts(vertices, triangles_by_solid_by_face):
+    return (
+        len(vertices),
+        {
+            solid_id: sum(len(triangles) for triangles in faces.values())
+            for solid_id, faces in triangles_by_solid_by_face.items()
+        },
+        len(
+            {
+                face_id
+                for faces in triangles_by_solid_by_face.values()
+                for face_id in faces
+            }
+        ),
+    )
+
+
+def test_imprinted_solids_match_the_plugin():
+    imprinted, _ = imprint_assembly(_touching_solids())
+    vertices, triangles_by_solid_by_face = tessellate_in_processes(
+        imprinted.Solids(), tolerance=0.05, angular_tolerance=0.1, processes=2
+    )
+    reference = _touching_solids().toMesh(
+        imprint=True, tolerance=0.05, angular_tolerance=0.1
+    )
+
+    assert _counts(
+        vertices, share_coincident_face_ids(triangles_by_solid_by_face)
+    ) == _counts(
+        reference["vertices"],
+        share_coincident_face_ids(reference["solid_face_triangle_vertex_map"]),
+    )
+
+
+def test_solid_and_face_ids_count_from_one():
+    solids = [cq.Solid.makeBox(1, 1, 1), cq.Solid.makeBox(1, 1, 1).translate((3, 0, 0))]
+    vertices, triangles_by_solid_by_face = tessellate_in_processes(
+        solids, tolerance=0.1, angular_tolerance=0.1, scale_factor=10, processes=2
+    )
+
+    assert list(triangles_by_solid_by_face) == [1, 2]
+    assert list(triangles_by_solid_by_face[1]) == [1, 2, 3, 4, 5, 6]
+    assert list(triangles_by_solid_by_face[2]) == [7, 8, 9, 10, 11, 12]
+    assert len(vertices) == 16
+    assert vertices.max(axis=0).tolist() == [40.0, 10.0, 10.0]
+
+
+@pytest.mark.parametrize("processes", [0, -2])
+def test_processes_below_one_are_rejected(processes):
+    with pytest.raises(ValueError, match="processes"):
+        tessellate_in_processes(
+            [cq.Solid.makeBox(1, 1, 1)], 0.1, 0.1, processes=processes
+        )
+
+
+@pytest.mark.parametrize("processes", ["2", 2.0, True])
+def test_non_int_processes_are_rejected(processes):
+    with pytest.raises(TypeError, match="processes"):
+        tessellate_in_processes(
+            [cq.Solid.makeBox(1, 1, 1)], 0.1, 0.1, processes=processes
+        )
+
+
+def _read_mesh(filename):
+    with h5py.File(filename, "r") as f:
+        return (
+            f["tstt/nodes/coordinates"].shape,
+            f["tstt/elements/Tri3/connectivity"].shape,
+            f["tstt/sets/list"].shape,
+        )
+
+
+@pytest.mark.parametrize("imprint", [True, False])
+def test_export_dagmc_h5m_file_matches_one_process(tmp_path, imprint):
+    model = CadToDagmc()
+    model.add_cadquery_object(
+        _touching_solids(), material_tags=[f"mat{i}" for i in range(8)]
+    )
+
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "one.h5m"),
+        meshing_backend="cadquery",
+        imprint=imprint,
+        tolerance=0.05,
+    )
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "many.h5m"),
+        meshing_backend="cadquery",
+        imprint=imprint,
+        tolerance=0.05,
+        processes=2,
+    )
+
+    assert _read_mesh(tmp_path / "many.h5m") == _read_mesh(tmp_path / "one.h5m")
+
+
+def test_processes_selects_the_cadquery_backend(tmp_path, capsys):
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().box(1, 1, 1), material_tags=["mat1"])
+
+    model.export_dagmc_h5m_file(filename=str(tmp_path / "dagmc.h5m"), processes=1)
+
+    assert "Using meshing backend: cadquery" in capsys.readouterr().out
+
+
+def test_processes_with_gmsh_arguments_is_ambiguous(tmp_path):
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().box(1, 1, 1), material_tags=["mat1"])
+
+    with pytest.raises(ValueError, match="Ambiguous backend"):
+        model.export_dagmc_h5m_file(
+            filename=str(tmp_path / "dagmc.h5m"), processes=2, max_mesh_size=1
+        )
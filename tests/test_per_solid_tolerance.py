@@ -0,0 +1,152 @@
+"""Tests for giving each solid its own tessellation tolerance.
+
+A tolerance can be given per material tag, relative to the size of each
+solid, or both. A face shared by two solids with different tolerances has to
+be meshed with the finer one from both sides, so it still welds into one
+surface, wherever the solids are meshed.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import (
+    imprint_assembly,
+    resolve_tolerances,
+    share_coincident_face_ids,
+    tessellate_in_processes,
+    tessellate_incrementally,
+)
+
+
+def _stack():
+    """Two cylinders on top of each other and a large one further up."""
+    return [
+        cq.Solid.makeCylinder(2, 4),
+        cq.Solid.makeCylinder(2, 4).translate((0, 0, 4)),
+        cq.Solid.makeCylinder(20, 40).translate((0, 0, 20)),
+    ]
+
+
+def _is_closed(faces):
+    triangles = np.vstack([np.asarray(triangles) for triangles in faces.values()])
+    edges = np.vstack(
+        [triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]
+    )
+    return len(np.unique(edges, axis=0)) == len(edges) and (
+        len(np.unique(np.sort(edges, axis=1), axis=0)) * 2 == len(edges)
+    )
+
+
+def test_tolerances_by_material_tag():
+    tolerances = resolve_tolerances(
+        _stack(), ["a", "b", "a"], {"a": 0.01}, default=0.5
+    )
+
+    assert tolerances == [0.01, 0.5, 0.01]
+
+
+def test_relative_tolerances_follow_the_size():
+    small, _, large = resolve_tolerances(_stack(), ["a", "b", "c"], None, 0.001)
+
+    assert large == pytest.approx(small * 10)
+    assert small == pytest.approx(0.001 * np.sqrt(4**2 + 4**2 + 4**2))
+
+
+def test_tag_tolerance_wins_over_relative_and_float_caps_it():
+    tolerances = resolve_tolerances(
+        _stack(), ["a", "b", "c"], 0.02, relative_tolerance=0.001
+    )
+    assert tolerances[0] < 0.02
+    assert tolerances[2] == 0.02
+
+    tolerances = resolve_tolerances(
+        _stack(), ["a", "b", "c"], {"c": 1.0}, relative_tolerance=0.001
+    )
+    assert tolerances[2] == 1.0
+
+
+def test_relative_tolerance_is_in_scaled_units():
+    unscaled = resolve_tolerances(_stack(), ["a", "b", "c"], None, 0.001)
+    scaled = resolve_tolerances(
+        _stack(), ["a", "b", "c"], None, 0.001, scale_factor=10
+    )
+
+    np.testing.assert_allclose(scaled, np.array(unscaled) * 10)
+
+
+def test_unknown_material_tag_is_rejected():
+    with pytest.raises(ValueError, match="steel"):
+        resolve_tolerances(_stack(), ["a", "b", "c"], {"steel": 0.1})
+
+
+@pytest.mark.parametrize("tolerance", [0, -1.0, "0.1"])
+def test_bad_tolerance_is_rejected(tolerance):
+    with pytest.raises(ValueError, match="positive"):
+        resolve_tolerances(_stack(), ["a", "b", "c"], {"a": tolerance})
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_shared_face_is_one_closed_surface(processes):
+    imprinted, _ = imprint_assembly(
+        cq.Assembly().add(_stack()[0]).add(_stack()[1])
+    )
+    vertices, triangles_by_solid_by_face = tessellate_in_processes(
+        imprinted.Solids(), [0.001, 0.5], 1.0, processes=processes
+    )
+    triangles_by_solid_by_face = share_coincident_face_ids(triangles_by_solid_by_face)
+
+    face_ids = [set(faces) for faces in triangles_by_solid_by_face.values()]
+    assert len(face_ids[0] & face_ids[1]) == 1
+    assert all(_is_closed(faces) for faces in triangles_by_solid_by_face.values())
+
+
+def test_changed_tolerance_meshes_the_solid_again(tmp_path, capsys):
+    solids = _stack()[::2]
+    tessellate_incrementally(solids, [0.01, 0.5], 0.5, tmp_path / "cache.npz")
+    capsys.readouterr()
+    tessellate_incrementally(solids, [0.01, 0.2], 0.5, tmp_path / "cache.npz")
+
+    assert "Meshing 1 changed solids and 0 of their neighbours" in (
+        capsys.readouterr().out
+    )
+
+
+def _triangle_count(tmp_path, backend, **kwargs):
+    model = CadToDagmc()
+    for solid, material_tag in zip(_stack(), ["small", "small", "large"]):
+        model.add_cadquery_object(solid, material_tags=[material_tag])
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"),
+        meshing_backend=backend,
+        angular_tolerance=1.0,
+        **kwargs,
+    )
+    with h5py.File(tmp_path / "dagmc.h5m", "r") as f:
+        return len(f["tstt/elements/Tri3/connectivity"])
+
+
+@pytest.mark.parametrize("backend", ["cadquery", "cad-to-dagmc-mesher"])
+def test_export_meshes_each_tag_with_its_tolerance(tmp_path, backend):
+    if backend == "cad-to-dagmc-mesher":
+        pytest.importorskip("cad_to_dagmc_mesher")
+    coarse = _triangle_count(tmp_path, backend, tolerance=0.5)
+    fine = _triangle_count(tmp_path, backend, tolerance=0.005)
+    mixed = _triangle_count(
+        tmp_path, backend, tolerance={"small": 0.005, "large": 0.5}
+    )
+
+    assert coarse < mixed < fine
+
+
+def test_relative_tolerance_selects_the_mesher_by_default(tmp_path, capsys):
+    pytest.importorskip("cad_to_dagmc_mesher")
+    model = CadToDagmc()
+    model.add_cadquery_object(_stack()[0], material_tags=["a"])
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"), relative_tolerance=0.01
+    )
+
+    assert "Using meshing backend: cad-to-dagmc-mesher" in capsys.readouterr().out
@@ -0,0 +1,135 @@
+"""Tests for meshing planar faces with the fewest triangles.
+
+Each planar face is triangulated again from the loops of vertices along its
+boundary, so the new triangles have to cover the same area, keep every
+boundary edge and need no vertices inside the face. Curved faces and faces
+whose boundary cannot be triangulated this way are left as they are.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import tessellate_in_processes, triangulate_planar_faces
+
+
+def _grid_face(n, keep):
+    """An n by n grid of unit squares in the z = 0 plane, keeping those
+    where keep(i, j) is True, split into triangles facing +z."""
+    vertices = [(i, j, 0.0) for i in range(n + 1) for j in range(n + 1)]
+    triangles = []
+    for i in range(n):
+        for j in range(n):
+            if keep(i, j):
+                a, b = i * (n + 1) + j, (i + 1) * (n + 1) + j
+                triangles += [[a, b, b + 1], [a, b + 1, a + 1]]
+    return np.array(vertices, dtype=float), {1: {1: triangles}}
+
+
+def _boundary(triangles):
+    triangles = np.asarray(triangles)
+    edges = {tuple(edge) for edge in np.vstack(
+        [triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]
+    ).tolist()}
+    return {edge for edge in edges if edge[::-1] not in edges}
+
+
+def _area(vertices, triangles):
+    corners = np.asarray(vertices)[np.asarray(triangles)]
+    return np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])[
+        :, 2
+    ].sum() / 2
+
+
+def _in_hole(i, j, centre, radius):
+    return (i + 0.5 - centre[0]) ** 2 + (j + 0.5 - centre[1]) ** 2 < radius**2
+
+
+@pytest.mark.parametrize(
+    "keep, holes",
+    [
+        (lambda i, j: True, 0),
+        # an L shaped plate with a round hole and a square one
+        (
+            lambda i, j: not (i >= 12 and j >= 12)
+            and not _in_hole(i, j, (5, 6), 3)
+            and not (13 <= i <= 15 and 3 <= j <= 6),
+            2,
+        ),
+    ],
+)
+def test_planar_face_is_spanned_by_its_boundary(keep, holes):
+    vertices, triangles = _grid_face(20, keep)
+    boundary = {
+        tuple(vertices[list(edge)].ravel()) for edge in _boundary(triangles[1][1])
+    }
+
+    new_vertices, new_triangles = triangulate_planar_faces(vertices, triangles)
+    face = np.asarray(new_triangles[1][1])
+
+    # every vertex left is on a boundary loop, and a polygon of V vertices
+    # around H holes needs V + 2 H - 2 triangles
+    assert len(face) == len(new_vertices) + 2 * holes - 2
+    assert {tuple(new_vertices[list(edge)].ravel()) for edge in _boundary(face)} == boundary
+    assert _area(new_vertices, face) == pytest.approx(
+        _area(vertices, triangles[1][1])
+    )
+    # all of them facing +z
+    corners = new_vertices[face]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    assert (normals[:, 2] > 0).all()
+
+
+def test_faces_that_cannot_be_spanned_are_left():
+    # two squares touching at a corner share a boundary vertex
+    vertices, triangles = _grid_face(4, lambda i, j: (i < 2) == (j < 2))
+    new_vertices, new_triangles = triangulate_planar_faces(vertices, triangles)
+
+    assert len(new_triangles[1][1]) == len(triangles[1][1])
+    assert len(new_vertices) == len(np.unique(triangles[1][1]))
+
+
+def test_curved_faces_are_left():
+    vertices, triangles = tessellate_in_processes(
+        [cq.Solid.makeCylinder(5, 10)], 0.01, 0.2
+    )
+    new_vertices, new_triangles = triangulate_planar_faces(vertices, triangles)
+
+    count = {face_id: len(t) for face_id, t in triangles[1].items()}
+    new_count = {face_id: len(t) for face_id, t in new_triangles[1].items()}
+    assert new_count == count
+    assert len(new_vertices) == len(vertices)
+
+
+def test_export_dagmc_h5m_file_spans_planar_faces(tmp_path):
+    pytest.importorskip("gmsh")
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().box(20, 20, 20), material_tags=["box"])
+
+    def triangles(name, **kwargs):
+        model.export_dagmc_h5m_file(
+            filename=str(tmp_path / name), max_mesh_size=1.0, **kwargs
+        )
+        with h5py.File(tmp_path / name, "r") as f:
+            return len(f["tstt/elements/Tri3/connectivity"])
+
+    assert triangles("minimal.h5m", minimal_planar_faces=True) < (
+        triangles("dagmc.h5m") / 4
+    )
+
+
+def test_planar_faces_are_triangulated_before_decimation(tmp_path, capsys):
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().cylinder(10, 5), material_tags=["rod"])
+
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"),
+        meshing_backend="cadquery",
+        minimal_planar_faces=True,
+        decimation_tolerance=0.01,
+    )
+
+    output = capsys.readouterr().out
+    assert output.index("Triangulated") < output.index("Decimated")
@@ -0,0 +1,213 @@
+"""Tests for reading msh files without gmsh.
+
+MSH 4.1 files, ASCII or binary, are read straight into arrays by
+read_gmsh_mesh_file, and export_gmsh_file_to_dagmc_h5m_file only falls back
+to gmsh for the files it cannot read.
+"""
+
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import gmsh
+import numpy as np
+import pytest
+from test_python_api import get_volumes_and_materials_from_h5m
+
+import cad_to_dagmc
+from cad_to_dagmc import read_gmsh_mesh_file
+
+TAGGED_MESH = "tests/tagged_mesh.msh"
+
+
+def _to_binary(ascii_filename, binary_filename):
+    """Writes an ASCII MSH 4.1 file with entities, nodes and elements again
+    in the binary format, following the layout of the format specification."""
+    with open(ascii_filename) as f:
+        lines = iter(f.read().splitlines())
+
+    formats = {"i": "<i", "s": "<Q", "d": "<d"}
+
+    def pack(types, values):
+        return b"".join(
+            struct.pack(formats[kind], float(value) if kind == "d" else int(value))
+            for kind, value in zip(types, values)
+        )
+
+    out = [b"$MeshFormat\n4.1 1 8\n", struct.pack("<i", 1), b"\n$EndMeshFormat\n"]
+    for line in lines:
+        if line == "$PhysicalNames":
+            out.append(b"$PhysicalNames\n")
+            while line != "$EndPhysicalNames":
+                line = next(lines)
+                out.append(line.encode() + b"\n")
+        elif line == "$Entities":
+            counts = [int(value) for value in next(lines).split()]
+            data = [pack("ssss", counts)]
+            for dim, count in enumerate(counts):
+                for _ in range(count):
+                    values = next(lines).split()
+                    if dim == 0:
+                        types = "iddds" + "i" * int(values[4])
+                    else:
+                        physical = int(values[7])
+                        bounding = int(values[8 + physical])
+                        types = "idddddds" + "i" * physical + "s" + "i" * bounding
+                    data.append(pack(types, values))
+            next(lines)
+            out += [b"$Entities\n", *data, b"\n$EndEntities\n"]
+        elif line in ("$Nodes", "$Elements"):
+            header = next(lines).split()
+            data = [pack("ssss", header)]
+            for _ in range(int(header[0])):
+                block = next(lines).split()
+                data.append(pack("iiis", block))
+                count = int(block[3])
+                if line == "$Nodes":
+                    tags = [next(lines) for _ in range(count)]
+                    coordinates = [next(lines).split() for _ in range(count)]
+                    data.append(pack("s" * count, tags))
+                    data += [pack("ddd", values) for values in coordinates]
+                else:
+                    for _ in range(count):
+                        values = next(lines).split()
+                        data.append(pack("s" * len(values), values))
+            next(lines)
+            out += [f"{line}\n".encode(), *data, f"\n$End{line[1:]}\n".encode()]
+    with open(binary_filename, "wb") as f:
+        f.write(b"".join(out))
+
+
+def _assert_same_mesh(a, b):
+    np.testing.assert_array_equal(a[0], b[0])
+    assert a[2] == b[2]
+    assert list(a[1]) == list(b[1])
+    for volume_id, faces in a[1].items():
+        assert list(faces) == list(b[1][volume_id])
+        for face_id, triangles in faces.items():
+            np.testing.assert_array_equal(triangles, b[1][volume_id][face_id])
+
+
+def test_ascii_file_is_read():
+    vertices, triangles_by_solid_by_face, material_tags = read_gmsh_mesh_file(TAGGED_MESH)
+
+    assert material_tags == ["shell", "insert"]
+    assert vertices.shape == (485, 3)
+    assert list(triangles_by_solid_by_face) == [1, 2]
+    assert list(triangles_by_solid_by_face[2]) == [11, 12, 13, 14, 15, 16]
+    for faces in triangles_by_solid_by_face.values():
+        triangles = np.vstack(list(faces.values()))
+        edges = np.sort(
+            np.vstack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]),
+            axis=1,
+        )
+        # every edge of a closed surface is in two triangles
+        _, counts = np.unique(edges, axis=0, return_counts=True)
+        assert set(counts) == {2}
+
+
+def test_binary_file_reads_the_same(tmp_path):
+    _to_binary(TAGGED_MESH, tmp_path / "binary.msh")
+
+    _assert_same_mesh(
+        read_gmsh_mesh_file(TAGGED_MESH), read_gmsh_mesh_file(tmp_path / "binary.msh")
+    )
+
+
+def test_binary_file_written_by_gmsh_reads_the_same(tmp_path):
+    gmsh.initialize()
+    try:
+        gmsh.open(TAGGED_MESH)
+        gmsh.option.setNumber("Mesh.Binary", 1)
+        gmsh.write(str(tmp_path / "binary.msh"))
+    finally:
+        gmsh.finalize()
+
+    _assert_same_mesh(
+        read_gmsh_mesh_file(TAGGED_MESH), read_gmsh_mesh_file(tmp_path / "binary.msh")
+    )
+
+
+def test_conversion_does_not_start_gmsh(tmp_path, monkeypatch):
+    def initialize(*args, **kwargs):
+        raise AssertionError("gmsh should not be started")
+
+    monkeypatch.setattr(gmsh, "initialize", initialize, raising=False)
+    cad_to_dagmc.export_gmsh_file_to_dagmc_h5m_file(
+        gmsh_filename=TAGGED_MESH, dagmc_filename=str(tmp_path / "dagmc.h5m")
+    )
+
+    assert get_volumes_and_materials_from_h5m(str(tmp_path / "dagmc.h5m")) == {
+        1: "mat:shell",
+        2: "mat:insert",
+    }
+
+
+def test_files_convert_in_parallel_processes(tmp_path):
+    filenames = [str(tmp_path / f"dagmc_{index}.h5m") for index in range(3)]
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        written = list(
+            executor.map(
+                cad_to_dagmc.export_gmsh_file_to_dagmc_h5m_file,
+                [TAGGED_MESH] * 3,
+                [["a", "b"]] * 3,
+                [None] * 3,
+                filenames,
+            )
+        )
+
+    assert written == filenames
+    for filename in filenames:
+        assert get_volumes_and_materials_from_h5m(filename) == {1: "mat:a", 2: "mat:b"}
+
+
+def test_older_format_is_read_with_gmsh(tmp_path, capsys):
+    gmsh.initialize()
+    try:
+        gmsh.open(TAGGED_MESH)
+        gmsh.option.setNumber("Mesh.MshFileVersion", 2.2)
+        gmsh.write(str(tmp_path / "old.msh"))
+    finally:
+        gmsh.finalize()
+
+    cad_to_dagmc.export_gmsh_file_to_dagmc_h5m_file(
+        gmsh_filename=str(tmp_path / "old.msh"),
+        dagmc_filename=str(tmp_path / "dagmc.h5m"),
+    )
+
+    assert "reading it with gmsh" in capsys.readouterr().out
+    assert not gmsh.isInitialized()
+    assert get_volumes_and_materials_from_h5m(str(tmp_path / "dagmc.h5m")) == {
+        1: "mat:shell",
+        2: "mat:insert",
+    }
+
+
+def test_gmsh_is_finalized_when_the_fallback_fails(tmp_path, monkeypatch):
+    (tmp_path / "old.msh").write_text("$MeshFormat\n2.2 0 8\n$EndMeshFormat\n")
+
+    def open_file(*args, **kwargs):
+        raise RuntimeError("simulated read failure")
+
+    monkeypatch.setattr("gmsh.open", open_file)
+    with pytest.raises(RuntimeError, match="simulated read failure"):
+        cad_to_dagmc.export_gmsh_file_to_dagmc_h5m_file(
+            gmsh_filename=str(tmp_path / "old.msh")
+        )
+
+    assert not gmsh.isInitialized()
+
+
+def test_wrong_number_of_material_tags_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Number of volumes 2"):
+        cad_to_dagmc.export_gmsh_file_to_dagmc_h5m_file(
+            gmsh_filename=TAGGED_MESH,
+            material_tags=["one"],
+            dagmc_filename=str(tmp_path / "dagmc.h5m"),
+        )
+
+
+def test_other_files_are_rejected(tmp_path):
+    (tmp_path / "mesh.vtk").write_text("# vtk DataFile Version 2.0\n")
+
+    with pytest.raises(ValueError, match="not a gmsh msh file"):
+        read_gmsh_mesh_file(tmp_path / "mesh.vtk")
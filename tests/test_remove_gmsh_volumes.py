@@ -0,0 +1,72 @@
+"""Tests for removing the volumes not to be filled with tetrahedra from the
+gmsh model in one call, keeping the surface mesh already made."""
+
+import cadquery as cq
+import numpy as np
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import _remove_gmsh_volumes
+
+
+class _RecordingGmsh:
+    """Stands in for the gmsh module, recording the calls to its occ kernel."""
+
+    def __init__(self):
+        self.calls = []
+        self.model = self
+        self.occ = self
+
+    def remove(self, dim_tags, recursive=False):
+        self.calls.append(("remove", list(dim_tags), recursive))
+
+    def synchronize(self):
+        self.calls.append(("synchronize",))
+
+
+def test_volumes_are_removed_in_one_call():
+    gmsh = _RecordingGmsh()
+
+    _remove_gmsh_volumes(gmsh, [(3, 1), (3, 2), (3, 3), (3, 4)], [2])
+
+    assert gmsh.calls == [
+        ("remove", [(3, 1), (3, 3), (3, 4)], True),
+        ("synchronize",),
+    ]
+
+
+def test_nothing_is_removed_when_every_volume_is_kept():
+    gmsh = _RecordingGmsh()
+
+    _remove_gmsh_volumes(gmsh, [(3, 1), (3, 2)], {1, 2})
+
+    assert gmsh.calls == []
+
+
+def _faces(vertices, faces):
+    return {tuple(sorted(map(tuple, np.round(vertices[face], 6)))) for face in faces}
+
+
+def test_tetrahedra_fill_the_surface_mesh_of_their_volume():
+    model = CadToDagmc()
+    for x in range(3):
+        model.add_cadquery_object(
+            cq.Workplane().box(1, 1, 1).translate((x, 0, 0)), material_tags=[f"box{x}"]
+        )
+
+    result = model.mesh(
+        meshing_backend="gmsh", max_mesh_size=0.4, unstructured_volumes=["box1"]
+    )
+
+    (volume_id,) = set(result.tet_volume_ids)
+    corners = ([0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3])
+    tet_faces = np.sort(
+        np.vstack([result.tetrahedra[:, corner] for corner in corners]), axis=1
+    )
+    faces, counts = np.unique(tet_faces, axis=0, return_counts=True)
+    triangles = np.vstack(list(result.triangles_by_solid_by_face[volume_id].values()))
+
+    # the faces of the tetrahedra on the boundary are the triangles of the
+    # h5m, as the surface mesh is kept when the other volumes are removed
+    assert _faces(result.tet_vertices, faces[counts == 1]) == _faces(
+        result.vertices, triangles
+    )
@@ -328,3 +328,55 @@ def test_set_size_warning_uses_original_material_tag_key():
             assert "above max_mesh_size" in str(w[0].message)
     finally:
         gmsh_obj.finalize()
+
+
+def test_set_size_shared_points_take_the_smallest_size():
+    """Test that points on the boundary of two sized volumes take the smaller
+    size and the others keep the size of their volume"""
+    from cad_to_dagmc.core import imprint_assembly
+
+    assembly = cq.Assembly()
+    assembly.add(cq.Workplane("XY").box(10, 10, 10), name="small")
+    assembly.add(cq.Workplane("XY").box(10, 10, 10).translate((10, 0, 0)), name="large")
+    imprinted_assembly, _ = imprint_assembly(assembly)
+    gmsh_obj = init_gmsh()
+    try:
+        gmsh_obj, volumes = get_volumes(gmsh_obj, imprinted_assembly)
+        (_, first), (_, second) = volumes
+        set_sizes_for_mesh(gmsh=gmsh_obj, set_size={first: 0.5, second: 2.0})
+
+        first_points = gmsh_obj.model.getBoundary(
+            [(3, first)], combined=False, oriented=False, recursive=True
+        )
+        second_points = gmsh_obj.model.getBoundary(
+            [(3, second)], combined=False, oriented=False, recursive=True
+        )
+        shared = set(first_points) & set(second_points)
+        assert len(shared) == 4
+        sizes = dict(zip(second_points, gmsh_obj.model.mesh.getSizes(second_points)))
+        assert {sizes[point] for point in shared} == {0.5}
+        assert {sizes[point] for point in set(second_points) - shared} == {2.0}
+    finally:
+        gmsh_obj.finalize()
+
+
+def test_set_size_prints_one_summary(capsys):
+    """Test that sizing many volumes prints a summary rather than a line for
+    every boundary"""
+    assembly = cq.Assembly()
+    for i in range(20):
+        assembly.add(cq.Workplane("XY").box(1, 1, 1).translate((2 * i, 0, 0)))
+    gmsh_obj = init_gmsh()
+    try:
+        gmsh_obj, volumes = get_volumes(gmsh_obj, assembly)
+        capsys.readouterr()
+        set_sizes_for_mesh(
+            gmsh=gmsh_obj,
+            set_size={volume_id: 0.1 * (1 + i % 3) for i, (_, volume_id) in enumerate(volumes)},
+        )
+        output = capsys.readouterr().out
+        assert output.strip().splitlines() == [
+            "Set mesh sizes on 160 points of 20 volumes, 3 distinct sizes"
+        ]
+    finally:
+        gmsh_obj.finalize()
@@ -0,0 +1,168 @@
+"""Tests for building a whole machine from the mesh of one sector.
+
+One sector is imprinted and meshed, then rotated into place for the others
+with the vertices on the cut planes welded, which has to give closed volumes
+with one surface between the pieces of a solid in neighbouring sectors.
+"""
+
+import math
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+import cadquery_direct_mesh_plugin  # noqa: F401, registers Assembly.toMesh
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import replicate_sector, share_coincident_face_ids
+
+ORDER = 16
+
+
+def _sector(angle=360 / ORDER):
+    """Two touching rings cut to a sector, with a box inside it that is
+    clear of the cut planes."""
+    middle = math.radians(angle / 2)
+    return (
+        cq.Assembly()
+        .add(cq.Workplane("XZ").center(7, 0).rect(2, 4).revolve(angle, (-7, 0, 0), (-7, 1, 0)))
+        .add(cq.Workplane("XZ").center(9, 0).rect(2, 4).revolve(angle, (-9, 0, 0), (-9, 1, 0)))
+        .add(
+            cq.Workplane()
+            .box(1, 1, 1)
+            .translate((12 * math.cos(middle), 12 * math.sin(middle), 0))
+        )
+    )
+
+
+def _mesh(assembly):
+    mesh = assembly.toMesh(imprint=True, tolerance=0.05, angular_tolerance=0.1)
+    return mesh["vertices"], share_coincident_face_ids(
+        mesh["solid_face_triangle_vertex_map"]
+    )
+
+
+def _edges(triangles):
+    return np.vstack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+
+
+def test_every_volume_is_closed():
+    triangles = replicate_sector(*_mesh(_sector()), ["a", "b", "c"], ORDER)[1]
+
+    assert len(triangles) == 3 * ORDER
+    for faces in triangles.values():
+        edges = _edges(np.vstack(list(faces.values())))
+        # each edge is used once in each direction
+        assert len(np.unique(edges, axis=0)) == len(edges)
+        assert len(np.unique(np.sort(edges, axis=1), axis=0)) * 2 == len(edges)
+
+
+def test_cut_faces_become_one_surface_between_sectors():
+    sector_vertices, sector_triangles = _mesh(_sector())
+    vertices, triangles = replicate_sector(
+        sector_vertices, sector_triangles, ["a", "b", "c"], ORDER
+    )[:2]
+
+    # the inner ring of the first sector and of the second share a surface
+    shared = set(triangles[1]) & set(triangles[4])
+    assert len(shared) == 1
+    # and the rings of the first sector still share theirs
+    assert len(set(triangles[1]) & set(triangles[2])) == 1
+    # the vertices on the cut planes are welded, two of the sector's four
+    # cut faces are dropped in each copy
+    surfaces = {face_id for faces in triangles.values() for face_id in faces}
+    sector_surfaces = {face_id for faces in sector_triangles.values() for face_id in faces}
+    assert len(surfaces) == ORDER * (len(sector_surfaces) - 2)
+    assert len(vertices) < ORDER * len(sector_vertices)
+
+
+def test_machine_is_whole():
+    vertices = replicate_sector(*_mesh(_sector()), ["a", "b", "c"], ORDER)[0]
+    radius = np.linalg.norm(vertices[:, :2], axis=1)
+    angles = np.sort(np.arctan2(vertices[:, 1], vertices[:, 0])[radius > 7.5])
+
+    assert np.diff(angles).max() < 2 * np.pi / ORDER / 4
+    np.testing.assert_allclose(vertices.min(axis=0)[:2], -vertices.max(axis=0)[:2], atol=0.1)
+
+
+def test_material_tags_follow_the_copies():
+    tags = replicate_sector(*_mesh(_sector()), ["a", "b", "c"], ORDER)[2]
+
+    assert tags == ["a", "b", "c"] * ORDER
+
+
+def test_sector_wider_than_the_order_is_rejected():
+    with pytest.raises(ValueError, match="spans"):
+        replicate_sector(*_mesh(_sector(360 / ORDER)), ["a", "b", "c"], 2 * ORDER)
+
+
+def test_unmatched_cut_faces_are_rejected():
+    angle = math.radians(360 / ORDER)
+    assembly = _sector()
+    # a box against the end plane only
+    assembly.add(
+        cq.Solid.makeBox(1, 0.5, 1)
+        .translate((0, -0.5, 0))
+        .rotate((0, 0, 0), (0, 0, 1), 360 / ORDER)
+        .translate((12 * math.cos(angle), 12 * math.sin(angle), 0))
+    )
+    with pytest.raises(ValueError, match="start plane"):
+        replicate_sector(*_mesh(assembly), ["a", "b", "c", "d"], ORDER)
+
+
+@pytest.mark.parametrize("order, error", [(1, ValueError), (2.0, TypeError), (True, TypeError)])
+def test_bad_symmetry_order_is_rejected(order, error):
+    with pytest.raises(error, match="symmetry_order"):
+        replicate_sector(*_mesh(_sector()), ["a", "b", "c"], order)
+
+
+def test_export_dagmc_h5m_file_writes_every_sector(tmp_path, capsys):
+    model = CadToDagmc()
+    model.add_cadquery_object(_sector(), material_tags=["inner", "outer", "coil"])
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"), tolerance=0.05, symmetry_order=ORDER
+    )
+
+    assert "Using meshing backend: cadquery" in capsys.readouterr().out
+    with h5py.File(tmp_path / "dagmc.h5m", "r") as f:
+        dimensions = f["tstt/tags/GEOM_DIMENSION/values"][()]
+    assert (dimensions == 3).sum() == 3 * ORDER
+
+
+def _finely_meshed_cut_faces(count):
+    """One solid with only its two cut faces, each meshed as a count by count
+    grid, the end face being the start face turned by one sector."""
+    x, z = np.meshgrid(np.linspace(5, 9, count), np.linspace(-2, 2, count))
+    start = np.column_stack([x.ravel(), np.zeros(x.size), z.ravel()])
+    angle = 2 * np.pi / ORDER
+    rotation = np.array(
+        [[math.cos(angle), -math.sin(angle), 0], [math.sin(angle), math.cos(angle), 0], [0, 0, 1]]
+    )
+    corners = (np.arange(count - 1)[:, None] * count + np.arange(count - 1)).ravel()
+    triangles = np.vstack(
+        [
+            np.column_stack([corners, corners + 1, corners + count]),
+            np.column_stack([corners + 1, corners + count + 1, corners + count]),
+        ]
+    )
+    vertices = np.vstack([start, start @ rotation.T])
+    return vertices, {1: {1: triangles, 2: triangles[:, ::-1] + count * count}}
+
+
+def test_cut_planes_are_welded_without_comparing_every_pair():
+    import tracemalloc
+
+    count = 100
+    vertices, triangles = _finely_meshed_cut_faces(count)
+    tracemalloc.start()
+    try:
+        machine_vertices = replicate_sector(vertices, triangles, ["a"], ORDER)[0]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # one plane of count * count vertices between each pair of sectors
+    assert len(machine_vertices) == ORDER * count * count
+    # comparing each of the 10,000 end plane vertices with each of the start
+    # plane ones would take hundreds of MB
+    assert peak < 100e6
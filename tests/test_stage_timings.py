@@ -0,0 +1,146 @@
+"""Tests for recording the time exports spend in each stage."""
+
+import json
+import time
+
+import cadquery as cq
+import pytest
+
+from cad_to_dagmc import CadToDagmc, StageTimings
+from cad_to_dagmc import core
+
+
+def _model(**kwargs):
+    model = CadToDagmc(**kwargs)
+    model.add_cadquery_object(cq.Workplane().box(2, 2, 2), material_tags=["large"])
+    model.add_cadquery_object(
+        cq.Workplane().box(1, 1, 1).translate((1.5, 0, 0)), material_tags=["small"]
+    )
+    return model
+
+
+def test_inner_stages_are_not_counted_in_the_outer():
+    timings = StageTimings()
+
+    with timings.stage("outer"):
+        time.sleep(0.05)
+        with timings.stage("inner"):
+            time.sleep(0.1)
+
+    inner, outer = timings.stages
+    assert inner["stage"] == "inner"
+    assert inner["wall_time"] == pytest.approx(0.1, abs=0.05)
+    assert outer["wall_time"] == pytest.approx(0.05, abs=0.05)
+
+
+def test_totals_add_up_the_runs_of_a_stage():
+    timings = StageTimings()
+    for _ in range(3):
+        with timings.stage("tessellation"):
+            pass
+    with timings.stage("imprint"):
+        time.sleep(0.01)
+
+    totals = timings.totals()
+
+    assert list(totals) == ["imprint", "tessellation"]
+    assert totals["tessellation"]["calls"] == 3
+
+
+def test_export_writes_the_timings_next_to_the_h5m(tmp_path):
+    model = _model(record_timings=True)
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"), meshing_backend="cadquery"
+    )
+
+    stages = set(model.timings.totals())
+    assert {"assembly build", "tessellation", "h5m write"} <= stages
+    assert {"share_coincident_face_ids", "brep-order mapping"} <= stages
+    with open(tmp_path / "dagmc.h5m.timings.json") as f:
+        report = json.load(f)
+    assert report == json.loads(json.dumps(model.timings.to_dict()))
+    assert report["wall_time"] >= sum(stage["wall_time"] for stage in report["stages"])
+    assert core._timings is None
+
+
+def test_imprint_is_a_stage_of_its_own(tmp_path):
+    model = _model(record_timings=True)
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"),
+        meshing_backend="cadquery",
+        tolerance=0.05,
+        processes=1,
+    )
+
+    assert model.timings.totals()["imprint"]["calls"] == 1
+
+
+def test_each_export_has_a_report_of_its_own(tmp_path):
+    model = _model(record_timings=True)
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "first.h5m"), meshing_backend="cadquery"
+    )
+    first = model.timings
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "second.h5m"), meshing_backend="cadquery"
+    )
+
+    assert model.timings is not first
+    # the second export reuses the assembly of the first
+    assert "assembly build" not in model.timings.totals()
+
+
+def test_mesh_records_without_writing_a_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model = _model(record_timings=True)
+
+    model.mesh(meshing_backend="cadquery")
+
+    assert "tessellation" in model.timings.totals()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_timings_of_a_failed_export_are_written(tmp_path):
+    model = _model(record_timings=True)
+
+    with pytest.raises(ValueError):
+        model.export_dagmc_h5m_file(
+            filename=str(tmp_path / "dagmc.h5m"),
+            meshing_backend="cadquery",
+            h5m_backend="unknown",
+        )
+
+    with open(tmp_path / "dagmc.h5m.timings.json") as f:
+        assert "tessellation" in json.load(f)["totals"]
+    assert core._timings is None
+
+
+def test_nothing_is_recorded_by_default(tmp_path):
+    model = _model()
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"), meshing_backend="cadquery"
+    )
+
+    assert model.timings is None
+    assert not (tmp_path / "dagmc.h5m.timings.json").exists()
+
+
+def test_gmsh_stages_are_recorded(tmp_path):
+    model = _model(record_timings=True)
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"),
+        meshing_backend="gmsh",
+        max_mesh_size=0.5,
+        unstructured_volumes=["small"],
+        umesh_filename=str(tmp_path / "umesh.vtk"),
+    )
+
+    assert {
+        "imprint",
+        "gmsh import",
+        "sizing",
+        "tessellation",
+        "volume meshing",
+        "h5m write",
+        "vtk write",
+    } <= set(model.timings.totals())
@@ -0,0 +1,230 @@
+"""Tests for taking the DAGMC surface from the boundary of the tetrahedra.
+
+surface_from_tetrahedra finds the faces of a tet mesh on the boundary of each
+volume, and surface_from_tets makes the gmsh and cad-to-dagmc-mesher backends
+use them for the h5m, so that the surface and the tet mesh are conformal.
+"""
+
+import itertools
+
+import cadquery as cq
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc, surface_from_tetrahedra
+
+
+def _two_cubes():
+    """Two unit cubes side by side, each cut into six tetrahedra."""
+    vertices = np.array(
+        [[x, y, z] for x in range(3) for y in range(2) for z in range(2)], dtype=float
+    )
+    index = {tuple(vertex): i for i, vertex in enumerate(vertices.astype(int))}
+    tetrahedra = []
+    for x in range(2):
+        for axes in itertools.permutations(range(3)):
+            corner = np.array([x, 0, 0])
+            tet = [index[tuple(corner)]]
+            for axis in axes:
+                corner[axis] += 1
+                tet.append(index[tuple(corner)])
+            tetrahedra.append(tet)
+    return vertices, np.array(tetrahedra), np.repeat([1, 2], 6)
+
+
+def _wound(triangles):
+    """The triangles, each started from its lowest vertex so that only their
+    winding tells them apart."""
+    return {tuple(np.roll(t, -np.argmin(t))) for t in triangles}
+
+
+def _enclosed_volume(vertices, triangles):
+    a, b, c = (vertices[triangles[:, i]] for i in range(3))
+    return np.einsum("ij,ij->i", a, np.cross(b, c)).sum() / 6
+
+
+def _edge_counts(triangles):
+    edges = np.sort(
+        np.vstack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]),
+        axis=1,
+    )
+    return set(np.unique(edges, axis=0, return_counts=True)[1])
+
+
+def test_each_volume_is_closed_and_wound_outward():
+    vertices, triangles_by_solid_by_face = surface_from_tetrahedra(*_two_cubes())
+
+    assert list(triangles_by_solid_by_face) == [1, 2]
+    for faces in triangles_by_solid_by_face.values():
+        triangles = np.vstack(list(faces.values()))
+        assert _edge_counts(triangles) == {2}
+        assert _enclosed_volume(vertices, triangles) == pytest.approx(1)
+
+
+def test_shared_face_has_one_id_in_both_volumes():
+    _, triangles_by_solid_by_face = surface_from_tetrahedra(*_two_cubes())
+
+    (shared,) = set(triangles_by_solid_by_face[1]) & set(triangles_by_solid_by_face[2])
+    first = triangles_by_solid_by_face[1][shared]
+    second = triangles_by_solid_by_face[2][shared]
+    assert len(first) == 2
+    # the same triangles, wound the other way round
+    assert _wound(first) == _wound(second[:, ::-1])
+
+
+def test_inverted_tetrahedra_give_the_same_surface():
+    vertices, tetrahedra, volume_ids = _two_cubes()
+    inverted = tetrahedra.copy()
+    inverted[::2] = inverted[::2][:, [1, 0, 2, 3]]
+
+    _, expected = surface_from_tetrahedra(vertices, tetrahedra, volume_ids)
+    _, result = surface_from_tetrahedra(vertices, inverted, volume_ids)
+
+    for volume_id, faces in expected.items():
+        for face_id, triangles in faces.items():
+            assert _wound(triangles) == _wound(result[volume_id][face_id])
+
+
+def test_vertices_inside_the_volumes_are_left_out():
+    vertices, tetrahedra, volume_ids = _two_cubes()
+    # cut the first tetrahedron into four around its centroid
+    centroid = len(vertices)
+    vertices = np.vstack([vertices, vertices[tetrahedra[0]].mean(axis=0)])
+    a, b, c, d = tetrahedra[0]
+    tetrahedra = np.vstack(
+        [
+            [centroid, b, c, d],
+            [a, centroid, c, d],
+            [a, b, centroid, d],
+            [a, b, c, centroid],
+            *tetrahedra[1:],
+        ]
+    )
+    volume_ids = np.concatenate([[1, 1, 1], volume_ids])
+
+    surface_vertices, _ = surface_from_tetrahedra(vertices, tetrahedra, volume_ids)
+
+    assert len(surface_vertices) == 12
+
+
+def test_volume_order_follows_volume_ids():
+    _, triangles_by_solid_by_face = surface_from_tetrahedra(*_two_cubes(), [2, 1])
+
+    assert list(triangles_by_solid_by_face) == [2, 1]
+
+
+def test_volume_without_tetrahedra_is_rejected():
+    with pytest.raises(ValueError, match=r"Volumes \[3\] have no tetrahedra"):
+        surface_from_tetrahedra(*_two_cubes(), [1, 2, 3])
+
+
+def test_face_in_three_tetrahedra_is_rejected():
+    vertices, tetrahedra, volume_ids = _two_cubes()
+    # the first two tetrahedra share the face on the diagonal of the cube
+    vertices = np.vstack([vertices, [[0.2, 0.2, 0.1]]])
+    tetrahedra = np.vstack(
+        [tetrahedra, [[*tetrahedra[0][[0, 1, 3]], len(vertices) - 1]]]
+    )
+
+    with pytest.raises(ValueError, match="more than two tetrahedra"):
+        surface_from_tetrahedra(vertices, tetrahedra, np.append(volume_ids, 1))
+
+
+def _model():
+    """A box with a smaller box against its side."""
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().box(2, 2, 2), material_tags=["large"])
+    model.add_cadquery_object(
+        cq.Workplane().box(1, 1, 1).translate((1.5, 0, 0)), material_tags=["small"]
+    )
+    return model
+
+
+def _assert_conformal(result):
+    """The boundary faces of the tetrahedra of each volume are the triangles
+    of its surface."""
+
+    def faces(vertices, triangles):
+        return {tuple(sorted(map(tuple, np.round(vertices[t], 6)))) for t in triangles}
+
+    for volume_id in set(result.tet_volume_ids):
+        tetrahedra = result.tetrahedra[result.tet_volume_ids == volume_id]
+        corners = ([0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3])
+        tet_faces = np.sort(
+            np.vstack([tetrahedra[:, corner] for corner in corners]), axis=1
+        )
+        boundary, counts = np.unique(tet_faces, axis=0, return_counts=True)
+        triangles = np.vstack(list(result.triangles_by_solid_by_face[volume_id].values()))
+        assert faces(result.tet_vertices, boundary[counts == 1]) == faces(
+            result.vertices, triangles
+        )
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {
+            "meshing_backend": "gmsh",
+            "max_mesh_size": 0.5,
+            "unstructured_volumes": ["small"],
+        },
+        {
+            "meshing_backend": "cad-to-dagmc-mesher",
+            "target_edge_length": 0.5,
+            "tet_volumes": ["small"],
+        },
+    ],
+    ids=["gmsh", "cad-to-dagmc-mesher"],
+)
+def test_surface_is_the_boundary_of_the_tetrahedra(kwargs):
+    result = _model().mesh(surface_from_tets=True, **kwargs)
+
+    assert result.material_tags == ["large", "small"]
+    assert len(set(result.tet_volume_ids)) == 1
+    _assert_conformal(result)
+    for faces in result.triangles_by_solid_by_face.values():
+        assert _edge_counts(np.vstack(list(faces.values()))) == {2}
+
+
+def test_h5m_is_written_without_a_tet_mesh(tmp_path):
+    filename = _model().export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"),
+        meshing_backend="cad-to-dagmc-mesher",
+        target_edge_length=0.5,
+        surface_from_tets=True,
+    )
+
+    assert filename == str(tmp_path / "dagmc.h5m")
+
+
+def test_cadquery_backend_is_rejected():
+    with pytest.raises(ValueError, match="surface_from_tets"):
+        _model().mesh(meshing_backend="cadquery", surface_from_tets=True)
+
+
+def test_mesher_needs_target_edge_length():
+    with pytest.raises(ValueError, match="requires target_edge_length"):
+        _model().mesh(meshing_backend="cad-to-dagmc-mesher", surface_from_tets=True)
+
+
+@pytest.mark.parametrize(
+    "surface_kwargs",
+    [{"decimation_tolerance": 0.01}, {"minimal_planar_faces": True}],
+    ids=["decimation_tolerance", "minimal_planar_faces"],
+)
+@pytest.mark.parametrize(
+    "tet_kwargs",
+    [
+        {"meshing_backend": "gmsh", "surface_from_tets": True},
+        {"meshing_backend": "gmsh", "unstructured_volumes": ["small"]},
+        {
+            "meshing_backend": "cad-to-dagmc-mesher",
+            "target_edge_length": 0.5,
+            "tet_volumes": ["small"],
+        },
+    ],
+    ids=["surface_from_tets", "unstructured_volumes", "tet_volumes"],
+)
+def test_changing_the_surface_of_a_tet_mesh_is_rejected(surface_kwargs, tet_kwargs):
+    with pytest.raises(ValueError, match="no longer match the boundary"):
+        _model().mesh(**surface_kwargs, **tet_kwargs)
@@ -0,0 +1,105 @@
+"""Tests for tessellating within a triangle budget.
+
+The tolerance is solved for from a few coarse tessellations so that the
+model comes in under max_triangles, and the model is then tessellated once,
+or again if the estimate was low.
+"""
+
+import cadquery as cq
+import h5py
+import numpy as np
+import pytest
+
+from cad_to_dagmc import CadToDagmc
+from cad_to_dagmc.core import (
+    imprint_assembly,
+    share_coincident_face_ids,
+    tessellate_within_budget,
+)
+
+
+def _solids():
+    """A ball resting on a plate, and a ring around it."""
+    imprinted, _ = imprint_assembly(
+        cq.Assembly()
+        .add(cq.Workplane().sphere(5))
+        .add(cq.Workplane().box(20, 20, 2).translate((0, 0, -6)))
+        .add(cq.Solid.makeTorus(8, 1).translate((0, 0, -4)))
+    )
+    return imprinted.Solids()
+
+
+def _count(triangles_by_solid_by_face):
+    faces = {}
+    for solid_faces in share_coincident_face_ids(triangles_by_solid_by_face).values():
+        faces.update(solid_faces)
+    return sum(len(triangles) for triangles in faces.values())
+
+
+@pytest.mark.parametrize("max_triangles", [3000, 20000, 100000])
+def test_tessellation_is_within_budget(max_triangles):
+    _, triangles_by_solid_by_face = tessellate_within_budget(
+        _solids(), max_triangles, tolerance=0.1, angular_tolerance=1.0
+    )
+
+    count = _count(triangles_by_solid_by_face)
+    assert count <= max_triangles
+    assert count > max_triangles / 2
+
+
+def test_proportions_between_solids_are_kept():
+    solids = _solids()
+    _, coarse_first = tessellate_within_budget(
+        solids, 20000, tolerance=[1.0, 0.01, 0.01], angular_tolerance=1.0
+    )
+    _, fine_first = tessellate_within_budget(
+        solids, 20000, tolerance=[0.01, 1.0, 0.01], angular_tolerance=1.0
+    )
+
+    def ball(triangles_by_solid_by_face):
+        return sum(len(triangles) for triangles in triangles_by_solid_by_face[1].values())
+
+    assert ball(fine_first) > 2 * ball(coarse_first)
+
+
+def test_coarsen_only_keeps_the_given_tolerance():
+    solids = _solids()
+    _, coarse = tessellate_within_budget(
+        solids, 50000, tolerance=5.0, angular_tolerance=1.0, coarsen_only=True
+    )
+    _, budgeted = tessellate_within_budget(
+        solids, 50000, tolerance=5.0, angular_tolerance=1.0
+    )
+
+    assert _count(coarse) < 5000 < _count(budgeted)
+
+
+def test_budget_below_the_angular_tolerance_is_rejected():
+    with pytest.raises(ValueError, match="angular_tolerance"):
+        tessellate_within_budget(
+            _solids(), 10, tolerance=0.1, angular_tolerance=0.5
+        )
+
+
+@pytest.mark.parametrize(
+    "max_triangles, error", [(0, ValueError), (2.5, TypeError), (True, TypeError)]
+)
+def test_bad_max_triangles_is_rejected(max_triangles, error):
+    with pytest.raises(error, match="max_triangles"):
+        tessellate_within_budget(_solids(), max_triangles, 0.1, 0.1)
+
+
+def test_export_dagmc_h5m_file_meets_the_budget(tmp_path, capsys):
+    model = CadToDagmc()
+    model.add_cadquery_object(cq.Workplane().sphere(5), material_tags=["ball"])
+    model.add_cadquery_object(
+        cq.Workplane().box(20, 20, 2).translate((0, 0, -6)), material_tags=["plate"]
+    )
+    model.export_dagmc_h5m_file(
+        filename=str(tmp_path / "dagmc.h5m"), max_triangles=20000
+    )
+
+    assert "Using meshing backend: cadquery" in capsys.readouterr().out
+    with h5py.File(tmp_path / "dagmc.h5m", "r") as f:
+        count = len(f["tstt/elements/Tri3/connectivity"])
+    assert 10000 < count <= 20000